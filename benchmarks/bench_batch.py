@@ -0,0 +1,57 @@
+"""Compare product dicts with ProductBatch pages: memory per product and DataFrame build time.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch [cards ...]
+
+Generated pages are parsed once into lists of dicts and once into batches. The traced
+memory of the parsed pages is divided by the card count, and building the raw DataFrame
+(`pd.DataFrame(list_of_dicts)` vs `batches_to_frame`) is timed, best of three.
+"""
+import contextlib, io, itertools, sys, time, tracemalloc
+import pandas as pd
+from benchmarks.fake_site import generate_pages
+from utils.batch import batches_to_frame
+from utils.extract import parse_page
+
+DEFAULT_SIZES = [10_000, 100_000]
+CARDS_PER_PAGE = 20
+
+
+def parsed_size(contents, as_batch):
+    """Parsed pages and the bytes they hold"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        pages = [parse_page(content, as_batch=as_batch)[0] for content in contents]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return pages, size
+
+
+def best_time(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes):
+    catalog = list(generate_pages(200, CARDS_PER_PAGE, malformed_rate=0.05).values())
+    print("{:>10} {:>14} {:>14} {:>12} {:>12}".format(
+        "cards", "dict B/card", "batch B/card", "dict frame s", "batch frame s"))
+    for cards in sizes:
+        contents = list(itertools.islice(itertools.cycle(catalog), cards // CARDS_PER_PAGE))
+        dict_pages, dict_bytes = parsed_size(contents, as_batch=False)
+        batch_pages, batch_bytes = parsed_size(contents, as_batch=True)
+
+        products = [product for page in dict_pages for product in page]
+        dict_time = best_time(lambda: pd.DataFrame(products))
+        batch_time = best_time(lambda: batches_to_frame(batch_pages))
+        print("{:>10} {:>14.0f} {:>14.0f} {:>12.3f} {:>12.3f}".format(
+            cards, dict_bytes / cards, batch_bytes / cards, dict_time, batch_time))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
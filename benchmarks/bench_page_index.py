@@ -0,0 +1,63 @@
+"""Compare the CPU cost of parsing listing pages with rebuilding them from a PageIndex.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_page_index [pages ...]
+
+A generated catalog is parsed into a fresh index (the first run), then looked up again
+with the same bodies (a rerun against an unchanged catalog). Hashing alone is timed as
+the lower bound. Times are process CPU seconds per page, best of three.
+"""
+import contextlib, io, os, sys, tempfile, time
+from benchmarks.fake_site import generate_pages
+from utils.extract import parse_listing_page
+from utils.page_index import PageIndex
+
+DEFAULT_SIZES = [200, 1000]
+CARDS_PER_PAGE = 20
+
+
+def cpu_per_page(func, pages, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        best = min(best, time.process_time() - start)
+    return best / pages
+
+
+def main(sizes):
+    print("{:>8} {:>14} {:>14} {:>14} {:>10}".format("pages", "parse ms/page", "index ms/page", "hash ms/page",
+                                                      "speedup"))
+    for pages in sizes:
+        catalog = generate_pages(pages, CARDS_PER_PAGE, malformed_rate=0.05)
+        urls = ["https://bench.test" + path for path in catalog]
+        with tempfile.TemporaryDirectory() as directory:
+            index = PageIndex("https://bench.test", os.path.join(directory, "page_index.sqlite3"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                for url, content in zip(urls, catalog.values()):
+                    parse_listing_page(content, None, url, as_batch=True, page_index=index)
+
+            def parse():
+                for url, content in zip(urls, catalog.values()):
+                    parse_listing_page(content, None, url, as_batch=True)
+
+            def rerun():
+                for url, content in zip(urls, catalog.values()):
+                    parse_listing_page(content, None, url, as_batch=True, page_index=index)
+
+            def hash_only():
+                for content in catalog.values():
+                    index.digest(content)
+
+            parse_time = cpu_per_page(parse, pages)
+            index_time = cpu_per_page(rerun, pages)
+            hash_time = cpu_per_page(hash_only, pages)
+            index.close()
+        print("{:>8} {:>14.3f} {:>14.3f} {:>14.3f} {:>9.1f}x".format(
+            pages, parse_time * 1000, index_time * 1000, hash_time * 1000, parse_time / index_time))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
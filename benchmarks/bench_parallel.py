@@ -0,0 +1,54 @@
+"""Benchmark process-pool parsing and cleaning on a synthetic catalog.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel [--cards 1000000] [--processes 1 2 4 8] [--parser lxml]
+
+A pool of distinct generated pages is cycled up to `--cards` cards and pushed through
+iter_parsed_batches for every worker count, reporting cards/sec and the speedup over a
+single worker.
+"""
+import argparse, contextlib, io, itertools, os, time
+from benchmarks.fake_site import generate_pages
+from utils.parallel import DEFAULT_PAGES_PER_TASK, iter_parsed_batches
+
+CARDS_PER_PAGE = 20
+DISTINCT_PAGES = 200
+
+
+def run(contents, processes, parser, pages_per_task):
+    cards = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _, batch_cards, _, _ in iter_parsed_batches(contents, processes, parser, pages_per_task=pages_per_task):
+            cards += batch_cards
+        seconds = time.perf_counter() - start
+    return cards, seconds
+
+
+def main(argv=None):
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))))
+    parser.add_argument("--parser", default=None, help="lxml or bs4, the extract default when omitted")
+    parser.add_argument("--pages-per-task", type=int, default=DEFAULT_PAGES_PER_TASK)
+    args = parser.parse_args(argv)
+
+    # Every page but the last links to a next page, so the cycled catalog never ends early
+    catalog = list(generate_pages(DISTINCT_PAGES + 1, CARDS_PER_PAGE, malformed_rate=0.05).values())
+    pages = args.cards // CARDS_PER_PAGE
+
+    print("{:>10} {:>10} {:>12} {:>14} {:>9}".format("processes", "cards", "seconds", "cards/s", "speedup"))
+    single = None
+    for processes in args.processes:
+        contents = itertools.islice(itertools.cycle(catalog[:-1]), pages)
+        cards, seconds = run(contents, processes, args.parser, args.pages_per_task)
+        rate = cards / seconds
+        single = single or rate
+        print("{:>10} {:>10} {:>12.2f} {:>14,.0f} {:>8.2f}x".format(processes, cards, seconds, rate, rate / single))
+
+
+if __name__ == "__main__":
+    main()
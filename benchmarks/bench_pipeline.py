@@ -0,0 +1,162 @@
+"""Offline throughput benchmarks for every pipeline stage, run against a local fake site.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline [--scales 10 50 200] [--baseline benchmarks/baseline.json]
+    python -m benchmarks.bench_pipeline --save-baseline
+
+Each scale is a catalog size in pages served by FakeFashionStudio. For every scale the
+runner measures scrape pages/sec (sequential and concurrent), parse cards/sec per parser
+engine, transform rows/sec and rows/sec of the local sinks. The fake site answers after
+`--latency` seconds, so concurrent scraping has round trips to overlap as on a real
+site. Every benchmark keeps the fastest of at least `--repeat` runs, repeated until it
+has run for MIN_SECONDS, which keeps the small scales from measuring scheduler noise.
+
+Results are compared with the stored baseline; a benchmark more than `--tolerance`
+slower than its baseline is reported as a regression and the runner exits with status
+1. Scrape rates depend on the latency, so they are only compared with a baseline
+recorded at the same latency.
+"""
+import argparse, contextlib, io, json, os, sys, tempfile, time
+from benchmarks.bench_transform import generate_products
+from benchmarks.fake_site import FakeFashionStudio
+from utils.extract import PARSERS, parse_page, scrape_products
+from utils.load import CsvSink, ParquetSink, load_stream
+from utils.parsers import lxml_available
+from utils.transform import transform_and_clean_data
+
+DEFAULT_SCALES = [10, 50, 200]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_TOLERANCE = 0.4
+DEFAULT_LATENCY = 0.005
+DEFAULT_REPEAT = 7
+MIN_SECONDS = 0.5
+MAX_REPEAT = 200
+CARDS_PER_PAGE = 20
+MALFORMED_RATE = 0.05
+
+
+def best_rate(func, items, repeat=DEFAULT_REPEAT, min_seconds=MIN_SECONDS):
+    """Items per second of the fastest run, with the pipeline's prints silenced.
+
+    `func` runs at least `repeat` times and until the runs add up to `min_seconds`.
+    """
+    best = float("inf")
+    runs, total = 0, 0.0
+    while runs < repeat or (total < min_seconds and runs < MAX_REPEAT):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - start
+        best = min(best, seconds)
+        runs += 1
+        total += seconds
+    return items / best
+
+
+def bench_scrape(site, max_workers, repeat=DEFAULT_REPEAT):
+    # Every scrape waits out the site's latency, so the time floor would only add runs
+    return best_rate(lambda: scrape_products(site.url, delay=0, max_workers=max_workers), site.pages, repeat, 0)
+
+
+def bench_parse(site, parser, repeat=DEFAULT_REPEAT):
+    pages = list(site.catalog.values())
+    cards = site.pages * site.cards_per_page
+    return best_rate(lambda: [parse_page(page, parser) for page in pages], cards, repeat)
+
+
+def bench_transform(rows, repeat=DEFAULT_REPEAT):
+    data = generate_products(rows)
+    return best_rate(lambda: transform_and_clean_data(data), rows, repeat)
+
+
+def bench_sink(make_sink, df, chunk_size=500, repeat=DEFAULT_REPEAT):
+    chunks = [df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)]
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            report = load_stream(iter(chunks), [make_sink(directory)])
+            for result in report["sinks"].values():
+                if result["status"] != "ok":
+                    raise RuntimeError(result["error"])
+
+    return best_rate(run, len(df), repeat)
+
+
+def run_benchmarks(scales, latency=DEFAULT_LATENCY, error_rate=0.0, repeat=DEFAULT_REPEAT):
+    """{benchmark name: items per second} for every scale"""
+    results = {}
+    parsers = [parser for parser in PARSERS if parser != "lxml" or lxml_available()]
+    for pages in scales:
+        rows = pages * CARDS_PER_PAGE
+        with FakeFashionStudio(pages, CARDS_PER_PAGE, latency, error_rate, MALFORMED_RATE) as site:
+            results["scrape.sequential.{}p".format(pages)] = bench_scrape(site, 1, repeat)
+            results["scrape.concurrent.{}p".format(pages)] = bench_scrape(site, 8, repeat)
+            for parser in parsers:
+                results["parse.{}.{}p".format(parser, pages)] = bench_parse(site, parser, repeat)
+
+        results["transform.{}r".format(rows)] = bench_transform(rows, repeat)
+        df = transform_and_clean_data(generate_products(rows))
+        results["sink.csv.{}r".format(rows)] = bench_sink(
+            lambda directory: CsvSink(os.path.join(directory, "products.csv")), df, repeat=repeat
+        )
+        results["sink.parquet.{}r".format(rows)] = bench_sink(lambda directory: ParquetSink(directory), df,
+                                                              repeat=repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Names of the benchmarks that are more than `tolerance` slower than the baseline"""
+    return [
+        name for name, rate in results.items()
+        if name in baseline and rate < baseline[name] * (1 - tolerance)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="catalog sizes in pages")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help="seconds the fake site waits per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="minimum runs per benchmark")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scales, args.latency, args.error_rate, args.repeat)
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {"latency": args.latency, "results": {}}
+    # Baselines saved before the latency was recorded are flat and were measured without it
+    baseline = stored.get("results", stored)
+    recorded_latency = stored.get("latency", 0.0)
+    if recorded_latency != args.latency:
+        print("Baseline was recorded at {}s latency, not comparing scrape rates".format(recorded_latency))
+        baseline = {name: rate for name, rate in baseline.items() if not name.startswith("scrape.")}
+
+    regressions = compare(results, baseline, args.tolerance)
+    print("{:<28} {:>14} {:>14} {:>8}".format("benchmark", "items/s", "baseline", "change"))
+    for name, rate in results.items():
+        previous = baseline.get(name)
+        change = "{:+.0%}".format(rate / previous - 1) if previous else "-"
+        print("{:<28} {:>14,.0f} {:>14} {:>8}{}".format(
+            name, rate, "{:,.0f}".format(previous) if previous else "-", change,
+            "  REGRESSION" if name in regressions else "",
+        ))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency,
+                       "results": {name: round(rate, 1) for name, rate in results.items()}}, f, indent=2)
+            f.write("\n")
+        print("Baseline saved to {}".format(args.baseline))
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""The bench_pipeline benchmarks as a pytest-benchmark suite.
+
+Run from the repository root (pytest-benchmark must be installed):
+
+    python -m pytest benchmarks/bench_suite.py --benchmark-save=baseline
+    python -m pytest benchmarks/bench_suite.py --benchmark-compare --benchmark-compare-fail=mean:40%
+
+The file is not named test_*.py, so the regular `pytest` run never picks it up.
+"""
+import contextlib, io, os
+import pytest
+from benchmarks.bench_pipeline import DEFAULT_LATENCY
+from benchmarks.bench_transform import generate_products
+from benchmarks.fake_site import FakeFashionStudio
+from utils.extract import parse_page, scrape_products
+from utils.load import CsvSink, ParquetSink, load_stream
+from utils.parsers import lxml_available
+from utils.transform import transform_and_clean_data
+
+pytest.importorskip("pytest_benchmark")
+
+SCALES = [10, 50, 200]
+CARDS_PER_PAGE = 20
+PARSERS = ["bs4", pytest.param("lxml", marks=pytest.mark.skipif(not lxml_available(), reason="lxml not installed"))]
+
+
+@pytest.fixture(scope="module", params=SCALES, ids="{}p".format)
+def site(request):
+    with FakeFashionStudio(request.param, CARDS_PER_PAGE, latency=DEFAULT_LATENCY, malformed_rate=0.05) as site:
+        yield site
+
+
+def record_rate(benchmark, name, items):
+    """Store items/sec next to the timings; stats are missing with --benchmark-disable"""
+    if benchmark.stats:
+        benchmark.extra_info[name] = items / benchmark.stats.stats.mean
+
+
+def quietly(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.mark.parametrize("max_workers", [1, 8])
+def test_scrape(benchmark, site, max_workers):
+    products = benchmark(quietly, scrape_products, site.url, delay=0, max_workers=max_workers)
+    record_rate(benchmark, "pages_per_second", site.pages)
+    assert len(products) == site.pages * site.cards_per_page
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_parse(benchmark, site, parser):
+    pages = list(site.catalog.values())
+    benchmark(quietly, lambda: [parse_page(page, parser) for page in pages])
+    record_rate(benchmark, "cards_per_second", site.pages * site.cards_per_page)
+
+
+@pytest.mark.parametrize("rows", [scale * CARDS_PER_PAGE for scale in SCALES])
+def test_transform(benchmark, rows):
+    data = generate_products(rows)
+    benchmark(transform_and_clean_data, data)
+    record_rate(benchmark, "rows_per_second", rows)
+
+
+@pytest.mark.parametrize("sink", ["csv", "parquet"])
+@pytest.mark.parametrize("rows", [scale * CARDS_PER_PAGE for scale in SCALES])
+def test_sink(benchmark, tmp_path, sink, rows):
+    df = transform_and_clean_data(generate_products(rows))
+    chunks = [df.iloc[i:i + 500] for i in range(0, len(df), 500)]
+
+    def load():
+        if sink == "csv":
+            return load_stream(iter(chunks), [CsvSink(os.path.join(tmp_path, "products.csv"))])
+        return load_stream(iter(chunks), [ParquetSink(str(tmp_path))])
+
+    report = benchmark(load)
+    record_rate(benchmark, "rows_per_second", len(df))
+    assert all(result["status"] == "ok" for result in report["sinks"].values())
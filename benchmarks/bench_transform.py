@@ -0,0 +1,87 @@
+"""Benchmark transform_and_clean_data against the original chained implementation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transform [rows ...]
+
+For every size the two implementations are checked for identical output, then
+timed (best of a few runs) and measured for peak traced memory.
+"""
+import random, sys, time, tracemalloc
+import pandas as pd
+from utils.transform import transform_and_clean_data
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def legacy_transform_and_clean_data(data):
+    """The chained pandas implementation transform_and_clean_data replaced"""
+    df = pd.DataFrame(data)
+    df.drop_duplicates(inplace=True)
+    df.dropna(inplace=True)
+    df = df.drop(df[df["Title"] == "Unknown Product"].index)
+    df = df.drop(df[df["Price"] == "Price Unavailable"].index)
+    df["Price"] = df["Price"].str.replace("$", "", regex=False).astype(float)
+    df["Price"] = (df["Price"] * 16000).astype(float)
+    df = df[~df["Rating"].str.contains("Invalid|Not Rated", na=False)]
+    df["Rating"] = df["Rating"].str.extract(r'(\d+(?:\.\d+)?)').astype(float)
+    df["Colors"] = df["Colors"].str.extract(r'(\d+)').astype(int)
+    df["Size"] = df["Size"].str.replace("Size: ", "")
+    df["Gender"] = df["Gender"].str.replace("Gender: ", "")
+    return df
+
+
+def generate_products(rows, seed=42):
+    """Synthetic scraped products with the same shapes and failure modes as the site"""
+    rng = random.Random(seed)
+    kinds = ["T-shirt", "Hoodie", "Pants", "Outerwear", "Jacket", "Shirt", "Crewneck"]
+    timestamp = "2025-04-27T18:42:22.587022"
+    products = []
+    for i in range(rows):
+        roll = rng.random()
+        products.append({
+            "Title": "Unknown Product" if roll < 0.02 else "{} {}".format(rng.choice(kinds), i),
+            "Price": "Price Unavailable" if roll > 0.98 else "${:.2f}".format(rng.uniform(10, 500)),
+            "Rating": (
+                "Rating: ⭐ Invalid Rating / 5" if 0.02 <= roll < 0.04
+                else "Rating: Not Rated" if 0.04 <= roll < 0.05
+                else "Rating: ⭐ {:.1f} / 5".format(rng.uniform(1, 5))
+            ),
+            "Colors": None if 0.05 <= roll < 0.06 else "{} Colors".format(rng.randint(1, 8)),
+            "Size": "Size: {}".format(rng.choice(["XS", "S", "M", "L", "XL", "XXL"])),
+            "Gender": "Gender: {}".format(rng.choice(["Men", "Women", "Unisex"])),
+            "Timestamp": timestamp,
+        })
+    return products
+
+
+def measure(func, data, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(sizes):
+    print("{:>10} {:>12} {:>12} {:>14} {:>14}".format("rows", "legacy s", "current s", "legacy MiB", "current MiB"))
+    for rows in sizes:
+        data = generate_products(rows)
+        pd.testing.assert_frame_equal(transform_and_clean_data(data), legacy_transform_and_clean_data(data))
+
+        repeat = 1 if rows >= 1_000_000 else 3
+        legacy_time, legacy_peak = measure(legacy_transform_and_clean_data, data, repeat)
+        current_time, current_peak = measure(transform_and_clean_data, data, repeat)
+        print("{:>10} {:>12.3f} {:>12.3f} {:>14.1f} {:>14.1f}".format(
+            rows, legacy_time, current_time, legacy_peak / 2 ** 20, current_peak / 2 ** 20
+        ))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
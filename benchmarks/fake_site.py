@@ -0,0 +1,178 @@
+"""A local stand-in for https://fashion-studio.dicoding.dev used by the benchmarks.
+
+    with FakeFashionStudio(pages=50, cards_per_page=20) as site:
+        scrape_products(site.url, delay=0)
+
+Pages are generated once from a seed and served from memory at `/`, `/page2`, ...
+with the same card markup and pagination the real site uses, so every parser engine
+reads them exactly like the live catalog. `latency` delays every response,
+`error_rate` answers that share of requests with a 503 (and `Retry-After: 0`) and
+`malformed_rate` replaces that share of cards with the broken variants the site serves.
+"""
+import random, threading, time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KINDS = ["T-shirt", "Hoodie", "Pants", "Outerwear", "Jacket", "Shirt", "Crewneck"]
+SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+GENDERS = ["Men", "Women", "Unisex"]
+INFO = '<p style="font-size: 14px; color: #777;">{}</p>'
+
+CARD = """    <div class="collection-card">
+        <div style="position: relative;">
+            <img alt="{alt}" class="collection-image" src="https://picsum.photos/280/350?random=1"/>
+        </div>
+        <div class="product-details">
+            {title}
+            {price}
+            {infos}
+        </div>
+    </div>
+"""
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8"/>
+<title>Fashion Studio</title>
+</head>
+<body>
+<div class="container">
+  <h2>Our Collection</h2>
+  <div class="collection-grid" id="collectionList">
+{cards}  </div>
+  <ul class="pagination">
+{pagination}  </ul>
+</div>
+</body>
+</html>
+"""
+
+
+def render_card(rng, number, malformed=False):
+    """One product card; a malformed card is one of the broken variants the site serves"""
+    title = "{} {}".format(rng.choice(KINDS), number)
+    price = '<div class="price-container"><span class="price">${:.2f}</span></div>'.format(rng.uniform(10, 500))
+    infos = [
+        "Rating: ⭐ {:.1f} / 5".format(rng.uniform(1, 5)),
+        "{} Colors".format(rng.randint(1, 8)),
+        "Size: {}".format(rng.choice(SIZES)),
+        "Gender: {}".format(rng.choice(GENDERS)),
+    ]
+
+    title_html = '<h3 class="product-title">{}</h3>'.format(escape(title))
+    if malformed:
+        kind = rng.randrange(5)
+        if kind == 0:
+            title, title_html = "Unknown Product", '<h3 class="product-title">Unknown Product</h3>'
+        elif kind == 1:
+            price = '<p class="price">Price Unavailable</p>'
+        elif kind == 2:
+            infos[0] = rng.choice(["Rating: ⭐ Invalid Rating / 5", "Rating: Not Rated"])
+        elif kind == 3:
+            title, title_html, price = "None", "", ""
+        else:
+            infos = infos[:2]
+
+    return CARD.format(
+        alt=escape(title),
+        title=title_html,
+        price=price,
+        infos="\n            ".join(INFO.format(escape(info)) for info in infos),
+    )
+
+
+def render_pagination(page, pages):
+    items = ['<li class="page-item current"><span class="page-link">{}</span></li>'.format(page)]
+    if page < pages:
+        items.append('<li class="page-item"><a class="page-link" href="/page{0}">{0}</a></li>'.format(page + 1))
+        items.append('<li class="page-item next"><a class="page-link" href="/page{}">Next</a></li>'.format(page + 1))
+    return "".join("    {}\n".format(item) for item in items)
+
+
+def generate_pages(pages=10, cards_per_page=20, malformed_rate=0.0, seed=42):
+    """{path: page bytes} of a whole generated catalog"""
+    rng = random.Random(seed)
+    catalog = {}
+    for page in range(1, pages + 1):
+        cards = "".join(
+            render_card(rng, (page - 1) * cards_per_page + i + 1, rng.random() < malformed_rate)
+            for i in range(cards_per_page)
+        )
+        html = PAGE.format(cards=cards, pagination=render_pagination(page, pages))
+        catalog["/" if page == 1 else "/page{}".format(page)] = html.encode("utf-8")
+    return catalog
+
+
+class FakeFashionStudio:
+    """Serve a generated catalog on 127.0.0.1 from a background thread"""
+
+    def __init__(self, pages=10, cards_per_page=20, latency=0.0, error_rate=0.0, malformed_rate=0.0,
+                 seed=42, port=0):
+        self.pages = pages
+        self.cards_per_page = cards_per_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.catalog = generate_pages(pages, cards_per_page, malformed_rate, seed)
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                with site._lock:
+                    site.requests += 1
+                    fail = site.error_rate and site._rng.random() < site.error_rate
+                    site.errors += bool(fail)
+
+                body = site.catalog.get(self.path.rstrip("/") or "/")
+                if fail:
+                    self._send(503, b"Service Unavailable", {"Retry-After": "0"})
+                elif body is None:
+                    self._send(404, b"Not Found")
+                else:
+                    self._send(200, body, {"Content-Type": "text/html; charset=utf-8"})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-fashion-studio", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,23 +1,315 @@
-from utils.extract import scrape_products
-from utils.transform import transform_and_clean_data
-from utils.load import load_to_csv, load_to_google_sheets, load_to_postgresql
-
-URL = 'https://fashion-studio.dicoding.dev'
-filename = "products.csv"
-spreadsheet_id = "1dLOqZyBfcn_p2yVBI8KC3pFlDkF7FMOuTyXWZbFBRVs"
-
-username = "developer"
-password = "supersecretpassword"
-host = "localhost"
-port = "5432"
-db_name = "productsdb"
-URL_DB = f'postgresql+psycopg2://{username}:{password}@{host}:{port}/{db_name}'
-
-all_products = scrape_products(URL)
-
-if all_products:
-    df = transform_and_clean_data(all_products)
-    
-    load_to_csv(filename, df)
-    load_to_google_sheets(spreadsheet_id, df)
-    load_to_postgresql(URL_DB, df)
\ No newline at end of file
+"""Fashion Studio ETL pipeline.
+
+    python main.py                                # scrape, clean and load into every sink
+    python main.py --sinks csv                    # CSV output only
+    python main.py --stage extract                # scrape into products_raw.jsonl only
+    python main.py --schedule "0 */6 * * *"       # keep running on a cron schedule
+    python main.py --replay                       # reload dead letters without scraping
+
+Stage and sink modules are imported only when used, so a CSV-only or extract-only run
+never loads the Google API client, SQLAlchemy or pyarrow.
+"""
+import argparse, json, os
+from utils.config import SINKS, STAGES, load_config
+
+
+def iter_pages(config, checkpoint=None, as_batch=False, crawl=None):
+    """Products of every listing page: of config["url"], or of all config["sources"] crawled together.
+
+    The CrawlStatus `crawl` is marked complete once the whole catalog has been crawled.
+    """
+    if config["sources"]:
+        from utils.sources import crawl_sources, make_source
+        sources = [make_source(spec, config["rate_limit"]) for spec in config["sources"]]
+        for _, page_products in crawl_sources(sources, as_batch, page_index_path=config["page_index_path"],
+                                              crawl=crawl):
+            yield page_products
+        return
+
+    from utils.extract import iter_product_pages
+    from utils.page_index import PageIndex
+    page_index = PageIndex(config["url"], config["page_index_path"]) if config["page_index_path"] else None
+    try:
+        yield from iter_product_pages(config["url"], max_workers=config["max_workers"],
+                                      rate_limit=config["rate_limit"], checkpoint=checkpoint, as_batch=as_batch,
+                                      page_index=page_index, crawl=crawl)
+    finally:
+        if page_index is not None:
+            page_index.close()
+
+
+def new_checkpoint(config):
+    """A scrape checkpoint for a single-url run; multi-source runs are not checkpointed"""
+    if config["sources"]:
+        return None
+    from utils.checkpoint import ScrapeCheckpoint
+    return ScrapeCheckpoint(config["url"])
+
+
+def open_quarantine(config, mode="replace"):
+    from utils.load import CsvSink
+    return CsvSink(config["quarantine_filename"], mode)
+
+
+def iter_chunks(config, crawl=None):
+    """Cleaned DataFrame chunks of the whole catalog, the checkpoint to close afterwards and the quarantine sink"""
+    from utils.quality import load_rules
+    url = config["url"]
+    rules = load_rules(config["rules_file"])
+    quarantine = open_quarantine(config)
+    if config["parse_processes"] and not config["sources"]:
+        from utils.parallel import iter_transformed_pages_parallel
+        chunks = iter_transformed_pages_parallel(url, config["parse_processes"], config["chunk_size"],
+                                                 max_workers=config["max_workers"], rate_limit=config["rate_limit"],
+                                                 rules=rules, quarantine=quarantine.write, crawl=crawl)
+        return chunks, None, quarantine
+
+    from utils.transform import iter_transformed_chunks
+    checkpoint = new_checkpoint(config)
+    pages = iter_pages(config, checkpoint, as_batch=True, crawl=crawl)
+    chunks = iter_transformed_chunks(pages, chunk_size=config["chunk_size"], rules=rules, quarantine=quarantine.write)
+    return chunks, checkpoint, quarantine
+
+
+def close_chunks(chunks, checkpoint, quarantine, completed=True):
+    """Close the chunks and the scrape checkpoint, then commit the quarantined rows.
+
+    A stale quarantine file is removed when no row was quarantined. After a failed run
+    (`completed=False`) the quarantine is aborted and the previous file left as it was.
+    """
+    chunks.close()
+    if checkpoint is not None:
+        checkpoint.close()
+    if not completed:
+        quarantine.abort()
+    elif quarantine.rows:
+        quarantine.close()
+        print(f"{quarantine.rows} rejected rows written to {quarantine.filename}")
+    else:
+        quarantine.abort()
+        if os.path.exists(quarantine.filename):
+            os.remove(quarantine.filename)
+
+
+def build_sinks(config, crawl=None, add_only=False):
+    """The load_stream sinks named in config["sinks"], and the snapshot sink if selected.
+
+    The snapshot is only committed if the CrawlStatus `crawl`, when given, is complete.
+    Multi-source runs key upserts and snapshot diffs on the Source column as well. With
+    `add_only`, every sink only adds rows: CSV is appended to, Sheets rows are appended
+    below the existing ones and PostgreSQL inserts products it does not have yet.
+    """
+    from utils import load
+    key_columns = load.SOURCE_KEY_COLUMNS if config["sources"] else load.DEFAULT_KEY_COLUMNS
+    factories = {
+        "csv": lambda: load.CsvSink(config["csv_filename"], "append" if add_only else config["csv_mode"],
+                                    config["csv_compression"], config["csv_buffer_size"]),
+        "parquet": lambda: load.ParquetSink(config["parquet_directory"]),
+        "sheets": lambda: load.GoogleSheetsSink(config["spreadsheet_id"], mode="add" if add_only else "sync"),
+        "postgresql": lambda: load.PostgreSQLSink(config["database_url"], method="add" if add_only else "upsert",
+                                                     key_columns=key_columns),
+    }
+    sinks, snapshot_sink = [], None
+    for name in config["sinks"]:
+        if name == "snapshot":
+            from utils.snapshot import SnapshotSink, SnapshotStore
+            snapshot_sink = SnapshotSink(SnapshotStore(config["snapshot_directory"], key_columns), crawl=crawl)
+            sinks.append(snapshot_sink)
+        else:
+            sinks.append(factories[name]())
+    return sinks, snapshot_sink
+
+
+def run_extract(config):
+    """Scrape the catalog into a JSON-lines file of raw products"""
+    checkpoint = new_checkpoint(config)
+    products = 0
+    try:
+        with open(config["raw_filename"], "w", encoding="utf-8") as f:
+            for page_products in iter_pages(config, checkpoint):
+                for product in page_products:
+                    f.write(json.dumps(product, ensure_ascii=False) + "\n")
+                    products += 1
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    print(f"{products} products written to {config['raw_filename']}")
+
+
+def run_transform(config):
+    """Scrape and clean the catalog without loading it anywhere"""
+    chunks, checkpoint, quarantine = iter_chunks(config)
+    completed = False
+    try:
+        rows = sum(len(chunk) for chunk in chunks)
+        completed = True
+    finally:
+        close_chunks(chunks, checkpoint, quarantine, completed)
+    print(f"{rows} clean rows")
+
+
+def run_load(config):
+    """Scrape, clean and load the catalog into the selected sinks"""
+    from utils.dead_letter import get_dead_letters
+    from utils.extract import CrawlStatus
+    from utils.load import load_stream, load_to_csv
+    crawl = CrawlStatus()
+    chunks, checkpoint, quarantine = iter_chunks(config, crawl)
+    completed = False
+    try:
+        sinks, snapshot_sink = build_sinks(config, crawl)
+        report = load_stream(chunks, sinks, timeout=config["sink_timeout"], dead_letters=get_dead_letters())
+        print(json.dumps(report, indent=2))
+        completed = True
+    finally:
+        close_chunks(chunks, checkpoint, quarantine, completed)
+
+    if snapshot_sink is not None and snapshot_sink.changes is not None:
+        load_to_csv(config["changes_filename"], snapshot_sink.changes)
+
+
+def build_sink(config, name):
+    sinks, _ = build_sinks(dict(config, sinks=[name]))
+    return sinks[0]
+
+
+def card_replay_sinks(config):
+    """Sinks for recovered cards, which only add rows to what is loaded: no snapshot, see build_sinks"""
+    sinks, _ = build_sinks(dict(config, sinks=[name for name in config["sinks"] if name != "snapshot"]),
+                           add_only=True)
+    return sinks
+
+
+def run_replay(config):
+    """Load the dead letters again without scraping.
+
+    Chunks a sink failed to write go to that sink only, one load run at a time and in the
+    sink's normal mode; a sink that commits on close has the whole run stored, so e.g. a
+    replace-mode CSV is rebuilt complete. A sink that replaces its output only gets its
+    latest stored run, as it would overwrite the older ones anyway; runs a later
+    successful load superseded are already gone. Snapshots are never replayed: a
+    replayed run would become the latest snapshot without a complete crawl behind it.
+    Stored cards are parsed again and the ones that now parse completely are cleaned and
+    appended to every sink; they are kept for the next replay unless every sink took
+    them. Items that are loaded are removed from the store; the rest stay for the next
+    replay.
+    """
+    from utils.dead_letter import get_dead_letters
+    from utils.extract import parse_card
+    from utils.load import load_stream
+    from utils.quality import load_rules
+    from utils.transform import iter_transformed_chunks
+    store = get_dead_letters()
+    if store is None:
+        print("Dead letters are disabled, set dead_letter_path to replay")
+        return
+
+    for name in config["sinks"]:
+        sink = build_sink(config, name)
+        sink_name = type(sink).__name__
+        runs = store.runs(sink_name)
+        if name == "snapshot" or getattr(sink, "replaces_output", False):
+            stale = runs if name == "snapshot" else runs[:-1]
+            runs = [run for run in runs if run not in stale]
+            for run in stale:
+                store.remove(store.ids("chunk", sink_name, run))
+            if stale:
+                print(f"Dropped {len(stale)} stored runs of {sink_name} that are not replayed")
+        for run in runs:
+            ids = store.ids("chunk", sink_name, run)
+            report = load_stream((store.chunk(id_) for id_ in ids), [build_sink(config, name)])["sinks"][sink_name]
+            if report["status"] == "ok":
+                store.remove(ids)
+            print(f"Replayed {len(ids)} chunks of run {run} into {sink_name}: {report['status']}, "
+                  f"{report['rows']} rows")
+
+    recovered, batches = [], []
+    for id_, page_url, reason, html in store.cards():
+        products, still_failing = parse_card(html)
+        if not still_failing:
+            recovered.append(id_)
+            batches.append(products)
+    if batches:
+        quarantine = open_quarantine(config, mode="append")
+        chunks = iter_transformed_chunks(batches, chunk_size=config["chunk_size"],
+                                         rules=load_rules(config["rules_file"]), quarantine=quarantine.write)
+        report = load_stream(chunks, card_replay_sinks(config))
+        if all(sink["status"] == "ok" for sink in report["sinks"].values()):
+            store.remove(recovered)
+        else:
+            recovered = []
+        if quarantine.rows:
+            quarantine.close()
+            print(f"{quarantine.rows} rejected rows appended to {quarantine.filename}")
+        else:
+            quarantine.abort()
+        print(json.dumps(report, indent=2))
+    print(f"Recovered {len(recovered)} cards, dead letters left: {store.summary()}")
+
+
+def run_pipeline(config):
+    """One run of the pipeline up to config["stage"], with run metrics"""
+    from utils.metrics import finish_run, set_gauge, start_run
+    from utils.session import session_stats
+    profile_directory = config["profile_directory"]
+    start_run(profile_dir=profile_directory, trace_memory=profile_directory is not None)
+
+    {"extract": run_extract, "transform": run_transform, "load": run_load}[config["stage"]](config)
+
+    print(f"HTTP session stats: {session_stats()}")
+    for name, value in session_stats().items():
+        set_gauge("http_" + name, value)
+    finish_run(json_path=config["run_report_filename"], prometheus_path=config["prometheus_filename"])
+    print(f"Run metrics written to {config['run_report_filename']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="JSON file overriding the defaults in utils/config.py")
+    parser.add_argument("--stage", choices=STAGES, help="run up to this stage (default: load)")
+    parser.add_argument("--sinks", type=lambda value: value.split(","),
+                        help="comma-separated sinks to load, from: {}".format(",".join(SINKS)))
+    parser.add_argument("--schedule", help='keep running on a cron expression, e.g. "0 */6 * * *"')
+    parser.add_argument("--interval", type=float, help="keep running every INTERVAL seconds")
+    parser.add_argument("--jitter", type=float, help="add up to JITTER random seconds to every scheduled start")
+    parser.add_argument("--run-now", action="store_true", help="with a schedule, also run once at startup")
+    parser.add_argument("--replay", action="store_true",
+                        help="load the stored dead letters again instead of scraping, then exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(args.config, {
+        "stage": args.stage, "sinks": args.sinks,
+        "schedule": args.schedule, "interval": args.interval, "jitter": args.jitter,
+    })
+
+    from utils.cache import configure_cache
+    from utils.dead_letter import configure_dead_letters
+    from utils.scheduler import RunLock, make_schedule, run_scheduler
+    from utils.session import configure_session
+
+    # Set up once, so a scheduled process reuses its HTTP pool and database engines between runs
+    configure_session(pool_size=config["max_workers"])
+    configure_cache(config["cache_directory"])
+    configure_dead_letters(config["dead_letter_path"])
+    lock = RunLock(config["lock_path"])
+
+    schedule = make_schedule(config["schedule"], config["interval"])
+    if schedule is None or args.replay:
+        if not lock.acquire():
+            print(f"Another pipeline run holds {config['lock_path']}, exiting")
+            return 1
+        try:
+            (run_replay if args.replay else run_pipeline)(config)
+        finally:
+            lock.release()
+        return 0
+
+    run_scheduler(lambda: run_pipeline(config), schedule, lock, jitter=config["jitter"] or 0, run_now=args.run_now)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from benchmarks.fake_site import generate_pages
+from tests.test_parsers import ENGINES
+from utils.batch import ProductBatch, batches_to_frame
+from utils.extract import parse_page
+from utils.transform import iter_transformed_chunks, transform_and_clean_data
+
+PRODUCT = {"Title": "Shirt 1", "Price": "$10.00", "Rating": "Rating: ⭐ 4.5 / 5", "Colors": "3 Colors",
+           "Size": "Size: M", "Gender": "Gender: Men", "Timestamp": "2025-01-01T00:00:00"}
+
+def test_batch_round_trip():
+    """Test a batch built from product dicts yields the same dicts back"""
+    products = [PRODUCT, dict(PRODUCT, Title="Shirt 2")]
+    batch = ProductBatch.from_products(products)
+
+    assert len(batch) == 2
+    assert list(batch) == products
+    assert list(batch.take([1])) == products[1:]
+
+def test_batches_to_frame_matches_dicts():
+    """Test a frame built from batches equals the one built from the dicts"""
+    first = ProductBatch.from_products([PRODUCT, dict(PRODUCT, Title=None)])
+    second = ProductBatch.from_products([dict(PRODUCT, Title="Hat", Timestamp="2025-01-01T00:00:01")])
+
+    pd.testing.assert_frame_equal(batches_to_frame([first, second]), pd.DataFrame(list(first) + list(second)))
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parse_page_as_batch(engine):
+    """Test both parser engines fill a batch with the same products and one timestamp per page"""
+    content = generate_pages(pages=1, cards_per_page=10, malformed_rate=0.3)["/"]
+
+    products, has_next = parse_page(content, parser=engine)
+    batch, batch_has_next = parse_page(content, parser=engine, as_batch=True)
+
+    assert len({product["Timestamp"] for product in products}) == 1
+    assert [dict(p, Timestamp=None) for p in batch] == [dict(p, Timestamp=None) for p in products]
+    assert batch_has_next == has_next
+
+def test_transform_accepts_batches():
+    """Test transform_and_clean_data gives the same frame for batches and dicts"""
+    pages = [parse_page(content, as_batch=True)[0]
+             for content in generate_pages(pages=3, cards_per_page=10, malformed_rate=0.3).values()]
+    products = [product for batch in pages for product in batch]
+
+    pd.testing.assert_frame_equal(transform_and_clean_data(pages), transform_and_clean_data(products))
+
+def test_iter_transformed_chunks_with_batches():
+    """Test chunking batch pages gives the same rows as chunking dict pages, duplicates included"""
+    pages = [parse_page(content, as_batch=True)[0]
+             for content in generate_pages(pages=4, cards_per_page=10, malformed_rate=0.3).values()]
+    pages.append(pages[0])
+
+    from_batches = pd.concat(iter_transformed_chunks(pages, chunk_size=15), ignore_index=True)
+    from_dicts = pd.concat(iter_transformed_chunks([list(batch) for batch in pages], chunk_size=15),
+                           ignore_index=True)
+
+    pd.testing.assert_frame_equal(from_batches, from_dicts)
@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import patch, Mock
+from utils.cache import ResponseCache, configure_cache
+from utils.extract import fetching_url_content
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "http"), max_bytes=1000, ttl=60)
+
+@pytest.fixture
+def enabled_cache(tmp_path):
+    cache = configure_cache(str(tmp_path / "http"))
+    yield cache
+    configure_cache(enabled=False)
+
+def make_response(status_code, content=b"", headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.content = content
+    response.headers = headers or {}
+    return response
+
+def test_store_and_validators(cache):
+    """Test validators of a stored response are turned into conditional headers"""
+    cache.store("https://test.com", b"<html></html>", {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    assert cache.validators("https://test.com") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert cache.load("https://test.com") == b"<html></html>"
+
+def test_store_skips_responses_without_validators(cache):
+    """Test responses that cannot be revalidated are not cached"""
+    cache.store("https://test.com", b"<html></html>", {})
+
+    assert cache.validators("https://test.com") == {}
+
+def test_cache_survives_restart(cache):
+    """Test entries are reloaded from disk by a new cache instance"""
+    cache.store("https://test.com", b"body", {"ETag": '"abc"'})
+
+    reopened = ResponseCache(cache.directory, max_bytes=1000, ttl=60)
+
+    assert reopened.load("https://test.com") == b"body"
+
+def test_expired_entries_are_dropped(cache):
+    """Test entries older than the TTL are not revalidated"""
+    cache.store("https://test.com", b"body", {"ETag": '"abc"'})
+
+    with patch("utils.cache.time.time", return_value=10 ** 12):
+        assert cache.validators("https://test.com") == {}
+    assert cache.load("https://test.com") is None
+
+def test_lru_eviction(cache):
+    """Test the least recently used entry is evicted once the size cap is exceeded"""
+    cache.store("https://test.com/page1", b"a" * 400, {"ETag": '"1"'})
+    cache.store("https://test.com/page2", b"b" * 400, {"ETag": '"2"'})
+    cache.load("https://test.com/page1")
+    cache.store("https://test.com/page3", b"c" * 400, {"ETag": '"3"'})
+
+    assert cache.validators("https://test.com/page2") == {}
+    assert cache.validators("https://test.com/page1") == {"If-None-Match": '"1"'}
+    assert cache.stats["evictions"] == 1
+
+@patch("utils.session.requests.Session.get")
+def test_fetching_url_content_serves_not_modified_from_cache(mock_get, enabled_cache):
+    """Test a 304 response is answered from the cache after a conditional request"""
+    mock_get.side_effect = [
+        make_response(200, b"<html>catalog</html>", {"ETag": '"v1"'}),
+        make_response(304),
+    ]
+
+    first = fetching_url_content("https://test.com")
+    second = fetching_url_content("https://test.com")
+
+    assert first == second == b"<html>catalog</html>"
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert enabled_cache.stats["hits"] == 1
+
+@patch("utils.session.requests.Session.get")
+def test_fetching_url_content_bypass_cache(mock_get, enabled_cache):
+    """Test bypass_cache sends an unconditional request"""
+    enabled_cache.store("https://test.com", b"old", {"ETag": '"v1"'})
+    mock_get.return_value = make_response(200, b"new")
+
+    content = fetching_url_content("https://test.com", bypass_cache=True)
+
+    assert content == b"new"
+    assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
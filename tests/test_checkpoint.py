@@ -0,0 +1,101 @@
+import pytest
+import requests
+from unittest.mock import patch
+from utils.checkpoint import ScrapeCheckpoint
+from utils.extract import CrawlStatus, iter_product_pages
+
+def page_html(title, has_next):
+    next_link = '<a class="page-link" href="#">Next</a>' if has_next else ''
+    return """
+    <html><body>
+        <div class="collection-card"><h3 class="product-title">{}</h3></div>
+        {}
+    </body></html>
+    """.format(title, next_link).encode('utf-8')
+
+PAGES = {
+    "https://test.com": page_html("Product 1", True),
+    "https://test.com/page2": page_html("Product 2", True),
+    "https://test.com/page3": page_html("Product 3", False),
+}
+
+def fake_site(broken=()):
+    fetched = []
+
+    def fetch(url, raise_errors=False):
+        fetched.append(url)
+        if url in broken:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return PAGES.get(url)
+
+    return fetch, fetched
+
+def titles(pages):
+    return [product["Title"] for products in pages for product in products]
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    checkpoint = ScrapeCheckpoint("https://test.com", path=str(tmp_path / "checkpoint.sqlite3"), max_attempts=2)
+    yield checkpoint
+    checkpoint.close()
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_rerun_resumes_from_first_missing_page(checkpoint, max_workers):
+    """Test a failed crawl keeps completed pages and the rerun only fetches the rest"""
+    fetch, _ = fake_site(broken={"https://test.com/page2"})
+    with patch("utils.extract.fetching_url_content", side_effect=fetch):
+        first = list(iter_product_pages("https://test.com", delay=0, max_workers=max_workers, checkpoint=checkpoint))
+
+    assert titles(first) == ["Product 1"]
+    assert checkpoint.completed_pages()[0] == 1
+    assert list(checkpoint.failed_pages()) == [2]
+
+    fetch, fetched = fake_site()
+    with patch("utils.extract.fetching_url_content", side_effect=fetch):
+        second = list(iter_product_pages("https://test.com", delay=0, max_workers=max_workers, checkpoint=checkpoint))
+
+    assert titles(second) == ["Product 1", "Product 2", "Product 3"]
+    assert "https://test.com" not in fetched
+    assert checkpoint.completed_pages() == []
+    assert checkpoint.failed_pages() == {}
+
+def test_page_is_skipped_after_max_attempts(checkpoint):
+    """Test a page that keeps failing stops blocking the crawl after max_attempts"""
+    fetch, _ = fake_site(broken={"https://test.com/page2"})
+    with patch("utils.extract.fetching_url_content", side_effect=fetch):
+        for _ in range(2):
+            list(iter_product_pages("https://test.com", delay=0, checkpoint=checkpoint))
+        pages = list(iter_product_pages("https://test.com", delay=0, checkpoint=checkpoint))
+
+    assert titles(pages) == ["Product 1", "Product 3"]
+
+def test_skipped_page_leaves_crawl_incomplete(checkpoint):
+    """Test a crawl past a skipped page is not complete and keeps the page's failure record"""
+    fetch, _ = fake_site(broken={"https://test.com/page2"})
+    crawl = CrawlStatus()
+    with patch("utils.extract.fetching_url_content", side_effect=fetch):
+        for _ in range(2):
+            list(iter_product_pages("https://test.com", delay=0, checkpoint=checkpoint))
+        pages = list(iter_product_pages("https://test.com", delay=0, checkpoint=checkpoint, crawl=crawl))
+
+    assert titles(pages) == ["Product 1", "Product 3"]
+    assert not crawl.complete
+    assert checkpoint.completed_pages() == []
+    assert checkpoint.failed_pages()[2][0] == 1
+
+    fetch, _ = fake_site()
+    crawl = CrawlStatus()
+    with patch("utils.extract.fetching_url_content", side_effect=fetch):
+        pages = list(iter_product_pages("https://test.com", delay=0, checkpoint=checkpoint, crawl=crawl))
+
+    assert titles(pages) == ["Product 1", "Product 2", "Product 3"]
+    assert crawl.complete and checkpoint.failed_pages() == {}
+
+def test_checkpoint_persists_across_instances(checkpoint):
+    """Test completed pages survive reopening the checkpoint database"""
+    checkpoint.mark_done(1, [{"Title": "Product 1"}], True)
+
+    reopened = ScrapeCheckpoint("https://test.com", path=checkpoint.path)
+
+    assert reopened.get(1) == ([{"Title": "Product 1"}], True)
+    assert ScrapeCheckpoint("https://other.com", path=checkpoint.path).get(1) is None
@@ -0,0 +1,159 @@
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+import main
+from utils.dead_letter import DeadLetterStore, configure_dead_letters
+from utils.extract import parse_card, parse_listing_page, parse_page
+from utils.config import load_config
+from utils.load import CsvSink, load_stream
+
+BROKEN_CARD = (
+    '<div class="collection-card"><div class="product-details">'
+    '<div class="price-container"><span class="price">$10.00</span></div>'
+    '<p style="font-size: 14px; color: #777;">Rating: ⭐ 4.0 / 5</p>'
+    '</div></div>'
+)
+
+@pytest.fixture
+def store(tmp_path):
+    dead_letters = configure_dead_letters(str(tmp_path / "dead_letters.sqlite3"))
+    yield dead_letters
+    configure_dead_letters(enabled=False)
+
+@pytest.mark.parametrize("parser", ["lxml", "bs4"])
+def test_parser_reports_cards_with_placeholders(parser):
+    """Test a card missing its title and details is reported with its html and reasons"""
+    dead_letters = []
+    products, _ = parse_page("<html><body>{}</body></html>".format(BROKEN_CARD), parser, True, dead_letters)
+
+    assert list(products)[0]["Title"] == "Title Unavailable"
+    assert len(dead_letters) == 1
+    reasons, html = dead_letters[0]
+    assert reasons == "missing_title,missing_details"
+    assert "$10.00" in html and parse_card(html, parser)[1] == ["missing_title", "missing_details"]
+
+def test_listing_page_stores_failed_cards(store):
+    """Test parse failures of a page land in the configured store under the page url"""
+    parse_listing_page("<html><body>{}</body></html>".format(BROKEN_CARD), None, "https://test.com/page3")
+
+    cards = store.cards()
+    assert [(page_url, reason) for _, page_url, reason, _ in cards] == [
+        ("https://test.com/page3", "missing_title,missing_details")]
+    assert store.summary() == {"card": {"missing_title,missing_details": 1}}
+
+def chunks(count=4):
+    return [pd.DataFrame({"Title": ["T-shirt {}".format(i)], "Price": [float(i)]}) for i in range(count)]
+
+def test_failed_sink_chunks_are_dead_lettered(tmp_path):
+    """Test the chunk a per-chunk sink failed on and every later chunk are stored for that sink only"""
+    store = DeadLetterStore(str(tmp_path / "dead_letters.sqlite3"))
+    failing_sink = MagicMock(commits_on_close=False)
+    failing_sink.write.side_effect = [None, Exception("database down")]
+
+    report = load_stream(chunks(), [failing_sink, CsvSink(str(tmp_path / "output.csv"))], dead_letters=store)
+
+    assert report["sinks"]["MagicMock"]["status"] == "failed"
+    ids = store.ids("chunk", "MagicMock")
+    assert [store.chunk(id_)["Title"][0] for id_ in ids] == ["T-shirt 1", "T-shirt 2", "T-shirt 3"]
+    assert store.summary() == {"chunk": {"MagicMock": 3}}
+    store.close()
+
+def test_sink_failing_on_close_dead_letters_the_whole_run(tmp_path):
+    """Test a sink that only commits on close gets every chunk of the run stored when close fails"""
+    store = DeadLetterStore(str(tmp_path / "dead_letters.sqlite3"))
+    sink = MagicMock(commits_on_close=True)
+    sink.close.side_effect = Exception("quota exceeded")
+
+    report = load_stream(chunks(), [sink], dead_letters=store)
+
+    assert report["sinks"]["MagicMock"]["status"] == "failed"
+    assert [store.chunk(id_)["Title"][0] for id_ in store.ids("chunk", "MagicMock")] == [
+        "T-shirt 0", "T-shirt 1", "T-shirt 2", "T-shirt 3"]
+    assert store.ids("spool") == []
+    store.close()
+
+def test_replace_mode_csv_is_replayed_complete(tmp_path, store):
+    """Test a replace-mode CSV failing mid-run is dead-lettered whole and replayed as the full new file"""
+    file_path = tmp_path / "products.csv"
+    pd.DataFrame({"Title": ["Old"], "Price": [1.0]}).to_csv(file_path, index=False)
+    sink = CsvSink(str(file_path))
+    written = []
+
+    def write(df):
+        if len(written) == 2:
+            raise OSError("disk full")
+        written.append(df)
+        CsvSink.write(sink, df)
+
+    sink.write = write
+
+    load_stream(chunks(), [sink], dead_letters=store)
+    assert list(pd.read_csv(file_path)["Title"]) == ["Old"]
+    assert store.summary() == {"chunk": {"CsvSink": 4}}
+
+    config = load_config(overrides={"sinks": ["csv"], "csv_filename": str(file_path)}, environ={})
+    main.run_replay(config)
+
+    assert list(pd.read_csv(file_path)["Title"]) == ["T-shirt 0", "T-shirt 1", "T-shirt 2", "T-shirt 3"]
+    assert store.summary() == {}
+
+def test_replay_loads_dead_letters_without_scraping(tmp_path, store, monkeypatch):
+    """Test replay loads failed CSV chunks, appends fixed cards and keeps the cards that still fail"""
+    monkeypatch.setattr("utils.extract.fetching_url_content", MagicMock(side_effect=AssertionError("no network")))
+    config = load_config(overrides={"sinks": ["csv"], "csv_filename": str(tmp_path / "products.csv"),
+                                    "quarantine_filename": str(tmp_path / "quarantine.csv")}, environ={})
+    chunk = pd.DataFrame({"Title": ["Crewneck 7"], "Price": [160000.0], "Rating": [4.5], "Colors": [3],
+                          "Size": ["M"], "Gender": ["Men"], "Timestamp": ["2025-04-27T08:00:00"]})
+    store.add_chunk("CsvSink", "sink_failed", chunk, "OSError: disk full")
+    fixed_card = BROKEN_CARD.replace('<div class="product-details">',
+                                     '<div class="product-details"><h3 class="product-title">Hoodie 3</h3>')
+    fixed_card = fixed_card.replace("</div></div>", "".join(
+        '<p style="font-size: 14px; color: #777;">{}</p>'.format(info)
+        for info in ("3 Colors", "Size: L", "Gender: Women")) + "</div></div>")
+    store.add_cards("https://test.com/page2", [("missing_title,missing_details", fixed_card),
+                                               ("missing_title,missing_details", BROKEN_CARD)])
+
+    main.run_replay(config)
+
+    df = pd.read_csv(config["csv_filename"])
+    assert list(df["Title"]) == ["Crewneck 7", "Hoodie 3"]
+    assert list(df["Price"]) == [160000.0, 160000.0]
+    assert store.summary() == {"card": {"missing_title,missing_details": 1}}
+
+def test_card_replay_sinks_only_add_rows(tmp_path):
+    """Test recovered cards go to sinks that add rows, never to a replacing or syncing one"""
+    config = load_config(overrides={"sinks": ["csv", "sheets", "postgresql", "snapshot"],
+                                    "csv_filename": str(tmp_path / "products.csv")}, environ={})
+
+    csv_sink, sheets_sink, postgresql_sink = main.card_replay_sinks(config)
+
+    assert (csv_sink.mode, sheets_sink.mode, postgresql_sink.method) == ("append", "add", "add")
+
+def test_successful_replacing_run_supersedes_stored_runs(tmp_path, store):
+    """Test a replace-mode CSV that loads fine drops the runs stored for it by earlier failed loads"""
+    file_path = str(tmp_path / "products.csv")
+    failing = CsvSink(file_path)
+    failing.close = MagicMock(side_effect=OSError("disk full"))
+    load_stream(chunks(), [failing], dead_letters=store)
+    assert store.summary() == {"chunk": {"CsvSink": 4}}
+
+    report = load_stream(chunks(2), [CsvSink(file_path)], dead_letters=store)
+
+    assert report["sinks"]["CsvSink"]["status"] == "ok"
+    assert store.summary() == {}
+
+def test_replay_skips_snapshots_and_older_runs_of_replacing_sinks(tmp_path, store):
+    """Test only the latest run of a replace-mode CSV is replayed and snapshot runs are dropped"""
+    old, new = chunks(2)
+    store.add_chunk("CsvSink", "sink_failed", old, run="run-1")
+    store.add_chunk("CsvSink", "sink_failed", new, run="run-2")
+    store.add_chunk("SnapshotSink", "sink_failed", new, run="run-2")
+    snapshot_directory = tmp_path / "snapshots"
+    config = load_config(overrides={"sinks": ["csv", "snapshot"], "csv_filename": str(tmp_path / "products.csv"),
+                                    "snapshot_directory": str(snapshot_directory)}, environ={})
+
+    main.run_replay(config)
+
+    assert list(pd.read_csv(config["csv_filename"])["Title"]) == ["T-shirt 1"]
+    assert not (snapshot_directory / "manifest.json").exists()
+    assert store.summary() == {}
@@ -2,7 +2,10 @@ import unittest
 from unittest.mock import patch, Mock
 import requests
 from bs4 import BeautifulSoup
-from utils.extract import fetching_url_content, scrape_products,parse_product_details
+from utils.extract import (
+    fetching_url_content, scrape_products, parse_product_details,
+    scrape_products_concurrently, build_page_url, RateLimiter, iter_product_pages
+)
 
 class TestExtractFunctions(unittest.TestCase):
 
@@ -266,4 +269,75 @@ class TestExtractFunctions(unittest.TestCase):
         mock_beautifulsoup.return_value = mock_soup
 
         products = scrape_products("https://test.com", start_page=1, delay=0)
-        self.assertEqual(products, [])
\ No newline at end of file
+        self.assertEqual(products, [])
+
+    @patch("utils.extract.fetching_url_content")
+    def test_scrape_products_concurrently_keeps_page_order(self, mock_fetching_url_content):
+        """Test concurrent scraping returns products in page order and stops after the last page."""
+        def page_html(page, has_next):
+            next_link = '<a class="page-link" href="/page{}">Next</a>'.format(page + 1) if has_next else ''
+            return """
+            <html><body>
+                <div class="collection-card">
+                    <div class="product-details">
+                        <h3 class="product-title">Product {}</h3>
+                        <span class="price">$10</span>
+                    </div>
+                </div>
+                {}
+            </body></html>
+            """.format(page, next_link).encode('utf-8')
+
+        pages = {
+            "https://test.com": page_html(1, True),
+            "https://test.com/page2": page_html(2, True),
+            "https://test.com/page3": page_html(3, False),
+        }
+        mock_fetching_url_content.side_effect = lambda url, **kwargs: pages.get(url)
+
+        products = scrape_products("https://test.com", start_page=1, delay=0, max_workers=2)
+
+        self.assertEqual([p['Title'] for p in products], ["Product 1", "Product 2", "Product 3"])
+
+    @patch("utils.extract.fetching_url_content")
+    def test_scrape_products_concurrently_fetch_failure(self, mock_fetching_url_content):
+        """Test concurrent scraping stops at the first page that fails to fetch."""
+        mock_fetching_url_content.return_value = None
+
+        products = scrape_products_concurrently("https://test.com", max_workers=4)
+
+        self.assertEqual(products, [])
+
+    def test_build_page_url(self):
+        """Test page urls are built relative to the starting page."""
+        self.assertEqual(build_page_url("https://test.com", 1), "https://test.com")
+        self.assertEqual(build_page_url("https://test.com", 3), "https://test.com/page3")
+        self.assertEqual(build_page_url("https://test.com/page2", 4, start_page=2), "https://test.com/page4")
+
+    @patch("utils.extract.time.sleep")
+    def test_rate_limiter_spaces_requests_per_host(self, mock_sleep):
+        """Test the rate limiter delays a second request to the same host only."""
+        limiter = RateLimiter(rate=1)
+
+        limiter.wait("https://test.com/page1")
+        limiter.wait("https://other.com/page1")
+        mock_sleep.assert_not_called()
+
+        limiter.wait("https://test.com/page2")
+        mock_sleep.assert_called_once()
+
+    @patch("utils.extract.fetching_url_content")
+    def test_iter_product_pages_yields_each_page(self, mock_fetching_url_content):
+        """Test the page iterator yields one product list per listing page."""
+        page = """
+        <html><body>
+            <div class="collection-card"><h3 class="product-title">Product</h3></div>
+            <a class="page-link" href="/page2">Next</a>
+        </body></html>
+        """.encode('utf-8')
+        mock_fetching_url_content.side_effect = [page, page, None]
+
+        pages = list(iter_product_pages("https://test.com", delay=0))
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual([len(products) for products in pages], [1, 1])
@@ -0,0 +1,33 @@
+import pytest
+from benchmarks.fake_site import FakeFashionStudio, generate_pages
+from tests.test_parsers import ENGINES, reference_parse, without_timestamps
+from utils.extract import parse_page, scrape_products
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_generated_pages_parse_like_reference(engine):
+    """Test generated pages, malformed cards included, parse the same with every engine"""
+    catalog = generate_pages(pages=3, cards_per_page=10, malformed_rate=0.5)
+
+    for path, content in catalog.items():
+        expected_products, expected_next = reference_parse(content)
+        products, has_next = parse_page(content, parser=engine)
+
+        assert len(products) == 10
+        assert without_timestamps(products) == without_timestamps(expected_products)
+        assert has_next == expected_next == (path != "/page3")
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_scrape_fake_site(max_workers):
+    """Test the scraper walks the whole fake catalog over real HTTP"""
+    with FakeFashionStudio(pages=5, cards_per_page=4) as site:
+        products = scrape_products(site.url, delay=0, max_workers=max_workers)
+
+    assert [product["Title"].split()[-1] for product in products] == [str(i) for i in range(1, 21)]
+
+def test_scrape_fake_site_retries_errors():
+    """Test injected 503s are retried and no page is lost"""
+    with FakeFashionStudio(pages=5, cards_per_page=4, error_rate=0.3, seed=1) as site:
+        products = scrape_products(site.url, delay=0)
+
+    assert site.errors > 0
+    assert len(products) == 20
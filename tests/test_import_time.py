@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.fake_site import FakeFashionStudio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+# pandas imports the pyarrow core by itself, so the Parquet writer stands in for pyarrow
+HEAVY_MODULES = ("pandas", "numpy", "sqlalchemy", "googleapiclient", "google.oauth2", "pyarrow.parquet")
+
+def import_times(args, cwd=ROOT, env=None):
+    """{module: cumulative import microseconds} from `python -X importtime <args>`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+def heavy(times, modules=HEAVY_MODULES):
+    return sorted(name for name in modules if name in times)
+
+def loaded_modules(code, modules):
+    """The `modules` found in sys.modules after running `code` in a fresh interpreter"""
+    check = "{}\nimport sys\nprint(','.join(name for name in {!r} if name in sys.modules))".format(code, modules)
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    return [name for name in result.stdout.strip().split(",") if name]
+
+def test_main_import_is_light():
+    """Test importing the CLI leaves pandas, SQLAlchemy, the Google client and pyarrow unloaded"""
+    assert loaded_modules("import main", ("pandas", "numpy", "sqlalchemy", "googleapiclient", "pyarrow")) == []
+
+@pytest.mark.parametrize("module, allowed", [
+    ("utils.extract", ()),
+    ("utils.load", ("pandas", "numpy")),
+])
+def test_utils_import_lazily(module, allowed):
+    """Test extract needs no pandas and load imports Google, SQLAlchemy and pyarrow only on use"""
+    times = import_times(["-c", "import {}".format(module)])
+    assert heavy(times, [name for name in HEAVY_MODULES if name not in allowed]) == []
+
+def pipeline_env(site, tmp_path):
+    env = dict(os.environ)
+    env.update({
+        "FASHION_ETL_URL": site.url,
+        "FASHION_ETL_RATE_LIMIT": "0",
+        "FASHION_ETL_RAW_FILENAME": str(tmp_path / "products_raw.jsonl"),
+        "FASHION_ETL_CSV_FILENAME": str(tmp_path / "products.csv"),
+        "FASHION_ETL_RUN_REPORT_FILENAME": str(tmp_path / "run_report.json"),
+    })
+    return env
+
+def test_extract_only_run(tmp_path):
+    """Test an extract-only run scrapes the catalog without importing pandas or any sink dependency"""
+    with FakeFashionStudio(pages=3, cards_per_page=5) as site:
+        times = import_times([MAIN, "--stage", "extract"], cwd=str(tmp_path), env=pipeline_env(site, tmp_path))
+
+    assert heavy(times) == []
+    with open(tmp_path / "products_raw.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == 15
+
+def test_csv_only_run(tmp_path):
+    """Test a CSV-only run loads the catalog without the Google client, SQLAlchemy or pyarrow"""
+    with FakeFashionStudio(pages=3, cards_per_page=5) as site:
+        times = import_times([MAIN, "--sinks", "csv"], cwd=str(tmp_path), env=pipeline_env(site, tmp_path))
+
+    assert heavy(times, ("sqlalchemy", "googleapiclient", "google.oauth2", "pyarrow.parquet")) == []
+    with open(tmp_path / "products.csv", encoding="utf-8") as f:
+        assert len(f.readlines()) == 16
@@ -0,0 +1,133 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+from utils import metrics
+from utils.extract import iter_product_pages
+from utils.metrics import count, finish_run, start_run, timed
+from utils.transform import iter_transformed_chunks, transform_and_clean_data
+
+def page_html(title, has_next):
+    next_link = '<a class="page-link" href="#">Next</a>' if has_next else ''
+    return """
+    <html><body>
+        <div class="collection-card">
+            <h3 class="product-title">{}</h3>
+            <span class="price">$10.00</span>
+            <p style="font-size: 14px; color: #777;">Rating: 4.5 / 5</p>
+            <p style="font-size: 14px; color: #777;">3 Colors</p>
+            <p style="font-size: 14px; color: #777;">Size: M</p>
+            <p style="font-size: 14px; color: #777;">Gender: Men</p>
+        </div>
+        {}
+    </body></html>
+    """.format(title, next_link).encode('utf-8')
+
+PAGES = {
+    "https://test.com": page_html("Product 1", True),
+    "https://test.com/page2": page_html("Product 2", False),
+}
+
+@pytest.fixture(autouse=True)
+def no_active_run():
+    yield
+    finish_run()
+
+def test_instrumentation_is_noop_without_run():
+    """Test timed/count work and record nothing when no run is active"""
+    with timed("transform") as timer:
+        count("transform", "rows_in")
+    assert timer.seconds >= 0
+    assert metrics.get_metrics() is None
+
+def test_timed_records_stage():
+    """Test a timed block adds calls, wall time and counters to its stage"""
+    start_run()
+    with timed("transform"):
+        count("transform", "rows_in", 3)
+    with timed("transform"):
+        count("transform", "rows_in", 2)
+    stage = finish_run()["stages"]["transform"]
+
+    assert stage["calls"] == 2
+    assert stage["wall_seconds"] >= 0
+    assert stage["counters"] == {"rows_in": 5}
+
+def test_transform_stats_per_rule():
+    """Test each dropped row is attributed to the first cleaning rule that drops it"""
+    product = {"Title": "Shirt", "Price": "$10.00", "Rating": "Rating: 4.5 / 5",
+               "Colors": "3 Colors", "Size": "Size: M", "Gender": "Gender: Men",
+               "Timestamp": "2025-01-01T00:00:00"}
+    data = [
+        product,
+        dict(product),
+        dict(product, Title="Unknown Product"),
+        dict(product, Title="Pants", Price="Price Unavailable"),
+        dict(product, Title="Hat", Rating="Not Rated"),
+        dict(product, Title=None),
+    ]
+    stats = {}
+    df = transform_and_clean_data(data, stats=stats)
+
+    assert len(df) == 1
+    assert stats == {
+        "rows_in": 6,
+        "dropped_duplicates": 1,
+        "dropped_missing_values": 1,
+        "dropped_unknown_product": 1,
+        "dropped_price_unavailable": 1,
+        "dropped_invalid_rating": 1,
+        "dropped_parse_price": 0,
+        "dropped_parse_rating": 0,
+        "dropped_parse_colors": 0,
+        "dropped_parse_size": 0,
+        "dropped_parse_gender": 0,
+        "rows_out": 1,
+    }
+
+@patch('utils.extract.fetching_url_content')
+def test_pipeline_run_report(mock_fetch, tmp_path):
+    """Test a run reports per-stage and per-page metrics in JSON and Prometheus format"""
+    mock_fetch.side_effect = lambda url, **kwargs: PAGES.get(url)
+    start_run(run_id="test")
+
+    chunks = list(iter_transformed_chunks(iter_product_pages("https://test.com", delay=0), chunk_size=10))
+    json_path = str(tmp_path / "run_report.json")
+    prom_path = str(tmp_path / "metrics.prom")
+    report = finish_run(json_path=json_path, prometheus_path=prom_path)
+
+    assert sum(len(chunk) for chunk in chunks) == 2
+    assert report["stages"]["extract.fetch"]["counters"]["pages"] == 2
+    assert report["stages"]["extract.parse"]["counters"]["cards"] == 2
+    assert report["stages"]["transform"]["counters"]["rows_out"] == 2
+    assert [page["cards"] for page in report["pages"]] == [1, 1]
+    assert report["process_peak_rss_bytes"] > 0
+    assert 0 <= report["run_peak_rss_increase_bytes"] <= report["process_peak_rss_bytes"]
+
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["run_id"] == "test"
+    with open(prom_path, encoding="utf-8") as f:
+        assert 'fashion_etl_stage_calls{stage="extract.parse"} 2' in f.read()
+
+def test_profile_dumps(tmp_path):
+    """Test profiling writes one cProfile dump per stage and the tracemalloc top sites"""
+    profile_dir = str(tmp_path / "profiles")
+    start_run(profile_dir=profile_dir, trace_memory=True)
+    with timed("transform"):
+        sorted(range(1000), reverse=True)
+    finish_run()
+
+    assert sorted(os.listdir(profile_dir)) == ["tracemalloc.txt", "transform.prof"]
+
+def test_traced_peak_is_the_peak_inside_the_block():
+    """Test a stage records the traced peak of its own block, not the memory left at its end"""
+    start_run(trace_memory=True)
+    with timed("load"):
+        pass
+    with timed("transform"):
+        data = bytearray(8 * 2 ** 20)
+        del data
+    stages = finish_run()["stages"]
+
+    assert stages["transform"]["traced_peak_bytes"] >= 8 * 2 ** 20
+    assert stages["load"]["traced_peak_bytes"] < 8 * 2 ** 20
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+import pytest
+from benchmarks.fake_site import FakeFashionStudio, generate_pages
+from utils.batch import ProductBatch
+from utils.checkpoint import ScrapeCheckpoint
+from utils.extract import iter_product_pages, parse_page, parser_id, scrape_products
+from utils.page_index import PageIndex
+
+@pytest.fixture
+def index(tmp_path):
+    page_index = PageIndex("https://test.com", str(tmp_path / "page_index.sqlite3"))
+    yield page_index
+    page_index.close()
+
+def test_unchanged_page_is_rebuilt_with_fresh_timestamp(index):
+    """Test a stored page comes back for the same body hash only, with a new timestamp"""
+    content = generate_pages(pages=1, cards_per_page=3)["/"]
+    products, has_next = parse_page(content)
+    body_hash = index.digest(content)
+    index.put("https://test.com", body_hash, products, has_next)
+
+    batch, stored_next = index.get("https://test.com", body_hash, as_batch=True)
+    assert isinstance(batch, ProductBatch)
+    assert [dict(product, Timestamp=None) for product in batch] == [dict(product, Timestamp=None) for product in products]
+    assert batch.timestamp > products[0]["Timestamp"]
+    assert stored_next == has_next
+    assert index.get("https://test.com", index.digest(content + b" "), as_batch=True) is None
+
+def test_page_parsed_by_another_parser_is_parsed_again(index, monkeypatch):
+    """Test stored rows are only reused for the parser engine and version that produced them"""
+    index.put("https://test.com", "hash", [], False, parser_id("bs4"))
+
+    assert index.get("https://test.com", "hash", parser=parser_id("bs4")) == ([], False)
+    assert index.get("https://test.com", "hash", parser=parser_id("lxml")) is None
+    monkeypatch.setattr("utils.extract.PARSER_VERSION", 2)
+    assert index.get("https://test.com", "hash", parser=parser_id("bs4")) is None
+
+def test_finish_evicts_pages_not_seen(tmp_path, index):
+    """Test pages missing from a complete crawl are evicted from the index"""
+    for page_url in ("https://test.com", "https://test.com/page2"):
+        index.put(page_url, "hash", [], True)
+
+    rerun = PageIndex("https://test.com", index.path)
+    rerun.get("https://test.com", "hash")
+    assert rerun.finish() == 1
+    assert rerun.pages() == ["https://test.com"]
+    rerun.close()
+
+def test_second_scrape_skips_parsing(tmp_path):
+    """Test a rescrape of an unchanged catalog parses nothing and a shrunk one evicts its old pages"""
+    path = str(tmp_path / "page_index.sqlite3")
+    with FakeFashionStudio(pages=5, cards_per_page=4) as site:
+        def scrape():
+            index = PageIndex(site.url, path)
+            with patch("utils.extract.parse_page", side_effect=parse_page) as parse:
+                products = scrape_products(site.url, delay=0, page_index=index)
+            pages = index.pages()
+            index.close()
+            return products, parse.call_count, pages
+
+        first, first_parses, _ = scrape()
+        second, second_parses, _ = scrape()
+        site.catalog = generate_pages(pages=3, cards_per_page=4)
+        third, third_parses, pages = scrape()
+
+    assert (first_parses, second_parses) == (5, 0)
+    assert [dict(product, Timestamp=None) for product in second] == [dict(product, Timestamp=None) for product in first]
+    assert second[0]["Timestamp"] > first[0]["Timestamp"]
+    assert third_parses == 1  # only page 3 lost its next page link
+    assert len(third) == 12 and len(pages) == 3
+
+def test_pages_resumed_from_checkpoint_are_kept(tmp_path):
+    """Test pages served by a scrape checkpoint count as seen and survive the end of the crawl"""
+    path = str(tmp_path / "page_index.sqlite3")
+    with FakeFashionStudio(pages=3, cards_per_page=2) as site:
+        index = PageIndex(site.url, path)
+        pages = list(iter_product_pages(site.url, delay=0, page_index=index))
+        index.close()
+
+        checkpoint = ScrapeCheckpoint(site.url, path=str(tmp_path / "checkpoint.sqlite3"))
+        checkpoint.mark_done(1, pages[0], True)
+        checkpoint.mark_done(2, pages[1], True)
+        index = PageIndex(site.url, path)
+        resumed = list(iter_product_pages(site.url, delay=0, checkpoint=checkpoint, page_index=index))
+        stored = index.pages()
+        index.close()
+        checkpoint.close()
+
+    assert len(resumed) == 3
+    assert stored == [site.url, site.url + "/page2", site.url + "/page3"]
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from benchmarks.fake_site import FakeFashionStudio, generate_pages
+from utils.extract import parse_page
+from utils.parallel import (from_batches, iter_transformed_chunks_parallel, iter_transformed_pages_parallel,
+                            parse_and_clean_pages, to_batch)
+from utils.transform import transform_and_clean_data
+
+def without_timestamps(df):
+    return df.drop(columns="Timestamp").reset_index(drop=True)
+
+def sequential_result(contents):
+    products = []
+    for content in contents:
+        products.extend(parse_page(content)[0])
+    return transform_and_clean_data(products)
+
+def test_batch_round_trip():
+    """Test a columnar batch rebuilds the same DataFrame"""
+    df = pd.DataFrame({"Title": ["A", "B"], "Price": [1.0, 2.0], "Colors": [3, 5]})
+    pd.testing.assert_frame_equal(from_batches([to_batch(df)]), df)
+    pd.testing.assert_frame_equal(from_batches([to_batch(df), {}, to_batch(df)]), pd.concat([df, df], ignore_index=True))
+
+def test_worker_stops_at_last_page():
+    """Test a worker task ignores pages after the one without a next page link"""
+    catalog = list(generate_pages(pages=2, cards_per_page=5).values())
+    batch, cards, has_next, _, _ = parse_and_clean_pages(catalog + catalog)
+
+    assert cards == 10
+    assert has_next is False
+    assert len(pd.DataFrame(batch)) == 10
+
+@pytest.mark.parametrize("pages_per_task", [1, 3])
+def test_parallel_chunks_match_sequential(pages_per_task):
+    """Test process-pool chunks hold the same rows, in page order, as the sequential transform"""
+    contents = list(generate_pages(pages=10, cards_per_page=10, malformed_rate=0.2).values())
+
+    chunks = list(iter_transformed_chunks_parallel(contents, processes=2, chunk_size=25,
+                                                   pages_per_task=pages_per_task))
+
+    assert all(len(chunk) >= 25 for chunk in chunks[:-1])
+    pd.testing.assert_frame_equal(
+        without_timestamps(pd.concat(chunks, ignore_index=True)),
+        without_timestamps(sequential_result(contents)),
+    )
+
+def test_parallel_pages_from_fake_site():
+    """Test the whole catalog is fetched and cleaned through worker processes"""
+    with FakeFashionStudio(pages=6, cards_per_page=5) as site:
+        chunks = list(iter_transformed_pages_parallel(site.url, processes=2, chunk_size=10, max_workers=4))
+
+    titles = pd.concat(chunks)["Title"].str.split().str[-1].astype(int).tolist()
+    assert titles == list(range(1, 31))
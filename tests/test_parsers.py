@@ -0,0 +1,47 @@
+import os
+import pytest
+from bs4 import BeautifulSoup
+from utils.extract import parse_page, parse_product_details
+from utils.parsers import lxml_available
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_PAGES = ["fashion_studio_page1.html", "fashion_studio_page2.html"]
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+def reference_parse(content):
+    """The original full-tree BeautifulSoup parse every engine must match"""
+    soup = BeautifulSoup(content, "html.parser")
+    cards = soup.find_all("div", {"class": "collection-card"})
+    products = [parse_product_details(card, "timestamp") for card in cards]
+    return products, bool(soup.find('a', {"class": "page-link"}))
+
+def without_timestamps(products):
+    return [{k: v for k, v in product.items() if k != "Timestamp"} for product in products]
+
+ENGINES = ["bs4", pytest.param("lxml", marks=pytest.mark.skipif(not lxml_available(), reason="lxml not installed"))]
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("fixture", FIXTURE_PAGES)
+def test_parser_parity(engine, fixture):
+    """Test every parser engine gives the same product dicts as the original parser"""
+    content = read_fixture(fixture)
+
+    expected_products, expected_next = reference_parse(content)
+    products, has_next = parse_page(content, parser=engine)
+
+    assert expected_products
+    assert without_timestamps(products) == without_timestamps(expected_products)
+    assert has_next == expected_next
+
+def test_parse_page_next_link():
+    """Test the next page link is detected on the first page only"""
+    assert parse_page(read_fixture("fashion_studio_page1.html"))[1] is True
+    assert parse_page(read_fixture("fashion_studio_page2.html"))[1] is False
+
+def test_parse_page_unknown_engine():
+    """Test an unknown parser engine is rejected"""
+    with pytest.raises(ValueError):
+        parse_page(b"<html></html>", parser="regex")
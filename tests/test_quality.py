@@ -0,0 +1,76 @@
+import json
+import pandas as pd
+import pytest
+from utils.quality import DEFAULT_RULES, apply_rules, load_rules, validate_rules
+from utils.transform import iter_transformed_chunks, transform_and_clean_data
+
+PRODUCT = {"Title": "Shirt", "Price": "$10.00", "Rating": "Rating: ⭐ 4.5 / 5", "Colors": "3 Colors",
+           "Size": "Size: M", "Gender": "Gender: Men", "Timestamp": "2025-01-01T00:00:00"}
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame([
+        PRODUCT,
+        dict(PRODUCT, Title="Unknown Product"),
+        dict(PRODUCT, Title="Pants", Price="$abc"),
+        dict(PRODUCT, Title="Hat", Colors="Many Colors"),
+        dict(PRODUCT, Title="Scarf", Price="$20.50"),
+    ])
+
+def test_apply_rules_quarantines_with_rule_id(frame):
+    """Test rejected rows keep their scraped values and the id of the first rule they failed"""
+    clean, rejected, counts = apply_rules(frame)
+
+    assert list(clean["Title"]) == ["Shirt", "Scarf"]
+    assert list(clean["Price"]) == [10.0 * 16000, 20.5 * 16000]
+    assert clean["Colors"].dtype == "int64"
+    assert list(rejected["Title"]) == ["Unknown Product", "Pants", "Hat"]
+    assert list(rejected["rule_id"]) == ["unknown_product", "parse_price", "parse_colors"]
+    assert rejected.loc[2, "Price"] == "$abc"
+    assert counts["unknown_product"] == counts["parse_price"] == counts["parse_colors"] == 1
+    assert sum(counts.values()) == 3
+
+def test_rules_from_file(tmp_path, frame):
+    """Test a rules file sets the exchange rate and adds checks on transformed columns"""
+    rules = [rule for rule in DEFAULT_RULES if rule["id"] != "parse_price"]
+    rules.insert(5, {"id": "parse_price", "transform": "number", "column": "Price", "strip": "$",
+                     "multiply": 2, "dtype": "float"})
+    rules.append({"id": "cheap", "check": "between", "column": "Price", "min": 30})
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+
+    clean, rejected, counts = apply_rules(frame, load_rules(str(path)))
+
+    assert list(clean["Price"]) == [41.0]
+    assert counts["cheap"] == 1
+
+@pytest.mark.parametrize("rule", [
+    {"check": "not_null"},
+    {"id": "a", "check": "not_equal", "column": "Title"},
+    {"id": "a", "check": "no_such_check"},
+    {"id": "a", "transform": "replace", "old": "x", "new": ""},
+    {"id": "a", "check": "not_null", "transform": "number", "column": "Price"},
+])
+def test_validate_rules_rejects_bad_rules(rule):
+    """Test rules with a missing id, kind or parameter are rejected"""
+    with pytest.raises(ValueError):
+        validate_rules([rule])
+
+def test_transform_quarantine_and_stats(frame):
+    """Test transform_and_clean_data reports per-rule counts and passes rejected rows on"""
+    quarantined, stats = [], {}
+    df = transform_and_clean_data(frame.to_dict("records"), stats=stats, quarantine=quarantined.append)
+
+    assert len(df) == 2
+    assert len(pd.concat(quarantined)) == 3
+    assert stats["dropped_parse_price"] == 1
+    assert stats["rows_in"] == 5 and stats["rows_out"] == 2
+
+def test_broken_rules_quarantine_the_whole_chunk(frame):
+    """Test a rule on a missing column rejects the chunk instead of returning it half-cleaned"""
+    rules = [{"id": "parse_sku", "transform": "replace", "column": "SKU", "old": "#", "new": ""}]
+    quarantined = []
+    chunks = list(iter_transformed_chunks([frame.to_dict("records")], rules=rules, quarantine=quarantined.append))
+
+    assert chunks == []
+    assert list(quarantined[0]["rule_id"].unique()) == ["error"]
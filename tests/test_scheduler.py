@@ -0,0 +1,115 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from utils.config import DEFAULT_CONFIG, load_config
+from utils.scheduler import CronSchedule, IntervalSchedule, RunLock, run_scheduler
+
+class FakeClock:
+    def __init__(self, start):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += timedelta(seconds=seconds)
+
+@pytest.mark.parametrize("expression, start, expected", [
+    ("*/15 * * * *", datetime(2025, 1, 1, 10, 7, 30), datetime(2025, 1, 1, 10, 15)),
+    ("0 */6 * * *", datetime(2025, 1, 1, 10, 0), datetime(2025, 1, 1, 12, 0)),
+    ("30 2 * * *", datetime(2025, 1, 31, 3, 0), datetime(2025, 2, 1, 2, 30)),
+    ("0 9 * * 1", datetime(2025, 1, 1, 0, 0), datetime(2025, 1, 6, 9, 0)),  # next Monday
+    ("0 0 1 * *", datetime(2025, 12, 15, 0, 0), datetime(2026, 1, 1, 0, 0)),
+])
+def test_cron_next_after(expression, start, expected):
+    """Test cron expressions give the next matching minute"""
+    assert CronSchedule(expression).next_after(start) == expected
+
+def test_cron_invalid_expression():
+    """Test invalid cron expressions are rejected"""
+    with pytest.raises(ValueError):
+        CronSchedule("every hour")
+
+def test_run_lock_is_exclusive(tmp_path):
+    """Test a second lock on the same file fails until the first is released"""
+    path = str(tmp_path / "pipeline.lock")
+    first, second = RunLock(path), RunLock(path)
+
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+def test_run_scheduler_runs_on_schedule():
+    """Test jobs start on every interval tick, with jitter added to the start"""
+    clock = FakeClock(datetime(2025, 1, 1))
+    starts = []
+
+    runs = run_scheduler(lambda: starts.append(clock.now()), IntervalSchedule(60), jitter=5,
+                         max_runs=3, now=clock.now, sleep=clock.sleep)
+
+    assert runs == 3
+    for i, start in enumerate(starts, 1):
+        assert timedelta(seconds=60 * i) <= start - datetime(2025, 1, 1) <= timedelta(seconds=60 * i + 5)
+
+def test_run_scheduler_survives_failed_runs(tmp_path):
+    """Test a failed run is reported and the schedule goes on"""
+    clock = FakeClock(datetime(2025, 1, 1))
+    calls = []
+
+    def job():
+        calls.append(clock.now())
+        raise RuntimeError("load failed")
+
+    runs = run_scheduler(job, IntervalSchedule(60), RunLock(str(tmp_path / "pipeline.lock")), run_now=True,
+                         max_runs=3, now=clock.now, sleep=clock.sleep)
+
+    assert runs == 3
+    assert calls == [datetime(2025, 1, 1) + timedelta(seconds=60 * i) for i in range(3)]
+
+def test_run_scheduler_skips_locked_runs(tmp_path):
+    """Test ticks are skipped while another process holds the run lock"""
+    clock = FakeClock(datetime(2025, 1, 1))
+    path = str(tmp_path / "pipeline.lock")
+    other = RunLock(path)
+    calls = []
+
+    assert other.acquire()
+    runs = run_scheduler(lambda: calls.append(clock.now()), IntervalSchedule(60), RunLock(path),
+                         max_runs=2, now=clock.now, sleep=clock.sleep)
+    other.release()
+
+    assert runs == 2
+    assert calls == []
+
+def test_load_config_layers(tmp_path):
+    """Test file, environment and overrides are applied over the defaults in that order"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"chunk_size": 50, "rate_limit": 2}))
+
+    config = load_config(str(path), {"rate_limit": 1, "interval": None},
+                         environ={"FASHION_ETL_DATABASE_URL": "sqlite://", "FASHION_ETL_CHUNK_SIZE": "75"})
+
+    assert config["chunk_size"] == 75
+    assert config["rate_limit"] == 1
+    assert config["database_url"] == "sqlite://"
+    assert config["interval"] == DEFAULT_CONFIG["interval"]
+
+def test_load_config_rejects_unknown_keys(tmp_path):
+    """Test a misspelled key in the config file is an error"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"chunksize": 50}))
+
+    with pytest.raises(ValueError):
+        load_config(str(path), environ={})
+
+def test_load_config_warns_about_features_process_parsing_turns_off(capsys):
+    """Test enabling parse_processes reports the page index and card dead letters it does without"""
+    load_config(overrides={"parse_processes": 2}, environ={})
+    warning = capsys.readouterr().out
+
+    assert "page index" in warning and "dead letters" in warning
+
+    load_config(overrides={"parse_processes": 2, "page_index_path": "", "dead_letter_path": ""}, environ={})
+    assert "page index" not in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, Mock
+from utils import session
+from utils.session import (
+    configure_session, get_session, close_session, get_with_retries, retry_delay, session_stats
+)
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    close_session()
+    configure_session(max_retries=3, backoff_factor=0.5)
+    yield
+    close_session()
+
+def make_response(status_code, headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+def test_get_session_is_shared():
+    """Test the same pooled session is reused between calls"""
+    assert get_session() is get_session()
+
+@patch("utils.session.time.sleep")
+@patch("utils.session.requests.Session.get")
+def test_get_with_retries_retries_server_errors(mock_get, mock_sleep):
+    """Test 5xx responses are retried and counted, and a timeout is always sent"""
+    mock_get.side_effect = [make_response(503), make_response(200)]
+
+    response = get_with_retries("https://test.com")
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs["timeout"] == session.DEFAULT_TIMEOUT
+    mock_sleep.assert_called_once()
+    assert session_stats()["retries"] == 1
+    assert session_stats()["requests"] == 2
+
+@patch("utils.session.time.sleep")
+@patch("utils.session.requests.Session.get")
+def test_get_with_retries_gives_up(mock_get, mock_sleep):
+    """Test the last response is returned once the retry budget is spent"""
+    mock_get.return_value = make_response(429)
+
+    response = get_with_retries("https://test.com")
+
+    assert response.status_code == 429
+    assert mock_get.call_count == 4
+    assert mock_sleep.call_count == 3
+
+def test_retry_delay_honors_retry_after():
+    """Test Retry-After in seconds overrides the backoff"""
+    assert retry_delay(make_response(429, {"Retry-After": "7"}), attempt=0) == 7
+
+@patch("utils.session.random.uniform", return_value=0)
+def test_retry_delay_exponential_backoff(mock_uniform):
+    """Test backoff doubles with every attempt"""
+    delays = [retry_delay(make_response(503), attempt) for attempt in range(3)]
+    assert delays == [0.5, 1.0, 2.0]
+
+def test_session_stats_counts_reused_connections():
+    """Test keep-alive requests against a local server reuse one pooled connection"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = "http://127.0.0.1:{}/".format(server.server_address[1])
+        for _ in range(3):
+            assert get_with_retries(url).content == b"ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = session_stats()
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 2
@@ -0,0 +1,90 @@
+import os
+from unittest.mock import patch
+import pytest
+import pandas as pd
+import requests
+from benchmarks.fake_site import generate_pages
+from utils.extract import CrawlStatus, iter_product_pages
+from utils.load import load_stream
+from utils.snapshot import SnapshotStore, SnapshotSink
+
+@pytest.fixture
+def first_run():
+    return pd.DataFrame({
+        'Title': ['T-shirt 2', 'Crewneck 7', 'Pants 4'],
+        'Price': [1634400.0, 6892000.0, 7476960.0],
+        'Rating': [3.9, 4.3, 4.0],
+        'Colors': [3, 3, 3],
+        'Size': ['M', 'M', 'XL'],
+        'Gender': ['Women', 'Men', 'Men'],
+        'Timestamp': ['2025-04-27T18:42:22.587022'] * 3
+    })
+
+@pytest.fixture
+def second_run(first_run):
+    df = first_run.copy()
+    df['Timestamp'] = '2025-04-28T08:00:00'
+    df.loc[0, 'Price'] = 1500000.0
+    df = df[df['Title'] != 'Pants 4']
+    new_row = df.iloc[[1]].assign(Title='Hoodie 9', Rating=4.8)
+    return pd.concat([df, new_row], ignore_index=True)
+
+def test_store_keeps_runs_in_order(tmp_path, first_run):
+    store = SnapshotStore(str(tmp_path))
+
+    first_id = store.save(first_run)
+    second_id = store.save(first_run.iloc[:1])
+
+    assert store.runs() == [first_id, second_id]
+    assert len(store.load(second_id)) == 1
+    assert {'key_hash', 'row_hash'} <= set(store.load(first_id).columns)
+
+def test_diff_reports_inserted_deleted_and_changed(tmp_path, first_run, second_run):
+    store = SnapshotStore(str(tmp_path))
+    store.save(first_run)
+    store.save(second_run)
+
+    diff = store.diff_latest().set_index('Title')
+
+    assert diff.loc['T-shirt 2', 'change'] == 'changed'
+    assert diff.loc['T-shirt 2', 'price_delta'] == 1500000.0 - 1634400.0
+    assert diff.loc['Pants 4', 'change'] == 'deleted'
+    assert pd.isna(diff.loc['Pants 4', 'Price'])
+    assert diff.loc['Hoodie 9', 'change'] == 'inserted'
+    assert 'Crewneck 7' not in diff.index
+
+def test_first_run_is_all_inserts(tmp_path, first_run):
+    store = SnapshotStore(str(tmp_path))
+    store.save(first_run)
+
+    assert list(store.diff_latest()['change']) == ['inserted'] * 3
+
+def test_snapshot_sink_streams_run_and_exposes_changes(tmp_path, first_run, second_run):
+    store = SnapshotStore(str(tmp_path))
+    store.save(first_run)
+    sink = SnapshotSink(store)
+
+    report = load_stream([second_run.iloc[:2], second_run.iloc[2:]], [sink])
+
+    details = report['sinks']['SnapshotSink']['details']
+    assert (details['inserted'], details['deleted'], details['changed']) == (1, 1, 1)
+    assert store.runs()[-1] == sink.run_id
+    assert len(sink.changes) == 3
+
+@patch("utils.extract.fetching_url_content")
+def test_snapshot_of_partial_crawl_is_dropped(mock_fetch, tmp_path, first_run, second_run):
+    """Test a run whose crawl stopped on a failed page is neither committed nor diffed"""
+    page1 = generate_pages(pages=2, cards_per_page=2)["/"]
+    mock_fetch.side_effect = [page1, requests.exceptions.ConnectionError("reset")]
+    crawl = CrawlStatus()
+    list(iter_product_pages("https://test.com", delay=0, rate_limit=0, crawl=crawl))
+    store = SnapshotStore(str(tmp_path))
+    store.save(first_run)
+    sink = SnapshotSink(store, crawl=crawl)
+
+    report = load_stream([second_run], [sink])
+
+    assert not crawl.complete
+    assert report['sinks']['SnapshotSink']['details'] == {'run_id': sink.run_id, 'committed': False}
+    assert len(store.runs()) == 1 and sink.changes is None
+    assert not os.path.exists(store.path_for(sink.run_id))
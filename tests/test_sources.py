@@ -0,0 +1,96 @@
+import time
+import pytest
+from benchmarks.fake_site import FakeFashionStudio
+from utils.batch import batches_to_frame
+from utils.sources import FashionStudioSource, XPathSource, crawl_sources, make_source, paginate
+
+SHOP_PAGE = b"""<html><body>
+<ul class="grid">
+  <li class="item"><h2> Linen Shirt </h2><b class="cost">$12.50</b><i>4.1</i></li>
+  <li class="item"><h2>Wool Scarf</h2><i>3.0</i></li>
+</ul>
+<a rel="next" href="?page=2">next</a>
+</body></html>"""
+
+SHOP_SPEC = {
+    "adapter": "xpath", "name": "shop", "url": "https://shop.test/list", "pagination": "query",
+    "cards": "//li[@class='item']",
+    "fields": {"Title": ".//h2", "Price": "string(.//b[@class='cost'])", "Rating": ".//i"},
+    "next_page": "//a[@rel='next']",
+}
+
+@pytest.mark.parametrize("pagination, page, expected", [
+    ("path", 1, "https://shop.test"),
+    ("path", 3, "https://shop.test/page3"),
+    ("query", 2, "https://shop.test?page=2"),
+    ("https://shop.test/list?p={page}", 4, "https://shop.test/list?p=4"),
+])
+def test_paginate(pagination, page, expected):
+    """Test every pagination strategy builds the url of a listing page"""
+    assert paginate("https://shop.test", page, pagination) == expected
+
+def test_xpath_source_parses_cards():
+    """Test an XPath source extracts configured fields and leaves the others None"""
+    source = make_source(SHOP_SPEC)
+    products, has_next = source.parse(SHOP_PAGE)
+
+    assert has_next
+    assert source.page_url(2) == "https://shop.test/list?page=2"
+    assert [product["Title"] for product in products] == ["Linen Shirt", "Wool Scarf"]
+    assert [product["Price"] for product in products] == ["$12.50", None]
+    assert products[0]["Rating"] == "4.1" and products[0]["Colors"] is None
+
+    batch, _ = source.parse(SHOP_PAGE, as_batch=True)
+    assert [dict(row, Timestamp=None) for row in batch] == [dict(row, Timestamp=None) for row in products]
+
+def test_make_source_rejects_unknown_adapter():
+    """Test an unknown adapter name in the config is an error"""
+    with pytest.raises(ValueError):
+        make_source({"adapter": "csv", "name": "x", "url": "https://x.test"})
+    with pytest.raises(ValueError):
+        XPathSource("x", "https://x.test", "//li", {"Sku": ".//b"})
+
+def test_sources_are_rate_limited_by_default():
+    """Test a source spec without a rate limit gets the run's limit, and an adapter alone the adaptive one"""
+    assert make_source(SHOP_SPEC, {"initial": 2}).rate_limit == {"initial": 2}
+    assert make_source(dict(SHOP_SPEC, rate_limit=1), {"initial": 2}).rate_limit == 1
+    assert FashionStudioSource().rate_limit == "adaptive"
+
+def test_crawl_sources_concurrently():
+    """Test sources are crawled at once, each in page order, in about the time of the slowest"""
+    with FakeFashionStudio(pages=6, cards_per_page=3, latency=0.1) as slow, \
+            FakeFashionStudio(pages=6, cards_per_page=3, latency=0.1, seed=7) as fast:
+        sources = [FashionStudioSource(slow.url, name="slow", max_workers=1, rate_limit=0),
+                   FashionStudioSource(fast.url, name="fast", max_workers=1, rate_limit=0)]
+        start = time.perf_counter()
+        pages = list(crawl_sources(sources))
+        elapsed = time.perf_counter() - start
+
+    for name in ("slow", "fast"):
+        titles = [product["Title"] for source, page in pages if source == name for product in page]
+        assert [title.split()[-1] for title in titles] == [str(i) for i in range(1, 19)]
+    # Six sequential 0.1s requests per source; crawled one after the other they would take 1.2s
+    assert elapsed < 0.9
+
+class BrokenSource:
+    name = "broken"
+    url = "https://broken.test"
+
+    def iter_pages(self, as_batch=False, checkpoint=None, page_index=None, crawl=None):
+        raise ConnectionError("retailer down")
+        yield
+
+def test_failing_source_raises_after_the_others_and_rows_carry_their_source():
+    """Test every page of the healthy source is yielded with its Source before the failed one is raised"""
+    with FakeFashionStudio(pages=2, cards_per_page=3) as site:
+        pages = []
+        with pytest.raises(RuntimeError, match="broken"):
+            sources = [FashionStudioSource(site.url, name="site", rate_limit=0), BrokenSource()]
+            for name, page in crawl_sources(sources, as_batch=True):
+                pages.append(page)
+
+    assert sum(len(page) for page in pages) == 6
+    assert {product["Source"] for page in pages for product in page} == {"site"}
+    df = batches_to_frame(pages)
+    assert list(df["Source"]) == ["site"] * 6
+    assert list(df.columns) == ["Title", "Price", "Rating", "Colors", "Size", "Gender", "Timestamp", "Source"]
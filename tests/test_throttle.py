@@ -0,0 +1,91 @@
+from unittest.mock import Mock, patch
+import pytest
+from benchmarks.fake_site import FakeFashionStudio
+from utils.extract import scrape_products
+from utils.metrics import finish_run, start_run
+from utils.session import BACKOFF_FACTOR, close_session, configure_session, get_with_retries
+from utils.throttle import AdaptiveRateLimiter, RateLimiter, make_limiter
+
+URL = "https://test.com/page2"
+
+def test_rate_grows_while_healthy_and_stays_under_ceiling():
+    """Test healthy responses raise the rate additively up to the ceiling"""
+    limiter = AdaptiveRateLimiter(initial=2, ceiling=4, increase=1)
+    limiter.record(URL, 0.05, 200)
+    assert limiter.current_rate("test.com") == 2.5
+
+    for _ in range(100):
+        limiter.record(URL, 0.05, 200)
+    assert limiter.current_rate("test.com") == 4
+
+@pytest.mark.parametrize("status", [429, 503, None])
+def test_rate_is_cut_on_errors_down_to_the_floor(status):
+    """Test 429, 5xx and failed requests halve the rate, never below the floor"""
+    limiter = AdaptiveRateLimiter(initial=8, floor=3)
+    with patch("utils.throttle.time.monotonic", side_effect=[0, 100, 200]):
+        limiter.record(URL, 0.05, status)
+        assert limiter.current_rate("test.com") == 4
+        limiter.record(URL, 0.05, status)
+        limiter.record(URL, 0.05, status)
+    assert limiter.current_rate("test.com") == 3
+
+def test_burst_of_failures_cuts_once():
+    """Test failures arriving within one round trip count as one congestion signal"""
+    limiter = AdaptiveRateLimiter(initial=8)
+    for _ in range(5):
+        limiter.record(URL, 0.05, 503)
+    assert limiter.current_rate("test.com") == 4
+
+def test_latency_spike_cuts_the_rate():
+    """Test a response much slower than the smoothed latency cuts the rate"""
+    limiter = AdaptiveRateLimiter(initial=5, increase=0)
+    for _ in range(3):
+        limiter.record(URL, 0.1, 200)
+    limiter.record(URL, 0.2, 200)
+    assert limiter.current_rate("test.com") == 5
+
+    limiter.record(URL, 1.0, 200)
+    assert limiter.current_rate("test.com") == 2.5
+
+def test_make_limiter():
+    """Test numbers give a fixed limiter and "adaptive" or a dict an adaptive one"""
+    assert type(make_limiter(3)) is RateLimiter and make_limiter(3).rate == 3
+    assert make_limiter(None).rate is None
+    assert isinstance(make_limiter("adaptive"), AdaptiveRateLimiter)
+    assert make_limiter({"initial": 2, "floor": 1}).floor == 1
+    limiter = AdaptiveRateLimiter()
+    assert make_limiter(limiter) is limiter
+    with pytest.raises(ValueError):
+        AdaptiveRateLimiter(initial=1, floor=2)
+
+@patch("utils.session.time.sleep")
+@patch("utils.session.requests.Session.get")
+def test_get_with_retries_reports_every_attempt(mock_get, mock_sleep):
+    """Test the throttle hears about the retried 503 as well as the final 200"""
+    mock_get.side_effect = [Mock(status_code=503, headers={}), Mock(status_code=200, headers={})]
+    throttle = Mock()
+
+    get_with_retries(URL, throttle=throttle)
+
+    assert [call.args[2] for call in throttle.record.call_args_list] == [503, 200]
+
+def test_adaptive_scrape_backs_off_a_failing_server():
+    """Test the rate climbs against a healthy server, falls against a failing one and is reported"""
+    close_session()
+    configure_session(backoff_factor=0.05)
+    rates = {}
+    for name, error_rate in (("healthy", 0.0), ("failing", 0.5)):
+        limiter = AdaptiveRateLimiter(initial=20, ceiling=100, increase=20)
+        start_run()
+        with FakeFashionStudio(pages=15, cards_per_page=2, error_rate=error_rate, seed=3) as site:
+            products = scrape_products(site.url, rate_limit=limiter)
+            host = site.url.split("//")[1]
+        gauges = finish_run()["gauges"]
+        rates[name] = limiter.current_rate(host)
+
+        assert len(products) == 30
+        assert gauges["rate_limit_" + host.replace(".", "_").replace(":", "_")] == round(rates[name], 3)
+    close_session()
+    configure_session(backoff_factor=BACKOFF_FACTOR)
+
+    assert rates["healthy"] > 20 > rates["failing"]
@@ -1,6 +1,7 @@
 import pytest
 import pandas as pd
-from utils.transform import transform_and_clean_data
+from utils.batch import ProductBatch
+from utils.transform import transform_and_clean_data, iter_transformed_chunks
 
 @pytest.fixture
 def test_data():
@@ -76,4 +77,42 @@ def test_transform_data_success(test_data):
     assert not df_result["Gender"].str.contains("Gender: ").any()
     assert pd.api.types.is_object_dtype(df_result["Gender"])
 
-    assert pd.api.types.is_object_dtype(df_result["Timestamp"])
\ No newline at end of file
+    assert pd.api.types.is_object_dtype(df_result["Timestamp"])
+
+def test_iter_transformed_chunks_matches_full_transform(test_data):
+    """Test chunked transforming drops duplicates across pages and matches one full transform"""
+    pages = [test_data[:2], test_data[2:], [test_data[1]]]
+
+    chunks = list(iter_transformed_chunks(pages, chunk_size=2))
+    df_streamed = pd.concat(chunks, ignore_index=True)
+    df_full = transform_and_clean_data(test_data).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(df_streamed, df_full)
+
+def test_iter_transformed_chunks_drops_products_repeated_on_later_pages(test_data):
+    """Test a product seen again on a later page with a new timestamp is only kept once"""
+    moved = dict(test_data[1], Timestamp="2030-01-01T00:00:00")
+    pages = [ProductBatch.from_products(test_data), ProductBatch.from_products([moved])]
+
+    df = pd.concat(list(iter_transformed_chunks(pages, chunk_size=2)), ignore_index=True)
+
+    assert len(df) == len(transform_and_clean_data(test_data))
+
+def test_transform_data_values(test_data):
+    df_result = transform_and_clean_data(test_data + [test_data[1]])
+
+    assert list(df_result.index) == [1]
+    row = df_result.loc[1]
+    assert row["Price"] == 102.15 * 16000
+    assert row["Rating"] == 3.9
+    assert row["Colors"] == 3
+    assert row["Size"] == "M"
+    assert row["Gender"] == "Women"
+
+def test_transform_data_compact(test_data):
+    df_result = transform_and_clean_data(test_data, compact=True)
+
+    assert isinstance(df_result["Size"].dtype, pd.CategoricalDtype)
+    assert isinstance(df_result["Gender"].dtype, pd.CategoricalDtype)
+    assert df_result["Colors"].dtype == "int8"
+    assert pd.api.types.is_float_dtype(df_result["Price"])
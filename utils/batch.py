@@ -0,0 +1,102 @@
+import hashlib
+
+COLUMNS = ("Title", "Price", "Rating", "Colors", "Size", "Gender")
+
+
+def product_digest(values):
+    """A 16-byte digest of a product's field values, for remembering which products a run has seen.
+
+    Callers leave the Timestamp out, so the same product scraped from two pages has one
+    digest. At 128 bits a collision between distinct products is not a practical concern,
+    and the set of seen digests costs a small fixed size per product.
+    """
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).digest()
+
+
+class ProductBatch:
+    """The products of one listing page as column lists sharing a single timestamp.
+
+    A page of cards costs six list slots per product instead of a seven-key dict and a
+    timestamp string each. Iterating a batch still yields the usual product dicts, so
+    it can stand in wherever a list of products is expected. A batch of a multi-source
+    run carries the name of its `source`, which becomes a "Source" column.
+    """
+
+    __slots__ = ("timestamp", "source", "titles", "prices", "ratings", "colors", "sizes", "genders")
+
+    def __init__(self, timestamp=None, source=None):
+        self.timestamp = timestamp
+        self.source = source
+        self.titles = []
+        self.prices = []
+        self.ratings = []
+        self.colors = []
+        self.sizes = []
+        self.genders = []
+
+    def _columns(self):
+        return self.titles, self.prices, self.ratings, self.colors, self.sizes, self.genders
+
+    def append(self, title, price, rating, colors, size, gender):
+        self.titles.append(title)
+        self.prices.append(price)
+        self.ratings.append(rating)
+        self.colors.append(colors)
+        self.sizes.append(size)
+        self.genders.append(gender)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def rows(self):
+        """One (title, price, rating, colors, size, gender) tuple per product"""
+        return zip(*self._columns())
+
+    def __iter__(self):
+        for row in self.rows():
+            product = dict(zip(COLUMNS, row))
+            product["Timestamp"] = self.timestamp
+            if self.source is not None:
+                product["Source"] = self.source
+            yield product
+
+    def take(self, indices):
+        """A new batch with only the products at `indices`"""
+        batch = ProductBatch(self.timestamp, self.source)
+        for name in self.__slots__[2:]:
+            column = getattr(self, name)
+            setattr(batch, name, [column[i] for i in indices])
+        return batch
+
+    @classmethod
+    def from_products(cls, products):
+        """Build a batch from product dicts, keeping the timestamp and source of the first one"""
+        products = list(products)
+        batch = cls(products[0]["Timestamp"], products[0].get("Source")) if products else cls()
+        for product in products:
+            batch.append(*(product[column] for column in COLUMNS))
+        return batch
+
+
+def batches_to_frame(batches):
+    """One DataFrame built column by column from a list of ProductBatch.
+
+    Columns are filled straight into object arrays, which pandas takes as they are
+    instead of inferring a dtype from Python lists.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rows = sum(len(batch) for batch in batches)
+    data = {}
+    for i, column in enumerate(COLUMNS + ("Timestamp",)):
+        values = np.empty(rows, dtype=object)
+        start = 0
+        for batch in batches:
+            end = start + len(batch)
+            values[start:end] = batch._columns()[i] if i < len(COLUMNS) else batch.timestamp
+            start = end
+        data[column] = values
+    if any(batch.source is not None for batch in batches):
+        data["Source"] = np.concatenate([np.full(len(batch), batch.source, dtype=object) for batch in batches])
+    return pd.DataFrame(data, copy=False)
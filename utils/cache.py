@@ -0,0 +1,167 @@
+import hashlib, json, os, threading, time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = ".cache/http"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 60 * 60  # seconds
+
+
+class ResponseCache:
+    """On-disk store of response bodies with their ETag/Last-Modified validators.
+
+    Each url is kept as a `<sha256>.body` file plus a `<sha256>.json` metadata file.
+    Entries older than `ttl` seconds are dropped, and the least recently used entries
+    are evicted once the stored bodies exceed `max_bytes`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = {"hits": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        for meta in sorted(entries, key=lambda m: m.get("last_access", 0)):
+            self._index[meta["key"]] = meta
+            self._total_bytes += meta.get("size", 0)
+
+    def _write_meta(self, meta):
+        meta_path, _ = self._paths(meta["key"])
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _remove(self, key):
+        meta = self._index.pop(key, None)
+        if meta is None:
+            return
+        self._total_bytes -= meta.get("size", 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def validators(self, url):
+        """Return conditional request headers for a cached url, or an empty dict"""
+        key = self.key_for(url)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return {}
+            if time.time() - meta["stored_at"] > self.ttl:
+                self._remove(key)
+                return {}
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            return headers
+
+    def load(self, url):
+        """Return the cached body after a 304 and mark the entry as fresh and recently used"""
+        key = self.key_for(url)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            _, body_path = self._paths(key)
+            try:
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._remove(key)
+                return None
+
+            now = time.time()
+            meta["stored_at"] = now
+            meta["last_access"] = now
+            self._index.move_to_end(key)
+            self._write_meta(meta)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(body)
+            return body
+
+    def store(self, url, body, headers):
+        """Store a 200 response body if it carries an ETag or Last-Modified validator"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not isinstance(etag, str):
+            etag = None
+        if not isinstance(last_modified, str):
+            last_modified = None
+        if not (etag or last_modified) or len(body) > self.max_bytes:
+            return
+
+        key = self.key_for(url)
+        now = time.time()
+        meta = {
+            "key": key,
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(body),
+            "stored_at": now,
+            "last_access": now,
+        }
+        with self._lock:
+            self._remove(key)
+            _, body_path = self._paths(key)
+            tmp_path = body_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+            self._write_meta(meta)
+            self._index[key] = meta
+            self._total_bytes += meta["size"]
+            self.stats["stores"] += 1
+
+            while self._total_bytes > self.max_bytes and self._index:
+                oldest_key = next(iter(self._index))
+                self._remove(oldest_key)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+
+_cache = None
+
+
+def configure_cache(directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, enabled=True):
+    """Enable (or disable) the response cache used by fetching_url_content"""
+    global _cache
+    _cache = ResponseCache(directory, max_bytes, ttl) if enabled else None
+    return _cache
+
+
+def get_cache():
+    """Return the configured response cache, or None when caching is disabled"""
+    return _cache
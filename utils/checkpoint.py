@@ -0,0 +1,109 @@
+import json, os, sqlite3, threading
+from datetime import datetime
+
+DEFAULT_CHECKPOINT_PATH = ".cache/scrape_checkpoint.sqlite3"
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class ScrapeCheckpoint:
+    """Persists every completed listing page of a crawl so a failed run can resume.
+
+    Pages are stored per catalog url in a local SQLite database; each page is committed
+    in its own transaction, so a killed process loses at most the page in flight. A page
+    that keeps failing is skipped once it has failed `max_attempts` times, so one broken
+    page cannot block the rest of the catalog, but the crawl then counts as incomplete.
+    `finish()` clears the completed pages once a crawl reached the last page so the next
+    run starts fresh; skipped pages keep their failure record.
+    """
+
+    def __init__(self, url, path=DEFAULT_CHECKPOINT_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.url = url
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT NOT NULL,"
+                " page INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " has_next INTEGER,"
+                " products TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT,"
+                " updated_at TEXT NOT NULL,"
+                " PRIMARY KEY (url, page))"
+            )
+
+    def get(self, page):
+        """Return (products, has_next) of a completed page, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT products, has_next FROM pages WHERE url = ? AND page = ? AND status = 'done'",
+                (self.url, page),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), bool(row[1])
+
+    def should_skip(self, page):
+        """True once a page has failed `max_attempts` times"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM pages WHERE url = ? AND page = ? AND status = 'failed'",
+                (self.url, page),
+            ).fetchone()
+        return row is not None and row[0] >= self.max_attempts
+
+    def mark_done(self, page, products, has_next):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, page, status, has_next, products, attempts, error, updated_at) "
+                "VALUES (?, ?, 'done', ?, ?, 0, NULL, ?)",
+                (self.url, page, int(has_next), json.dumps(list(products)), datetime.now().isoformat()),
+            )
+
+    def mark_failed(self, page, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pages (url, page, status, attempts, error, updated_at) "
+                "VALUES (?, ?, 'failed', 1, ?, ?) "
+                "ON CONFLICT (url, page) DO UPDATE SET status = 'failed', "
+                "attempts = attempts + 1, error = excluded.error, updated_at = excluded.updated_at",
+                (self.url, page, str(error), datetime.now().isoformat()),
+            )
+
+    def completed_pages(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page FROM pages WHERE url = ? AND status = 'done' ORDER BY page", (self.url,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def failed_pages(self):
+        """{page: (attempts, last error)} of pages that have not completed yet"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, attempts, error FROM pages WHERE url = ? AND status = 'failed' ORDER BY page",
+                (self.url,),
+            ).fetchall()
+        return {page: (attempts, error) for page, attempts, error in rows}
+
+    def finish(self):
+        """Forget this catalog's completed pages after a crawl reached the last page.
+
+        Pages that were skipped keep their failure record, with one attempt left so the
+        next crawl tries each of them once more before skipping it again.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE url = ? AND status = 'done'", (self.url,))
+            self._conn.execute(
+                "UPDATE pages SET attempts = MIN(attempts, ?) WHERE url = ? AND status = 'failed'",
+                (self.max_attempts - 1, self.url),
+            )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,166 @@
+import os, pickle, sqlite3, threading
+from datetime import datetime
+
+DEFAULT_DEAD_LETTER_PATH = ".cache/dead_letters.sqlite3"
+
+
+class DeadLetterStore:
+    """What a run could not process, kept with a reason code so it can be replayed offline.
+
+    Product cards the parser could not read completely are stored as their raw HTML
+    (kind "card", source = page url, reasons such as "missing_title,missing_price"),
+    and chunks a sink failed to write as pickled DataFrames (kind "chunk", source = sink
+    name, reason "sink_failed" or "sink_timeout" with the error, grouped by load run).
+    While a run is loaded into sinks that only commit on close, its chunks are spooled
+    (kind "spool") so the whole run can be dead-lettered if such a sink fails. Items
+    live in a local SQLite database until a replay (`python main.py --replay`) removes
+    them.
+    """
+
+    def __init__(self, path=DEFAULT_DEAD_LETTER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " reason TEXT NOT NULL,"
+                " error TEXT,"
+                " run TEXT,"
+                " payload BLOB NOT NULL,"
+                " created_at TEXT NOT NULL)"
+            )
+
+    def _add(self, rows):
+        created_at = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO dead_letters (kind, source, reason, error, run, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row + (created_at,) for row in rows],
+            )
+
+    @staticmethod
+    def _serialize(df):
+        # Pickle keeps every dtype and, unlike Parquet, needs no pyarrow on a CSV-only run;
+        # the store is a local file written and read only by this pipeline
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def add_cards(self, page_url, cards):
+        """Store (reason, card html) pairs of one listing page"""
+        self._add([("card", page_url, reason, None, None, html.encode("utf-8")) for reason, html in cards])
+
+    def add_chunk(self, sink, reason, df, error=None, run=None):
+        """Store a chunk `sink` did not write"""
+        self._add([("chunk", sink, reason, error, run, self._serialize(df))])
+
+    def spool(self, run, df):
+        """Keep a chunk of a run being loaded until the run is committed or dead-lettered"""
+        self._add([("spool", run, "spool", None, run, self._serialize(df))])
+
+    def add_spooled_run(self, run, sink, reason, error=None):
+        """Store every spooled chunk of `run` as a chunk `sink` did not write"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO dead_letters (kind, source, reason, error, run, payload, created_at) "
+                "SELECT 'chunk', ?, ?, ?, run, payload, ? FROM dead_letters "
+                "WHERE kind = 'spool' AND run = ? ORDER BY id",
+                (sink, reason, error, datetime.now().isoformat(), run),
+            )
+
+    def supersede(self, sink):
+        """Remove the chunks stored for `sink`, whose output a later successful run replaced"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM dead_letters WHERE kind = 'chunk' AND source = ?",
+                                      (sink,)).rowcount
+
+    def drop_spool(self, run):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM dead_letters WHERE kind = 'spool' AND run = ?", (run,))
+
+    def ids(self, kind, source=None, run=None):
+        query = "SELECT id FROM dead_letters WHERE kind = ?"
+        params = (kind,)
+        if source is not None:
+            query += " AND source = ?"
+            params += (source,)
+        if run is not None:
+            query += " AND run = ?"
+            params += (run,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        return [row[0] for row in rows]
+
+    def runs(self, sink):
+        """The load runs with chunks dead-lettered for `sink`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run FROM dead_letters WHERE kind = 'chunk' AND source = ? GROUP BY run ORDER BY MIN(id)",
+                (sink,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def cards(self):
+        """(id, page url, reason, html) of every stored card"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, source, reason, payload FROM dead_letters WHERE kind = 'card' ORDER BY id"
+            ).fetchall()
+        return [(id_, page_url, reason, payload.decode("utf-8")) for id_, page_url, reason, payload in rows]
+
+    def chunk(self, id_):
+        """The DataFrame of a stored chunk"""
+        with self._lock:
+            payload = self._conn.execute("SELECT payload FROM dead_letters WHERE id = ?", (id_,)).fetchone()[0]
+        return pickle.loads(payload)
+
+    def remove(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM dead_letters WHERE id = ?", [(id_,) for id_ in ids])
+
+    def summary(self):
+        """{kind: {source or reason: count}}: cards counted by reason, chunks by sink"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, CASE kind WHEN 'card' THEN reason ELSE source END, COUNT(*) "
+                "FROM dead_letters WHERE kind != 'spool' GROUP BY 1, 2"
+            ).fetchall()
+        summary = {}
+        for kind, key, total in rows:
+            summary.setdefault(kind, {})[key] = total
+        return summary
+
+    def close(self):
+        self._conn.close()
+
+
+def failed_cards(failures, to_html):
+    """(reasons, html) per card from the (reason, card) pairs a parser collected"""
+    reasons = {}
+    cards = {}
+    for reason, card in failures:
+        reasons.setdefault(id(card), []).append(reason)
+        cards[id(card)] = card
+    return [(",".join(reasons[key]), to_html(card)) for key, card in cards.items()]
+
+
+_store = None
+
+
+def configure_dead_letters(path=DEFAULT_DEAD_LETTER_PATH, enabled=True):
+    """Enable (or disable) the dead-letter store used by extract and main.py"""
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = DeadLetterStore(path) if enabled and path else None
+    return _store
+
+
+def get_dead_letters():
+    """Return the configured dead-letter store, or None when dead letters are disabled"""
+    return _store
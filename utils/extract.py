@@ -1,6 +1,15 @@
 import time, requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup
+import bs4
+from bs4 import BeautifulSoup, SoupStrainer
+from utils.batch import COLUMNS, ProductBatch
+from utils.cache import get_cache
+from utils.dead_letter import failed_cards, get_dead_letters
+from utils.metrics import count, observe_page, timed
+from utils.parsers import lxml_available, parse_page_lxml
+from utils.session import get_with_retries
+from utils.throttle import AdaptiveRateLimiter, RateLimiter, make_limiter
 
 HEADERS = {
     "User-Agent": (
@@ -9,74 +18,432 @@ HEADERS = {
     )
 }
 
-def fetching_url_content(url):
-    """Fetch HTML Content from url"""
-    session = requests.Session()
+PARSERS = ("lxml", "bs4")
+DEFAULT_PARSER = "lxml" if lxml_available() else "bs4"
+# Bump whenever a parser change alters the products parsed from an unchanged page, so
+# pages stored in a PageIndex are parsed again
+PARSER_VERSION = 1
+
+
+def _is_card_or_page_link(class_value):
+    return bool(class_value) and any(
+        name in ("collection-card", "page-link") for name in class_value.split()
+    )
+
+
+# Only build the product cards and pagination links instead of the whole page tree
+PAGE_STRAINER = SoupStrainer(["div", "a"], class_=_is_card_or_page_link)
+
+def fetching_url_content(url, bypass_cache=False, raise_errors=False, session=None, throttle=None):
+    """Fetch HTML Content from url using `session`, by default the shared pooled session.
+
+    When a response cache is configured, cached validators are sent as conditional
+    headers and a 304 Not Modified is served from the cache. A 404 returns None; other
+    errors are printed and return None too, unless `raise_errors` re-raises them. Every
+    request attempt is reported to `throttle` (an AdaptiveRateLimiter) when given.
+    """
+    cache = None if bypass_cache else get_cache()
     try:
-        response = session.get(url, headers=HEADERS)
-        response.raise_for_status()
+        headers = HEADERS
+        if cache:
+            headers = {**HEADERS, **cache.validators(url)}
+
+        response = get_with_retries(url, session=session, throttle=throttle, headers=headers)
+        if cache and response.status_code == 304:
+            body = cache.load(url)
+            if body is not None:
+                return body
+            response = get_with_retries(url, session=session, throttle=throttle, headers=HEADERS)
 
         if response.status_code == 404:
             return None
-        
+
+        response.raise_for_status()
+
+        if cache:
+            cache.store(url, response.content, response.headers)
         return response.content
     except requests.exceptions.Timeout:
         print("Timeout Error while making requests to {}".format(url))
+        if raise_errors:
+            raise
         return None
     except requests.exceptions.RequestException as e:
         print(f"Error when making requests to {url}: {e}")
+        if raise_errors:
+            raise
         return None
     except Exception as e:
         print(f"An Error occyreed while scraping {url}: {e}")
+        if raise_errors:
+            raise
         return None
-    
-def scrape_products(url, start_page=1, delay=1):
+
+
+_FETCH_FAILED = object()
+
+
+class CrawlStatus:
+    """Whether a crawl reached the end of the catalog; set by the page iterators.
+
+    A crawl that stops early on a page that failed to fetch or parse stays incomplete,
+    so loaders can tell a partial catalog from products that disappeared.
+    """
+
+    def __init__(self):
+        self.complete = False
+
+
+def fetch_listing_page(page_url, page, checkpoint=None, session=None, limiter=None):
+    """Fetch a listing page, recording a fetch error against `page` in the checkpoint.
+
+    Returns the page bytes, None at the end of the catalog, or _FETCH_FAILED when the
+    request failed. An adaptive `limiter` gets feedback on every request.
+    """
+    options = {} if session is None else {"session": session}
+    if isinstance(limiter, AdaptiveRateLimiter):
+        options["throttle"] = limiter
+    with timed("extract.fetch") as timer:
+        try:
+            content = fetching_url_content(page_url, raise_errors=True, **options)
+        except Exception as e:
+            if checkpoint is not None:
+                checkpoint.mark_failed(page, e)
+            content = _FETCH_FAILED
+
+    size = len(content) if isinstance(content, bytes) else 0
+    count("extract.fetch", "pages")
+    count("extract.fetch", "bytes", size)
+    observe_page(page_url, page=page, bytes=size, fetch_seconds=round(timer.seconds, 6))
+    return content
+
+
+def parse_listing_page(content, parser, page_url, as_batch=False, page_index=None):
+    """parse_page with its time and card count recorded against the page url.
+
+    With a PageIndex, a page whose body is unchanged since it was last parsed is rebuilt
+    from the index with a fresh timestamp instead of being parsed again. Cards that could
+    not be parsed completely go to the configured dead-letter store.
+    """
+    store = get_dead_letters()
+    with timed("extract.parse") as timer:
+        stored = None
+        if page_index is not None:
+            body_hash = page_index.digest(content)
+            parser_key = parser_id(parser)
+            stored = page_index.get(page_url, body_hash, as_batch, parser_key)
+            count("extract.parse", "index_hits" if stored is not None else "index_misses")
+        if stored is not None:
+            page_products, has_next_page = stored
+        else:
+            dead_letters = None if store is None else []
+            page_products, has_next_page = parse_page(content, parser, as_batch, dead_letters)
+            if dead_letters:
+                store.add_cards(page_url, dead_letters)
+                count("extract.parse", "dead_letters", len(dead_letters))
+            if page_index is not None:
+                page_index.put(page_url, body_hash, page_products, has_next_page, parser_key)
+    count("extract.parse", "cards", len(page_products))
+    observe_page(page_url, parse_seconds=round(timer.seconds, 6), cards=len(page_products))
+    return page_products, has_next_page
+
+
+def checkpointed_page(page, checkpoint, as_batch=False, page_url=None, page_index=None):
+    """(products, has_next) of a page the checkpoint already holds or has given up on, else None.
+
+    Such a page is marked seen in `page_index`, so finishing the crawl does not evict it.
+    """
+    if checkpoint is None:
+        return None
+    stored = checkpoint.get(page)
+    if stored is None and checkpoint.should_skip(page):
+        print(f"Skipping page {page} after {checkpoint.max_attempts} failed attempts")
+        stored = [], True
+    if stored is not None and page_index is not None:
+        page_index.mark_seen(page_url)
+    if stored is not None and as_batch:
+        return ProductBatch.from_products(stored[0]), stored[1]
+    return stored
+
+
+def finish_crawl(checkpoint=None, page_index=None, crawl=None):
+    """After the last page, clear the checkpoint, evict vanished pages from the index and mark `crawl` complete.
+
+    If the checkpoint gave up on pages along the way, the crawl is not complete: `crawl`
+    stays incomplete, the skipped pages keep their failure record and nothing is evicted.
+    """
+    skipped = checkpoint.failed_pages() if checkpoint is not None else {}
+    if skipped:
+        print(f"Crawl incomplete, skipped pages: {', '.join(str(page) for page in skipped)}")
+    if crawl is not None:
+        crawl.complete = not skipped
+    if checkpoint is not None:
+        checkpoint.finish()
+    if page_index is not None and not skipped:
+        page_index.finish()
+
+
+def build_page_url(url, page, start_page=1):
+    """Build the url of a listing page the same way the sequential scraper walks pages"""
+    if page == start_page:
+        return url
+    base_url = url.replace("/page{}".format(start_page), "")
+    return base_url + "/page{}".format(page)
+
+
+def parser_id(parser=None):
+    """Name, library version and PARSER_VERSION of the engine `parse_page` would use for `parser`.
+
+    A callable parser bound to an object with a `parser_id` (see sources.SourceAdapter)
+    is identified by it, any other callable by its qualified name.
+    """
+    if callable(parser):
+        owner = getattr(parser, "__self__", None)
+        if getattr(owner, "parser_id", None):
+            return owner.parser_id
+        return "{}/{}".format(parser.__qualname__, PARSER_VERSION)
+    parser = parser or DEFAULT_PARSER
+    if parser == "lxml":
+        from lxml import etree
+        return "lxml-{}/{}".format(etree.__version__, PARSER_VERSION)
+    return "{}-{}/{}".format(parser, bs4.__version__, PARSER_VERSION)
+
+
+def parse_page(content, parser=None, as_batch=False, dead_letters=None):
+    """Parse a listing page, return its products and whether a next page link exists.
+
+    `parser` picks the engine: "lxml" (precompiled XPath, the default when lxml is
+    installed) or "bs4" (BeautifulSoup restricted to the product cards), or is a
+    callable(content, as_batch) such as a source adapter's parse method. Every product
+    of a page gets the same timestamp; `as_batch=True` returns them as a ProductBatch
+    instead of a list of dicts. Cards that fell back to placeholders ("Title Unavailable",
+    "Not Rated", ...) are appended to the `dead_letters` list as (reasons, card html);
+    callable parsers do not report them.
+    """
+    if callable(parser):
+        return parser(content, as_batch)
+    parser = parser or DEFAULT_PARSER
+    if parser == "lxml":
+        return parse_page_lxml(content, as_batch, dead_letters)
+    if parser != "bs4":
+        raise ValueError("Unknown parser {!r}, expected one of {}".format(parser, PARSERS))
+
+    soup = BeautifulSoup(content, "html.parser", parse_only=PAGE_STRAINER)
+    div_cards = soup.find_all("div", {"class": "collection-card"})
+    timestamp = datetime.now().isoformat()
+    failures = None if dead_letters is None else []
+
+    if as_batch:
+        products = ProductBatch(timestamp)
+        for card in div_cards:
+            products.append(*product_fields(card, failures))
+    else:
+        products = [parse_product_details(card, timestamp, failures) for card in div_cards]
+
+    if failures:
+        dead_letters.extend(failed_cards(failures, str))
+    is_nextPage = soup.find('a', {"class": "page-link"})
+    return products, bool(is_nextPage)
+
+
+def scrape_products(url, start_page=1, delay=None, max_workers=1, rate_limit=None, parser=None, page_index=None):
     """Make request to website, get all products, and save to a variable"""
     products = []
+    for page_products in iter_product_pages(url, start_page, delay, max_workers, rate_limit, parser,
+                                            page_index=page_index):
+        products.extend(page_products)
+    return products
+
+
+def scrape_products_concurrently(url, start_page=1, max_workers=8, rate_limit=None, parser=None):
+    """Concurrent counterpart of scrape_products, see iter_product_pages_concurrently"""
+    products = []
+    for page_products in iter_product_pages_concurrently(url, start_page, max_workers, rate_limit, parser):
+        products.extend(page_products)
+    return products
+
+
+def iter_product_pages(url, start_page=1, delay=None, max_workers=1, rate_limit=None, parser=None,
+                       checkpoint=None, as_batch=False, page_index=None, crawl=None):
+    """Yield the list of products of each listing page as soon as the page is parsed.
+
+    With a ScrapeCheckpoint, pages completed by an earlier, interrupted run are replayed
+    from the checkpoint instead of fetched again, every newly parsed page is saved, and
+    the checkpoint is cleared once the whole catalog has been crawled. With `as_batch`
+    each page is yielded as a ProductBatch. With a PageIndex, unchanged pages are not
+    parsed again (see parse_listing_page). A CrawlStatus `crawl` is marked complete once
+    the last page of the catalog has been reached.
+
+    Requests are paced by `rate_limit` (see throttle.make_limiter). Without a rate limit
+    or a fixed `delay` between pages, the rate adapts to the server's responses.
+    """
+    if rate_limit is None and delay is None:
+        rate_limit = "adaptive"
+    if max_workers > 1:
+        yield from iter_product_pages_concurrently(url, start_page, max_workers, rate_limit, parser, checkpoint,
+                                                   as_batch, page_index=page_index, crawl=crawl)
+        return
+
+    limiter = make_limiter(rate_limit)
     page = start_page
 
     while True:
-        if (page != start_page):
-            url = url.replace("/page{}".format(page-1), "")
-            url = url + "/page{}".format(page) 
-        print("Scraping: ", url)
+        stored = checkpointed_page(page, checkpoint, as_batch, build_page_url(url, page, start_page), page_index)
+        if stored is not None:
+            page_products, has_next_page = stored
+            yield page_products
+            if has_next_page:
+                page += 1
+                continue
+            finish_crawl(checkpoint, page_index, crawl)
+            break
+
+        page_url = build_page_url(url, page, start_page)
+        limiter.wait(page_url)
+        print("Scraping: ", page_url)
 
-        content = fetching_url_content(url)
+        content = fetch_listing_page(page_url, page, checkpoint, limiter=limiter)
+        if content is _FETCH_FAILED:
+            break
 
         if content:
             try:
-                soup = BeautifulSoup(content, "html.parser")
-                div_cards = soup.find_all("div", {"class": "collection-card"})
-
-                for card in div_cards:
-                    timestamp = datetime.now().isoformat()
-                    product = parse_product_details(card, timestamp)
-                    products.append(product)
-
-                is_nextPage = soup.find('a', {"class": "page-link"})
-                if is_nextPage:
-                    page += 1
-                    time.sleep(delay)
-                else:
-                    break
+                page_products, has_next_page = parse_listing_page(content, parser, page_url, as_batch, page_index)
             except AttributeError as e:
                 print(f"Attribute error occured while parsing page {page}: {e}")
+                continue
             except Exception as e:
-                print(f"Error parsing page {url}: {e}")
+                print(f"Error parsing page {page_url}: {e}")
+                break
+
+            if checkpoint is not None:
+                checkpoint.mark_done(page, page_products, has_next_page)
+            yield page_products
+
+            if has_next_page:
+                page += 1
+                if delay:
+                    time.sleep(delay)
+            else:
+                finish_crawl(checkpoint, page_index, crawl)
                 break
         else:
+            finish_crawl(checkpoint, page_index, crawl)
             break
 
-    return products
 
+def iter_product_pages_concurrently(url, start_page=1, max_workers=8, rate_limit=None, parser=None,
+                                    checkpoint=None, as_batch=False, paginate=None, session=None, page_index=None,
+                                    crawl=None):
+    """Fetch up to `max_workers` pages in flight, probing ahead one window at a time.
+
+    Pages are yielded in page order and the crawl stops at the first page that fails
+    to fetch or has no next page link, so the result matches the sequential scraper.
+    `rate_limit` paces request starts for each host, see throttle.make_limiter.
+    `checkpoint`, `page_index` and `crawl` work as in iter_product_pages. `paginate(page)` gives
+    the url of a page (build_page_url by default) and `session` replaces the shared
+    pooled session.
+    """
+    limiter = make_limiter(rate_limit)
+    if paginate is None:
+        paginate = lambda page: build_page_url(url, page, start_page)
+
+    def fetch(page):
+        stored = checkpointed_page(page, checkpoint, as_batch, paginate(page), page_index)
+        if stored is not None:
+            return stored
+        page_url = paginate(page)
+        limiter.wait(page_url)
+        print("Scraping: ", page_url)
+        return fetch_listing_page(page_url, page, checkpoint, session, limiter)
+
+    page = start_page
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            window = list(range(page, page + max_workers))
+            results = executor.map(fetch, window)
+
+            for page, result in zip(window, results):
+                if result is _FETCH_FAILED:
+                    return
+                if not result:
+                    finish_crawl(checkpoint, page_index, crawl)
+                    return
+
+                if isinstance(result, tuple):
+                    page_products, has_next_page = result
+                else:
+                    try:
+                        page_products, has_next_page = parse_listing_page(result, parser, paginate(page), as_batch,
+                                                                          page_index)
+                    except Exception as e:
+                        print(f"Error parsing page {paginate(page)}: {e}")
+                        return
+                    if checkpoint is not None:
+                        checkpoint.mark_done(page, page_products, has_next_page)
+
+                yield page_products
+                if not has_next_page:
+                    finish_crawl(checkpoint, page_index, crawl)
+                    return
+
+            page += 1
 
-def parse_product_details(card, timestamp):
+
+def iter_page_contents(url, start_page=1, max_workers=8, rate_limit=None, crawl=None):
+    """Yield the raw bytes of each listing page in page order, fetching a window at a time.
+
+    Parsing is left to the caller, so the pages can be handed to worker processes; the
+    crawl stops at the first page that is missing or fails to fetch; a missing page
+    marks the CrawlStatus `crawl` complete. Callers stop iterating once a parsed page
+    has no next page link.
+    """
+    limiter = make_limiter(rate_limit)
+
+    def fetch(page):
+        page_url = build_page_url(url, page, start_page)
+        limiter.wait(page_url)
+        print("Scraping: ", page_url)
+        return fetch_listing_page(page_url, page, limiter=limiter)
+
+    page = start_page
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            window = list(range(page, page + max_workers))
+            for content in executor.map(fetch, window):
+                if content is _FETCH_FAILED:
+                    return
+                if not content:
+                    finish_crawl(crawl=crawl)
+                    return
+                yield content
+            page += max_workers
+
+
+def parse_card(html, parser=None):
+    """Parse the html of one stored product card: (ProductBatch, reasons it still fails or [])"""
+    dead_letters = []
+    products, _ = parse_page("<html><body>{}</body></html>".format(html), parser, True, dead_letters)
+    return products, [reason for reasons, _ in dead_letters for reason in reasons.split(",")]
+
+
+def parse_product_details(card, timestamp, failures=None):
     """Parse html to get product details (Title, Price, Rating, Colors, Size, Gender)"""
+    product = dict(zip(COLUMNS, product_fields(card, failures)))
+    product["Timestamp"] = timestamp
+    return product
+
+
+def product_fields(card, failures=None):
+    """(title, price, rating, colors, size, gender) of a product card"""
     try:
         title = card.find("h3", {"class": "product-title"}).text
     except Exception as e:
         title = "Title Unavailable"
         print(f"Error while parsing product title: {e}")
+        if failures is not None:
+            failures.append(("missing_title", card))
 
     try:
         price_element = card.find("span", class_='price')
@@ -86,6 +453,8 @@ def parse_product_details(card, timestamp):
     except(AttributeError) as e:
         price = "Price Unavailable"
         print("Error while parsing product price: {}".format(e))
+        if failures is not None:
+            failures.append(("missing_price", card))
 
     try:
         additional_infos = card.find_all("p", {"style": "font-size: 14px; color: #777;"})
@@ -96,15 +465,7 @@ def parse_product_details(card, timestamp):
     except (IndexError, ValueError) as e:
         rating, colors, size, gender = "Not Rated", "Unknown Colors", "Unknown Size", "Unknown Gender"
         print(f"Warning: Some product details (rating, colors, size, gender) are missing. Error: {e}")
+        if failures is not None:
+            failures.append(("missing_details", card))
 
-    product = {
-        "Title": title,
-        "Price": price,
-        "Rating": rating,
-        "Colors": colors,
-        "Size": size,
-        "Gender": gender,
-        "Timestamp": timestamp
-    }
-
-    return product
\ No newline at end of file
+    return title, price, rating, colors, size, gender
@@ -1,11 +1,317 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from sqlalchemy import create_engine
+import csv, gzip, io, queue, random, shutil, threading, time
+import os, uuid
+from datetime import datetime
+import pandas as pd
+from utils.metrics import count, timed
 
-def load_to_csv(filename, df):
-    """"Store data to CSV File"""
+# Google API clients, SQLAlchemy and pyarrow are imported on first use, so a run that
+# only writes CSV never pays for them
+pa = pc = pq = None
+
+DEFAULT_KEY_COLUMNS = ("Title", "Size", "Gender")
+# Retailers of a multi-source run can sell products with the same title, size and gender
+SOURCE_KEY_COLUMNS = ("Source",) + DEFAULT_KEY_COLUMNS
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SHEETS_CREDENTIALS_FILE = './google-sheets-api.json'
+SHEETS_RETRY_STATUS_CODES = (429, 500, 503)
+SHEETS_MAX_RETRIES = 5
+SHEETS_MAX_BACKOFF = 64
+SHEETS_MODES = ("append", "sync", "add")
+MAX_CELLS_PER_REQUEST = 50000
+PARQUET_PARTITION_COLUMN = "scrape_date"
+PARQUET_DICTIONARY_COLUMNS = ("Size", "Gender")
+PARQUET_ROW_GROUP_SIZE = 100000
+CSV_MODES = ("replace", "append")
+CSV_COMPRESSIONS = ("gzip", "zstd")
+CSV_BUFFER_SIZE = 1024 * 1024
+CSV_CHUNK_ROWS = 100000
+_engines = {}
+_engines_lock = threading.Lock()
+_sheets_clients = {}
+
+
+def get_engine(URL_DB):
+    """Return the pooled engine for URL_DB, created once and reused across loads and runs"""
+    with _engines_lock:
+        engine = _engines.get(URL_DB)
+        if engine is None:
+            from sqlalchemy import create_engine
+            engine = create_engine(URL_DB, pool_size=5, pool_pre_ping=True)
+            _engines[URL_DB] = engine
+        return engine
+
+
+def dispose_engines():
+    """Close every pooled connection and forget the cached engines"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def get_sheets(credentials_file=SHEETS_CREDENTIALS_FILE):
+    """Return the Sheets `spreadsheets()` resource, built once per credentials file"""
+    with _engines_lock:
+        sheets = _sheets_clients.get(credentials_file)
+        if sheets is None:
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+            creds = Credentials.from_service_account_file(credentials_file, scopes=SHEETS_SCOPES)
+            sheets = build('sheets', 'v4', credentials=creds).spreadsheets()
+            _sheets_clients[credentials_file] = sheets
+        return sheets
+
+
+def reset_sheets_clients():
+    """Forget the cached Sheets clients so the next call rebuilds them"""
+    with _engines_lock:
+        _sheets_clients.clear()
+
+
+def execute_with_backoff(request, max_retries=SHEETS_MAX_RETRIES):
+    """Execute a Sheets API request, retrying quota and server errors with truncated exponential backoff"""
+    from googleapiclient.errors import HttpError
+    attempt = 0
+    while True:
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status not in SHEETS_RETRY_STATUS_CODES or attempt >= max_retries:
+                raise
+            time.sleep(min(2 ** attempt + random.uniform(0, 1), SHEETS_MAX_BACKOFF))
+            attempt += 1
+
+
+def column_letter(number):
+    """Spreadsheet column name of a 1-based column number (1 -> A, 27 -> AA)"""
+    letters = ""
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _sheet_cell(value):
+    """Normalize a cell so frame values and values read back from Sheets compare equal"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+def diff_sheet_rows(current_rows, new_rows, compare_columns):
+    """Return the indexes of `new_rows` that differ from the sheet on `compare_columns`"""
+    changed = []
+    for i, row in enumerate(new_rows):
+        if i >= len(current_rows):
+            changed.append(i)
+            continue
+        old_row = current_rows[i]
+        columns = range(max(len(row), len(old_row))) if i == 0 else compare_columns
+        for column in columns:
+            new_value = _sheet_cell(row[column]) if column < len(row) else ""
+            old_value = _sheet_cell(old_row[column]) if column < len(old_row) else ""
+            if new_value != old_value:
+                changed.append(i)
+                break
+    return changed
+
+
+def build_sheet_updates(sheet_name, new_rows, changed, width, max_cells=MAX_CELLS_PER_REQUEST):
+    """Group changed rows into contiguous ranges and pack them into batches under `max_cells`"""
+    max_rows = max(1, max_cells // width)
+    last_column = column_letter(width)
+
+    ranges = []
+    for i in changed:
+        if ranges and ranges[-1][-1] == i - 1 and len(ranges[-1]) < max_rows:
+            ranges[-1].append(i)
+        else:
+            ranges.append([i])
+
+    batches, batch, batch_cells = [], [], 0
+    for rows in ranges:
+        cells = len(rows) * width
+        if batch and batch_cells + cells > max_cells:
+            batches.append(batch)
+            batch, batch_cells = [], 0
+        values = [list(new_rows[i]) + [""] * (width - len(new_rows[i])) for i in rows]
+        batch.append({
+            'range': '{}!A{}:{}{}'.format(sheet_name, rows[0] + 1, last_column, rows[-1] + 1),
+            'values': values,
+        })
+        batch_cells += cells
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def sync_to_google_sheets(spreadsheet_id, df, sheet_name='Sheet1', ignore_columns=("Timestamp",),
+                          max_cells=MAX_CELLS_PER_REQUEST):
+    """Write only the rows of df that differ from what the sheet already holds.
+
+    The sheet is read once, compared row by row (ignoring `ignore_columns`, so a fresh
+    scrape Timestamp alone does not count as a change), and the changed rows are sent
+    as `values.batchUpdate` ranges of at most `max_cells` cells per request. Rows left
+    over from a longer previous sync are cleared. Returns the number of changed rows and API calls.
+    """
+    sheets = get_sheets()
+    current_rows = execute_with_backoff(sheets.values().get(
+        spreadsheetId=spreadsheet_id,
+        range=sheet_name,
+        valueRenderOption='UNFORMATTED_VALUE'
+    )).get('values', [])
+    api_calls = 1
+
+    new_rows = [df.columns.tolist()] + df.values.tolist()
+    width = max([len(new_rows[0])] + [len(row) for row in current_rows])
+    compare_columns = [i for i, column in enumerate(df.columns) if column not in ignore_columns]
+    changed = diff_sheet_rows(current_rows, new_rows, compare_columns)
+
+    for data in build_sheet_updates(sheet_name, new_rows, changed, width, max_cells):
+        execute_with_backoff(sheets.values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'valueInputOption': 'RAW', 'data': data}
+        ))
+        api_calls += 1
+
+    if len(current_rows) > len(new_rows):
+        execute_with_backoff(sheets.values().batchClear(
+            spreadsheetId=spreadsheet_id,
+            body={'ranges': ['{}!A{}:{}{}'.format(
+                sheet_name, len(new_rows) + 1, column_letter(width), len(current_rows)
+            )]}
+        ))
+        api_calls += 1
+
+    return {"changed_rows": len(changed), "api_calls": api_calls}
+
+
+def psql_insert_copy(table, conn, keys, data_iter):
+    """pandas `to_sql` method that bulk loads rows through PostgreSQL COPY FROM STDIN.
+
+    The rows are serialized to an in-memory CSV buffer, no temporary file is written.
+    """
+    table_name = '{}.{}'.format(table.schema, table.name) if table.schema else table.name
+    return copy_rows(conn.connection, table_name, keys, data_iter)
+
+
+def copy_rows(dbapi_conn, table_name, columns, rows):
+    """Send rows to `table_name` with COPY FROM STDIN through an in-memory CSV buffer"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    column_list = ', '.join('"{}"'.format(column) for column in columns)
+    with dbapi_conn.cursor() as cursor:
+        cursor.copy_expert('COPY {} ({}) FROM STDIN WITH CSV'.format(table_name, column_list), buffer)
+        return cursor.rowcount
+
+
+def add_row_hash(df, key_columns=DEFAULT_KEY_COLUMNS):
+    """Return a copy of df with a `row_hash` of the columns that describe a product's state.
+
+    Key columns and the scrape Timestamp are left out so a product only hashes differently
+    when its price, rating, colors or other attributes actually changed.
+    """
+    content_columns = [c for c in df.columns if c not in key_columns and c not in ("Timestamp", "row_hash")]
+    hashed = df.copy()
+    hashed["row_hash"] = pd.util.hash_pandas_object(df[content_columns], index=False).astype("int64")
+    return hashed
+
+
+def build_upsert_sql(table_name, staging_name, columns, key_columns, update=True):
+    """INSERT ... ON CONFLICT statement that only rewrites rows whose row_hash changed.
+
+    With `update=False` rows whose key already exists are left alone, so only new rows are added.
+    """
+    quote = '"{}"'.format
+    column_list = ', '.join(quote(c) for c in columns)
+    if update:
+        updates = ', '.join('{0} = EXCLUDED.{0}'.format(quote(c)) for c in columns if c not in key_columns)
+        conflict = 'DO UPDATE SET {} WHERE {}.row_hash IS DISTINCT FROM EXCLUDED.row_hash '.format(
+            updates, table_name)
+    else:
+        conflict = 'DO NOTHING '
+    return (
+        'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} '
+        'ON CONFLICT ({keys}) {conflict}'
+        'RETURNING (xmax = 0) AS inserted'
+    ).format(
+        table=table_name,
+        columns=column_list,
+        staging=staging_name,
+        keys=', '.join(quote(c) for c in key_columns),
+        conflict=conflict,
+    )
+
+
+def prepare_upsert_table(conn, df, table_name='products', key_columns=DEFAULT_KEY_COLUMNS):
+    """Create `table_name` for df if needed, with a row_hash column and a unique index on `key_columns`.
+
+    A table filled by the append mode can hold a product once per run. Before the index
+    is first built, those duplicates are removed, keeping the most recently scraped row
+    of each key, which is what upserting every run would have left. Returns the number
+    of rows removed.
+    """
+    quote = '"{}"'.format
+    index_name = '{}_natural_key'.format(table_name)
+    df.head(0).to_sql(table_name, con=conn, if_exists='append', index=False)
+    conn.exec_driver_sql('ALTER TABLE {} ADD COLUMN IF NOT EXISTS row_hash BIGINT'.format(table_name))
+    if conn.exec_driver_sql("SELECT to_regclass('{}')".format(index_name)).scalar() is not None:
+        return 0
+
+    same_key = ' AND '.join('a.{0} = b.{0}'.format(quote(c)) for c in key_columns)
+    newer = '(b."Timestamp", b.ctid) > (a."Timestamp", a.ctid)' if "Timestamp" in df.columns else 'b.ctid > a.ctid'
+    removed = conn.exec_driver_sql(
+        'DELETE FROM {0} a USING {0} b WHERE {1} AND {2}'.format(table_name, same_key, newer)).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate rows from {table_name} before adding its unique key")
+    conn.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})'.format(
+        index_name, table_name, ', '.join(quote(c) for c in key_columns)))
+    return removed
+
+
+def upsert_dataframe(conn, df, table_name='products', key_columns=DEFAULT_KEY_COLUMNS, update=True, prepare=True):
+    """Upsert df into `table_name` on an open SQLAlchemy connection, inside its transaction.
+
+    Rows are copied into a temporary staging table and merged with INSERT ... ON CONFLICT;
+    rows whose content hash is unchanged are not rewritten, and with `update=False` no
+    existing row is. The table is set up with prepare_upsert_table first unless `prepare`
+    is False, e.g. for every chunk after the first of a run. Returns
+    inserted/updated/unchanged counts.
+    """
+    key_columns = list(key_columns)
+    df = add_row_hash(df.drop_duplicates(subset=key_columns, keep="last"), key_columns)
+    columns = list(df.columns)
+    staging_name = '{}_staging'.format(table_name)
+
+    if prepare:
+        prepare_upsert_table(conn, df, table_name, key_columns)
+    conn.exec_driver_sql('CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP'.format(staging_name, table_name))
+
+    copy_rows(conn.connection, staging_name, columns, df.itertuples(index=False, name=None))
+    result = conn.exec_driver_sql(build_upsert_sql(table_name, staging_name, columns, key_columns, update))
+
+    written = [row[0] for row in result]
+    inserted = sum(1 for is_insert in written if is_insert)
+    updated = len(written) - inserted
+    return {"inserted": inserted, "updated": updated, "unchanged": len(df) - inserted - updated}
+
+def load_to_csv(filename, df, mode="replace", compression="infer"):
+    """"Store data to CSV File
+
+    The frame is written through a CsvSink in slices of CSV_CHUNK_ROWS rows, so the file
+    is replaced atomically (or appended to with `mode="append"`).
+    """
     try:
-        df.to_csv(filename, index=False)
+        sink = CsvSink(filename, mode, compression)
+        for start in range(0, max(len(df), 1), CSV_CHUNK_ROWS):
+            sink.write(df.iloc[start:start + CSV_CHUNK_ROWS])
+        sink.close()
         print(f"Data successfully saved to {filename}")
     except FileNotFoundError:
         print(f"FileNotFoundError: The file path '{filename}' is invalid.")
@@ -16,14 +322,10 @@ def load_to_csv(filename, df):
 
 def load_to_google_sheets(spreadsheet_id, df):
     """Store data into google sheets using Google Sheets API"""
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-    creds = Credentials.from_service_account_file('./google-sheets-api.json', scopes=SCOPES)
-
     RANGE_NAME = 'Sheet1!A1'
 
     try:
-        service = build('sheets', 'v4', credentials=creds)
-        sheets = service.spreadsheets()
+        sheets = get_sheets()
 
         values = [df.columns.tolist()] + df.values.tolist()
         body = {
@@ -43,15 +345,555 @@ def load_to_google_sheets(spreadsheet_id, df):
     except Exception as e:
         print(f"An Error Occured while storing data to google sheets: {e}")
 
-def load_to_postgresql(URL_DB, df):
-    """Store data into PostgreSQL database."""
+def load_to_postgresql(URL_DB, df, method="insert", key_columns=DEFAULT_KEY_COLUMNS):
+    """Store data into PostgreSQL database.
+
+    `method="copy"` streams the frame through COPY FROM STDIN inside one transaction
+    instead of batched INSERT statements. `method="upsert"` merges the frame on the
+    natural key `key_columns`, so reruns do not append the catalog again.
+    """
     try:
-        engine = create_engine(URL_DB)
+        engine = get_engine(URL_DB)
 
-        with engine.connect() as conn:
-            df.to_sql('products', con=conn, if_exists='append', index=False)
-            print("Data successfully added to postgreSQL")
+        if method == "upsert":
+            with engine.begin() as conn:
+                counts = upsert_dataframe(conn, df, 'products', key_columns)
+            print(f"{counts['inserted']} rows inserted, {counts['updated']} updated, "
+                  f"{counts['unchanged']} unchanged in postgreSQL")
+        elif method == "copy":
+            with engine.begin() as conn:
+                df.to_sql('products', con=conn, if_exists='append', index=False, method=psql_insert_copy)
+        else:
+            with engine.connect() as conn:
+                df.to_sql('products', con=conn, if_exists='append', index=False)
+        print("Data successfully added to postgreSQL")
     except ValueError as e:
         print(f"ValueError: DataFrame could not be saved: {e}")
     except Exception as e:
-        print(f"An Error Occured while storing data to postgreSQL: {e}")
\ No newline at end of file
+        print(f"An Error Occured while storing data to postgreSQL: {e}")
+
+def new_run_id():
+    """Sortable, collision-free id for one pipeline run"""
+    return "{}-{}".format(datetime.now().strftime("%Y%m%dT%H%M%S"), uuid.uuid4().hex[:8])
+
+
+def _import_pyarrow(purpose):
+    global pa, pc, pq
+    if pq is None:
+        try:
+            import pyarrow, pyarrow.compute, pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required to {}".format(purpose)) from None
+        pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def _to_arrow(df, partition_by):
+    _import_pyarrow("write Parquet output")
+    df = df.copy()
+    for column in PARQUET_DICTIONARY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    if partition_by and partition_by not in df.columns:
+        df[partition_by] = df["Timestamp"].astype(str).str[:10]
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class ParquetSink:
+    """Chunk writer for load_stream that appends one run to a Hive-partitioned Parquet dataset.
+
+    Rows are split by `partition_by` (the scrape date taken from Timestamp by default) and
+    every partition of the run gets its own `run-<id>.parquet` file, written one row group
+    per chunk. Earlier runs are never rewritten. Size and Gender are dictionary encoded.
+    """
+
+    commits_on_close = True
+
+    def __init__(self, directory, partition_by=PARQUET_PARTITION_COLUMN, compression="zstd",
+                 row_group_size=PARQUET_ROW_GROUP_SIZE, run_id=None):
+        self.directory = directory
+        self.partition_by = partition_by
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.run_id = run_id or new_run_id()
+        self.rows = 0
+        self._writers = {}
+
+    def _writer(self, partition, schema):
+        writer = self._writers.get(partition)
+        if writer is None:
+            directory = self.directory
+            if self.partition_by:
+                directory = os.path.join(directory, "{}={}".format(self.partition_by, partition))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "run-{}.parquet".format(self.run_id))
+            writer = pq.ParquetWriter(path, schema, compression=self.compression)
+            self._writers[partition] = writer
+        return writer
+
+    def write(self, df):
+        table = _to_arrow(df, self.partition_by)
+        if self.partition_by:
+            partitions = table.column(self.partition_by).unique().to_pylist()
+        else:
+            partitions = [None]
+
+        for partition in partitions:
+            part = table
+            if partition is not None:
+                part = table.filter(pc.equal(table.column(self.partition_by), partition))
+                part = part.drop_columns([self.partition_by])
+            writer = self._writer(partition, part.schema)
+            writer.write_table(part.cast(writer.schema), row_group_size=self.row_group_size)
+        self.rows += len(df)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        partitions = sorted(p for p in self._writers if p is not None)
+        self._writers = {}
+        return {"directory": self.directory, "run_id": self.run_id, "partitions": partitions}
+
+    def abort(self):
+        """Remove the files of an unfinished run so the dataset only holds complete runs"""
+        for writer in self._writers.values():
+            writer.close()
+            os.remove(writer.where)
+        self._writers = {}
+
+
+def load_to_parquet(directory, df, partition_by=PARQUET_PARTITION_COLUMN, compression="zstd",
+                    row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Append df to a partitioned Parquet dataset as a new run, see ParquetSink"""
+    try:
+        sink = ParquetSink(directory, partition_by, compression, row_group_size)
+        sink.write(df)
+        sink.close()
+        print(f"Data successfully saved to Parquet dataset {directory} (run {sink.run_id})")
+    except ImportError as e:
+        print(f"ImportError: {e}")
+    except PermissionError:
+        print(f"PermissionError: No permission to write to '{directory}'.")
+    except Exception as e:
+        print(f"An unexpected error occurred while saving to Parquet: {e}")
+
+
+def read_parquet_dataset(directory, columns=None, filters=None):
+    """Read a Parquet dataset written by ParquetSink with memory mapping.
+
+    Only `columns` are read, and `filters` (e.g. [("scrape_date", ">=", "2025-04-01")])
+    prune whole partitions before any file is opened.
+    """
+    _import_pyarrow("read Parquet output")
+    table = pq.read_table(directory, columns=columns, filters=filters, memory_map=True)
+    return table.to_pandas()
+
+
+class CsvSink:
+    """Chunk writer for load_stream that never leaves a half-written CSV behind.
+
+    Chunks are encoded one at a time and written through a `buffer_size` byte buffer to
+    a temporary file next to `filename`, so memory stays bounded by one chunk whatever
+    the output size. With `mode="replace"` the temporary file is renamed over `filename`
+    on close, so readers see the previous file or the complete new one. With
+    `mode="append"` the run's rows are added to the end of the existing file on close,
+    with a header only when the file is new; a failed append is truncated back off.
+    `compression` is "gzip", "zstd" (through pyarrow), None, or "infer" from a .gz or
+    .zst filename. Compressed appends add a new gzip member or zstd frame, which
+    readers decompress as one stream.
+    """
+
+    commits_on_close = True
+
+    @property
+    def replaces_output(self):
+        return self.mode == "replace"
+
+    def __init__(self, filename, mode="replace", compression="infer", buffer_size=CSV_BUFFER_SIZE):
+        if mode not in CSV_MODES:
+            raise ValueError("Unknown CSV mode {!r}, expected one of {}".format(mode, CSV_MODES))
+        if compression == "infer":
+            compression = {".gz": "gzip", ".zst": "zstd"}.get(os.path.splitext(filename)[1])
+        if compression is not None and compression not in CSV_COMPRESSIONS:
+            raise ValueError("Unknown CSV compression {!r}, expected one of {}".format(compression, CSV_COMPRESSIONS))
+        self.filename = filename
+        self.mode = mode
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self._tmp_path = "{}.{}.tmp".format(filename, uuid.uuid4().hex)
+        self._file = None
+
+    def _open(self):
+        raw = open(self._tmp_path, "wb", buffering=self.buffer_size)
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=raw, mode="wb"), raw
+        if self.compression == "zstd":
+            _import_pyarrow("write zstd-compressed CSV")
+            return pa.CompressedOutputStream(pa.PythonFile(raw, mode="w"), "zstd"), raw
+        return raw, raw
+
+    def write(self, df):
+        if self._file is None:
+            self._file, self._raw = self._open()
+            header = self.mode == "replace" or not os.path.exists(self.filename) \
+                or os.path.getsize(self.filename) == 0
+        else:
+            header = False
+        self._file.write(df.to_csv(index=False, header=header).encode("utf-8"))
+        self.rows += len(df)
+
+    def _close_file(self):
+        self._file.close()
+        if not self._raw.closed:
+            self._raw.close()
+        self._file = None
+
+    def _append(self):
+        with open(self.filename, "ab") as target, open(self._tmp_path, "rb") as source:
+            size = target.tell()
+            try:
+                shutil.copyfileobj(source, target, self.buffer_size)
+                target.flush()
+                os.fsync(target.fileno())
+            except BaseException:
+                target.truncate(size)
+                raise
+        os.remove(self._tmp_path)
+
+    def close(self):
+        if self._file is not None:
+            self._close_file()
+            if self.mode == "append":
+                self._append()
+            else:
+                with open(self._tmp_path, "rb") as f:
+                    os.fsync(f.fileno())
+                os.replace(self._tmp_path, self.filename)
+        return {"filename": self.filename, "mode": self.mode, "compression": self.compression}
+
+    def abort(self):
+        """Drop the temporary file of a failed run, leaving `filename` untouched"""
+        if self._file is not None:
+            self._close_file()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class GoogleSheetsSink:
+    """Chunk writer for load_stream: the first chunk is written from A1, later chunks are appended.
+
+    With `mode="sync"` the chunks are collected and written with sync_to_google_sheets on
+    close, so only the rows that changed since the last run are uploaded. With
+    `mode="add"` every chunk is appended below the rows already in the sheet, without a
+    header, and nothing is overwritten.
+    """
+
+    def __init__(self, spreadsheet_id, mode="append"):
+        if mode not in SHEETS_MODES:
+            raise ValueError("Unknown Sheets mode {!r}, expected one of {}".format(mode, SHEETS_MODES))
+        self.spreadsheet_id = spreadsheet_id
+        self.mode = mode
+        self.rows = 0
+        self._chunks = []
+
+    @property
+    def commits_on_close(self):
+        return self.mode == "sync"
+
+    @property
+    def replaces_output(self):
+        return self.mode == "sync"
+
+    def write(self, df):
+        if self.mode == "sync":
+            self._chunks.append(df)
+            self.rows += len(df)
+            return
+
+        sheets = get_sheets()
+        if self.rows or self.mode == "add":
+            execute_with_backoff(sheets.values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range='Sheet1!A1',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': df.values.tolist()}
+            ))
+        else:
+            execute_with_backoff(sheets.values().update(
+                spreadsheetId=self.spreadsheet_id,
+                range='Sheet1!A1',
+                valueInputOption='RAW',
+                body={'values': [df.columns.tolist()] + df.values.tolist()}
+            ))
+        self.rows += len(df)
+
+    def close(self):
+        if self.mode == "sync" and self._chunks:
+            result = sync_to_google_sheets(self.spreadsheet_id, pd.concat(self._chunks, ignore_index=True))
+            self._chunks = []
+            return result
+        return {}
+
+    def abort(self):
+        """Drop the collected chunks of an unfinished sync run"""
+        self._chunks = []
+
+
+class PostgreSQLSink:
+    """Chunk writer for load_stream: every chunk is appended (or upserted) in its own transaction.
+
+    An upserting sink sets up the table (prepare_upsert_table) with its first chunk only.
+    `method="add"` upserts without updating existing rows, so only products whose key is
+    not in the table yet are inserted.
+    """
+
+    def __init__(self, URL_DB, table_name='products', method="insert", key_columns=DEFAULT_KEY_COLUMNS):
+        self.URL_DB = URL_DB
+        self.table_name = table_name
+        self.method = method
+        self.key_columns = key_columns
+        self.rows = 0
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        self._prepared = False
+
+    def write(self, df):
+        with get_engine(self.URL_DB).begin() as conn:
+            if self.method in ("upsert", "add"):
+                counts = upsert_dataframe(conn, df, self.table_name, self.key_columns, self.method == "upsert",
+                                          prepare=not self._prepared)
+                for key, value in counts.items():
+                    self.counts[key] += value
+            else:
+                to_sql_method = psql_insert_copy if self.method == "copy" else None
+                df.to_sql(self.table_name, con=conn, if_exists='append', index=False, method=to_sql_method)
+        self._prepared = True
+        self.rows += len(df)
+
+    def close(self):
+        return dict(self.counts) if self.method in ("upsert", "add") else {}
+
+
+_DONE = object()
+_ABORT = object()  # the chunk stream failed: abort every sink instead of closing it
+
+
+class _SinkWorker(threading.Thread):
+    """Feeds one sink from its own bounded queue so a slow sink never blocks the others.
+
+    The sink times out once it has spent `timeout` seconds in its own write and close
+    calls; time spent waiting for chunks from upstream does not count. With a
+    dead-letter store, a sink that writes every chunk on its own gets each chunk it
+    failed on stored; sinks with `commits_on_close` are dead-lettered by load_stream.
+    """
+
+    def __init__(self, name, sink, max_buffered_chunks, timeout=None, dead_letters=None, run_id=None):
+        super().__init__(name="sink-{}".format(name), daemon=True)
+        self.sink_name = name
+        self.sink = sink
+        self.commits_on_close = getattr(sink, "commits_on_close", False)
+        self.replaces_output = getattr(sink, "replaces_output", False)
+        self.dead_letters = dead_letters
+        self.run_id = run_id
+        self.queue = queue.Queue(maxsize=max_buffered_chunks)
+        self.timeout = timeout
+        self.timed_out = False
+        self.in_flight = None
+        self._busy = 0.0
+        self._busy_since = None
+        self.result = {"status": "running", "rows": 0, "seconds": 0.0, "error": None, "details": {}}
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            while True:
+                df = self.queue.get()
+                if df is _DONE:
+                    break
+                if df is _ABORT:
+                    self.result["status"] = "aborted"
+                    self.abort()
+                    return
+                self.in_flight = df
+                self._call(self.sink.write, df)
+                self.in_flight = None
+                count("load." + self.sink_name, "rows", len(df))
+                self.result["rows"] += len(df)
+            self.result["details"] = self._call(self.sink.close) or {}
+            self.result["status"] = "ok"
+        except Exception as e:
+            self.result["status"] = "failed"
+            self.result["error"] = "{}: {}".format(type(e).__name__, e)
+            self.abort()
+            if self.in_flight is not None and self.dead_letters is not None and not self.commits_on_close:
+                self.dead_letter(self.in_flight)
+        finally:
+            self.result["seconds"] = round(time.perf_counter() - start, 3)
+
+    def _call(self, method, *args):
+        self._busy_since = time.monotonic()
+        try:
+            with timed("load." + self.sink_name):
+                return method(*args)
+        finally:
+            self._busy += time.monotonic() - self._busy_since
+            self._busy_since = None
+
+    def expired(self):
+        """True once the sink has been busy in write/close for longer than its timeout"""
+        if self.timeout is None:
+            return False
+        since = self._busy_since
+        return self._busy + (time.monotonic() - since if since is not None else 0) >= self.timeout
+
+    def abort(self):
+        abort = getattr(self.sink, "abort", None)
+        if abort is not None:
+            abort()
+
+    def offer(self, item):
+        """Queue a chunk unless the sink has stopped or timed out. Returns whether it was queued."""
+        while self.is_alive() and not self.timed_out:
+            if self.expired():
+                self.timed_out = True
+                return False
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def wait(self):
+        """Join the worker unless its sink times out first"""
+        while self.is_alive() and not self.timed_out:
+            self.join(0.1)
+            if self.is_alive() and self.expired():
+                self.timed_out = True
+
+    def give_up(self):
+        """Take back the chunks a timed-out sink still has queued and make it abort if its call ever returns"""
+        chunks = self.undelivered()
+        try:
+            self.queue.put_nowait(_ABORT)
+        except queue.Full:
+            pass
+        return chunks
+
+    def undelivered(self):
+        """Chunks still queued for a stopped sink.
+
+        The chunk it was writing is not included: a failed worker dead-letters it itself,
+        and a timed-out one may still finish writing it.
+        """
+        chunks = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return chunks
+            if item is not _DONE and item is not _ABORT:
+                chunks.append(item)
+
+    def dead_letter(self, df):
+        count("load." + self.sink_name, "dead_letter_rows", len(df))
+        report = self.report()
+        self.dead_letters.add_chunk(self.sink_name, "sink_" + report["status"], df, report["error"], self.run_id)
+
+    def dead_letter_run(self, rows):
+        """Store the whole spooled run for a sink that commits on close and did not"""
+        count("load." + self.sink_name, "dead_letter_rows", rows)
+        report = self.report()
+        self.dead_letters.add_spooled_run(self.run_id, self.sink_name, "sink_" + report["status"], report["error"])
+
+    def report(self):
+        result = dict(self.result)
+        if self.timed_out or (self.is_alive() and result["status"] == "running"):
+            result["status"] = "timeout"
+        return result
+
+
+def _sink_names(sinks):
+    names, seen = [], {}
+    for sink in sinks:
+        name = type(sink).__name__
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else "{}#{}".format(name, seen[name]))
+    return names
+
+
+def load_stream(chunks, sinks, timeout=None, max_buffered_chunks=4, dead_letters=None):
+    """Write every transformed chunk to every sink concurrently as soon as it arrives.
+
+    Each sink runs in its own thread with a bounded queue of `max_buffered_chunks`, so the
+    load stage takes as long as the slowest sink rather than the sum of all of them. A sink
+    that raises, or spends more than `timeout` seconds in its own write and close calls, is
+    reported and skipped without stopping the others; a slow upstream never times a
+    sink out. If `chunks` raises, every sink is aborted instead of closed, so no partial
+    run is committed, and the error is re-raised. Returns a report with the number of
+    rows read and, per sink, its status ("ok", "failed", "timeout" or "aborted"), rows written,
+    seconds, error and sink-specific details.
+    With a DeadLetterStore as `dead_letters`, what a failed or timed-out sink did not
+    write is stored for replay under the sink's name and a run id: every chunk from the
+    one it failed on for a sink that writes chunk by chunk, and the whole run for a sink
+    with `commits_on_close`, whose failure discards the run. For the latter the run is
+    spooled to the store while it streams; a failed upstream dead-letters no whole runs.
+    A sink with `replaces_output` (a replace-mode CSV, sync-mode Sheets) that succeeds
+    supersedes the runs stored for it earlier, which are removed so a replay can't
+    overwrite the newer output with them.
+    """
+    run_id = new_run_id() if dead_letters is not None else None
+    workers = [
+        _SinkWorker(name, sink, max_buffered_chunks, timeout or None, dead_letters, run_id)
+        for name, sink in zip(_sink_names(sinks), sinks)
+    ]
+    spool = dead_letters is not None and any(worker.commits_on_close for worker in workers)
+    for worker in workers:
+        worker.start()
+
+    total_rows = 0
+    end = _ABORT
+
+    try:
+        for df in chunks:
+            total_rows += len(df)
+            if spool:
+                dead_letters.spool(run_id, df)
+            for worker in workers:
+                if not worker.offer(df) and dead_letters is not None and not worker.commits_on_close:
+                    for undelivered in worker.undelivered() + [df]:
+                        worker.dead_letter(undelivered)
+        end = _DONE
+    finally:
+        for worker in workers:
+            worker.offer(end)
+        for worker in workers:
+            worker.wait()
+        for worker in workers:
+            status = worker.report()["status"]
+            if status == "ok" and dead_letters is not None and worker.replaces_output:
+                superseded = dead_letters.supersede(worker.sink_name)
+                if superseded:
+                    count("load." + worker.sink_name, "superseded_dead_letters", superseded)
+            if status not in ("failed", "timeout"):
+                continue
+            undelivered = worker.give_up() if status == "timeout" else worker.undelivered()
+            if dead_letters is None:
+                continue
+            if not worker.commits_on_close:
+                for df in undelivered:
+                    worker.dead_letter(df)
+            elif end is _DONE:
+                worker.dead_letter_run(total_rows)
+        if spool:
+            dead_letters.drop_spool(run_id)
+
+    return {
+        "rows": total_rows,
+        "sinks": {worker.sink_name: worker.report() for worker in workers},
+    }
+
+
+def load_concurrently(df, sinks, timeout=None):
+    """Load one shared, read-only frame into every sink at the same time, see load_stream"""
+    return load_stream([df], sinks, timeout=timeout)
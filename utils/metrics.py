@@ -0,0 +1,237 @@
+import cProfile, json, os, resource, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+_current = None
+
+
+class RunMetrics:
+    """Collects per-stage and per-page metrics for one pipeline run.
+
+    Stages are named by dotted strings ("extract.fetch", "transform", "load.CsvSink").
+    Each `timed` block adds its wall time and the CPU time of the calling thread to its
+    stage, so overlapping streaming stages are still attributed correctly. With
+    `profile_dir` set, every stage also gets a cProfile dump and, with `trace_memory`,
+    the top tracemalloc allocation sites are written at the end of the run.
+
+    With `trace_memory`, each stage records the highest traced memory peak reached
+    inside its blocks. Entering a block resets the tracemalloc peak, so a block that
+    overlaps one in another thread may see a lower peak than it reached. Resident
+    memory is reported as the process high-water mark and as how much this run raised
+    it, since ru_maxrss never goes down.
+    """
+
+    def __init__(self, run_id=None, profile_dir=None, trace_memory=False):
+        self.run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.started_at = datetime.now().isoformat()
+        self.stages = {}
+        self.pages = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._profiling = False
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._start_peak_rss = peak_rss_bytes()
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "counters": {}}
+            self.stages[name] = stage
+        return stage
+
+    def _start_profile(self, name):
+        if not self.profile_dir:
+            return None
+        with self._lock:
+            if self._profiling:  # only one profiler can be active at a time
+                return None
+            self._profiling = True
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            with self._lock:
+                self._profiling = False
+            return None
+        return profile
+
+    def _stop_profile(self, profile):
+        if profile is not None:
+            profile.disable()
+            with self._lock:
+                self._profiling = False
+
+    @contextmanager
+    def timed(self, name):
+        timer = Timer()
+        profile = self._start_profile(name)
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield timer
+        finally:
+            timer.seconds = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            self._stop_profile(profile)
+            with self._lock:
+                stage = self._stage(name)
+                stage["calls"] += 1
+                stage["wall_seconds"] += timer.seconds
+                stage["cpu_seconds"] += cpu
+                if self.trace_memory and tracemalloc.is_tracing():
+                    traced_peak = tracemalloc.get_traced_memory()[1]
+                    stage["traced_peak_bytes"] = max(stage.get("traced_peak_bytes", 0), traced_peak)
+
+    def count(self, name, counter, value=1):
+        with self._lock:
+            counters = self._stage(name)["counters"]
+            counters[counter] = counters.get(counter, 0) + value
+
+    def observe_page(self, url, **fields):
+        with self._lock:
+            self.pages.setdefault(url, {"url": url}).update(fields)
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def report(self):
+        process_peak_rss = peak_rss_bytes()
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "wall_seconds": round(time.perf_counter() - self._start_wall, 6),
+                "cpu_seconds": round(time.process_time() - self._start_cpu, 6),
+                "process_peak_rss_bytes": process_peak_rss,
+                "run_peak_rss_increase_bytes": process_peak_rss - self._start_peak_rss,
+                "gauges": dict(self.gauges),
+                "stages": {name: dict(stage, counters=dict(stage["counters"])) for name, stage in self.stages.items()},
+                "pages": list(self.pages.values()),
+            }
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.report(), indent=2))
+
+    def write_prometheus(self, path, prefix="fashion_etl"):
+        """Write the report in the Prometheus textfile collector format"""
+        report = self.report()
+        lines = [
+            "# TYPE {}_run_wall_seconds gauge".format(prefix),
+            "{}_run_wall_seconds {}".format(prefix, report["wall_seconds"]),
+            "# TYPE {}_run_cpu_seconds gauge".format(prefix),
+            "{}_run_cpu_seconds {}".format(prefix, report["cpu_seconds"]),
+            "# TYPE {}_process_peak_rss_bytes gauge".format(prefix),
+            "{}_process_peak_rss_bytes {}".format(prefix, report["process_peak_rss_bytes"]),
+            "# TYPE {}_run_peak_rss_increase_bytes gauge".format(prefix),
+            "{}_run_peak_rss_increase_bytes {}".format(prefix, report["run_peak_rss_increase_bytes"]),
+        ]
+        for metric in ("calls", "wall_seconds", "cpu_seconds"):
+            lines.append("# TYPE {}_stage_{} gauge".format(prefix, metric))
+            for name, stage in sorted(report["stages"].items()):
+                lines.append('{}_stage_{}{{stage="{}"}} {}'.format(prefix, metric, name, stage[metric]))
+        lines.append("# TYPE {}_stage_counter gauge".format(prefix))
+        for name, stage in sorted(report["stages"].items()):
+            for counter, value in sorted(stage["counters"].items()):
+                lines.append('{}_stage_counter{{stage="{}",counter="{}"}} {}'.format(prefix, name, counter, value))
+        for name, value in sorted(report["gauges"].items()):
+            lines.append("# TYPE {}_{} gauge".format(prefix, name))
+            lines.append("{}_{} {}".format(prefix, name, value))
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+    def dump_profiles(self):
+        """Write one `<stage>.prof` per profiled stage and the top tracemalloc sites"""
+        if not self.profile_dir:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.profile_dir, "{}.prof".format(name)))
+        if self.trace_memory and tracemalloc.is_tracing():
+            top = tracemalloc.take_snapshot().statistics("lineno")[:25]
+            _atomic_write(os.path.join(self.profile_dir, "tracemalloc.txt"), "\n".join(str(stat) for stat in top) + "\n")
+
+
+class Timer:
+    seconds = 0.0
+
+
+def peak_rss_bytes():
+    """The highest resident set size of the process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _atomic_write(path, text):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def start_run(run_id=None, profile_dir=None, trace_memory=False):
+    """Start collecting metrics for a run; instrumented code reports into it"""
+    global _current
+    _current = RunMetrics(run_id, profile_dir, trace_memory)
+    return _current
+
+
+def finish_run(json_path=None, prometheus_path=None):
+    """Stop collecting, write the requested reports and return the run report"""
+    global _current
+    metrics, _current = _current, None
+    if metrics is None:
+        return None
+    metrics.dump_profiles()
+    if metrics._started_tracing:
+        tracemalloc.stop()
+    if json_path:
+        metrics.write_json(json_path)
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+    return metrics.report()
+
+
+def get_metrics():
+    return _current
+
+
+def timed(name):
+    """Time a block into the current run's stage `name`; a no-op when no run is active"""
+    if _current is None:
+        return _null_timer()
+    return _current.timed(name)
+
+
+@contextmanager
+def _null_timer():
+    timer = Timer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+
+
+def count(name, counter, value=1):
+    if _current is not None:
+        _current.count(name, counter, value)
+
+
+def observe_page(url, **fields):
+    if _current is not None:
+        _current.observe_page(url, **fields)
+
+
+def set_gauge(name, value):
+    if _current is not None:
+        _current.set_gauge(name, value)
@@ -0,0 +1,103 @@
+import hashlib, json, os, sqlite3, threading
+from datetime import datetime
+from utils.batch import COLUMNS, ProductBatch
+
+DEFAULT_INDEX_PATH = ".cache/page_index.sqlite3"
+
+
+class PageIndex:
+    """Parsed products of every listing page of a catalog, keyed by a hash of the page body.
+
+    A page whose body hashes the same as last time, and was parsed by the same parser
+    (engine, library and extract.PARSER_VERSION, see extract.parser_id), is rebuilt from
+    the stored rows instead of parsed again, so a parser fix invalidates old rows. Pages
+    are kept per catalog url in a local SQLite database. `finish()` after a complete
+    crawl evicts pages that were not seen, i.e. no longer exist in the catalog.
+    """
+
+    def __init__(self, url, path=DEFAULT_INDEX_PATH):
+        self.url = url
+        self.path = path
+        self._lock = threading.Lock()
+        self._seen = set()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pages)")]
+            if columns and "parser" not in columns:
+                # Rows of an index written before parsers were recorded can't be trusted
+                self._conn.execute("DROP TABLE pages")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " catalog TEXT NOT NULL,"
+                " page_url TEXT NOT NULL,"
+                " body_hash TEXT NOT NULL,"
+                " parser TEXT NOT NULL,"
+                " has_next INTEGER NOT NULL,"
+                " rows TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " PRIMARY KEY (catalog, page_url))"
+            )
+
+    @staticmethod
+    def digest(content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+    def get(self, page_url, body_hash, as_batch=False, parser=""):
+        """(products, has_next) of an unchanged page parsed by `parser`, with a fresh timestamp, or None"""
+        with self._lock:
+            self._seen.add(page_url)
+            row = self._conn.execute(
+                "SELECT rows, has_next FROM pages "
+                "WHERE catalog = ? AND page_url = ? AND body_hash = ? AND parser = ?",
+                (self.url, page_url, body_hash, parser),
+            ).fetchone()
+        if row is None:
+            return None
+
+        timestamp = datetime.now().isoformat()
+        products = ProductBatch(timestamp)
+        for fields in json.loads(row[0]):
+            products.append(*fields)
+        return (products if as_batch else list(products)), bool(row[1])
+
+    def put(self, page_url, body_hash, products, has_next, parser=""):
+        if isinstance(products, ProductBatch):
+            rows = [list(row) for row in products.rows()]
+        else:
+            rows = [[product[column] for column in COLUMNS] for product in products]
+        with self._lock, self._conn:
+            self._seen.add(page_url)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (catalog, page_url, body_hash, parser, has_next, rows, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.url, page_url, body_hash, parser, int(has_next), json.dumps(rows), datetime.now().isoformat()),
+            )
+
+    def mark_seen(self, page_url):
+        """Keep a page that was served from elsewhere (e.g. a scrape checkpoint) on finish()"""
+        with self._lock:
+            self._seen.add(page_url)
+
+    def pages(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_url FROM pages WHERE catalog = ? ORDER BY page_url", (self.url,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def finish(self):
+        """Evict the pages of this catalog that were not seen since the index was opened"""
+        with self._lock, self._conn:
+            stored = [row[0] for row in self._conn.execute(
+                "SELECT page_url FROM pages WHERE catalog = ?", (self.url,)
+            )]
+            gone = [(self.url, page_url) for page_url in stored if page_url not in self._seen]
+            self._conn.executemany("DELETE FROM pages WHERE catalog = ? AND page_url = ?", gone)
+        return len(gone)
+
+    def close(self):
+        self._conn.close()
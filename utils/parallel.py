@@ -0,0 +1,151 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.batch import product_digest
+from utils.extract import finish_crawl, iter_page_contents, parse_page
+from utils.metrics import count, timed
+from utils.transform import transform_and_clean_data
+
+DEFAULT_PAGES_PER_TASK = 8
+
+
+def to_batch(df):
+    """Column name -> numpy array; pickles as a handful of buffers instead of one dict per row"""
+    return {column: df[column].to_numpy() for column in df.columns}
+
+
+def from_batches(batches):
+    """Concatenate columnar batches into one DataFrame"""
+    batches = [batch for batch in batches if batch]
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return pd.DataFrame(batches[0])
+    return pd.concat([pd.DataFrame(batch) for batch in batches], ignore_index=True)
+
+
+def parse_and_clean_pages(contents, parser=None, compact=False, rules=None):
+    """Worker task: parse a run of consecutive pages and clean them in one transform.
+
+    Stops after the first page without a next page link. Returns the cleaned columnar
+    batch, the number of cards parsed, whether the catalog continues, the quarantined
+    rows as a columnar batch and the per-rule transform stats.
+    """
+    batches = []
+    has_next_page = True
+    for content in contents:
+        batch, has_next_page = parse_page(content, parser, as_batch=True)
+        batches.append(batch)
+        if not has_next_page:
+            break
+    rejected, stats = [], {}
+    df = transform_and_clean_data(batches, compact=compact, stats=stats, rules=rules, quarantine=rejected.append)
+    quarantine = to_batch(pd.concat(rejected)) if rejected else {}
+    return to_batch(df), sum(len(batch) for batch in batches), has_next_page, quarantine, stats
+
+
+def _tasks(contents, pages_per_task):
+    task = []
+    for content in contents:
+        task.append(content)
+        if len(task) == pages_per_task:
+            yield task
+            task = []
+    if task:
+        yield task
+
+
+def iter_parsed_batches(contents, processes=None, parser=None, compact=False,
+                        pages_per_task=DEFAULT_PAGES_PER_TASK, rules=None, crawl=None):
+    """Parse and clean raw pages in a process pool, yielding their batches in page order.
+
+    Yields (clean batch, cards parsed, quarantine batch, transform stats). At most two
+    tasks per worker are in flight, so pages are pulled from `contents` only as fast as
+    the workers keep up. Iteration ends after the last page of the catalog, which marks
+    the CrawlStatus `crawl` complete.
+    """
+    processes = processes or os.cpu_count() or 1
+    tasks = _tasks(contents, pages_per_task)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(pool.submit(parse_and_clean_pages, task, parser, compact, rules))
+                if len(pending) < processes * 2:
+                    continue
+                batch, cards, has_next_page, quarantine, stats = pending.popleft().result()
+                yield batch, cards, quarantine, stats
+                if not has_next_page:
+                    finish_crawl(crawl=crawl)
+                    return
+            while pending:
+                batch, cards, has_next_page, quarantine, stats = pending.popleft().result()
+                yield batch, cards, quarantine, stats
+                if not has_next_page:
+                    finish_crawl(crawl=crawl)
+                    return
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_transformed_chunks_parallel(contents, processes=None, chunk_size=500, parser=None, compact=False,
+                                     pages_per_task=DEFAULT_PAGES_PER_TASK, rules=None, quarantine=None,
+                                     crawl=None):
+    """Process-pool counterpart of iter_transformed_chunks that starts from raw page bytes.
+
+    Workers return cleaned columnar batches, which are merged in page order into
+    DataFrames of at least `chunk_size` rows. Rows already yielded by an earlier batch
+    are dropped, keyed like the dedupe of iter_transformed_chunks: the product_digest of
+    every column but the Timestamp. Rows rejected by
+    the data-quality `rules` are passed to the `quarantine` callable as DataFrames. A
+    CrawlStatus `crawl` is marked complete when the last page of the catalog is parsed.
+    """
+    seen = set()
+    buffer = []
+    buffered = 0
+
+    def flush():
+        with timed("transform.merge"):
+            df = from_batches(buffer)
+        buffer.clear()
+        return df
+
+    for batch, cards, rejected, stats in iter_parsed_batches(contents, processes, parser, compact,
+                                                             pages_per_task, rules, crawl):
+        count("extract.parse", "cards", cards)
+        for key, value in stats.items():
+            if key != "rows_out":
+                count("transform", key, value)
+        if rejected and quarantine is not None:
+            quarantine(pd.DataFrame(rejected))
+        if not batch:
+            continue
+        df = pd.DataFrame(batch)
+        fields = df[[column for column in df.columns if column != "Timestamp"]]
+        keys = [product_digest(row) for row in fields.itertuples(index=False, name=None)]
+        fresh = [key not in seen for key in keys]
+        seen.update(keys)
+        if not all(fresh):
+            count("transform", "dropped_duplicates", len(fresh) - sum(fresh))
+            df = df[fresh]
+            batch = to_batch(df)
+        count("transform", "rows_out", len(df))
+        buffer.append(batch)
+        buffered += len(df)
+        if buffered >= chunk_size:
+            yield flush()
+            buffered = 0
+
+    if buffered:
+        yield flush()
+
+
+def iter_transformed_pages_parallel(url, processes=None, chunk_size=500, start_page=1, max_workers=8,
+                                    rate_limit=None, parser=None, compact=False, pages_per_task=DEFAULT_PAGES_PER_TASK,
+                                    rules=None, quarantine=None, crawl=None):
+    """Fetch the catalog with `max_workers` threads and parse and clean it in `processes` workers"""
+    contents = iter_page_contents(url, start_page, max_workers, rate_limit, crawl)
+    return iter_transformed_chunks_parallel(contents, processes, chunk_size, parser, compact, pages_per_task,
+                                            rules, quarantine, crawl)
@@ -0,0 +1,109 @@
+from datetime import datetime
+from bs4 import UnicodeDammit
+from utils.batch import COLUMNS, ProductBatch
+from utils.dead_letter import failed_cards
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml is optional, extract falls back to BeautifulSoup
+    etree = lxml_html = None
+
+INFO_STYLE = "font-size: 14px; color: #777;"
+
+
+def _has_class(name):
+    return 'contains(concat(" ", normalize-space(@class), " "), " {} ")'.format(name)
+
+
+if etree is not None:
+    CARDS = etree.XPath("//div[{}]".format(_has_class("collection-card")))
+    NEXT_PAGE = etree.XPath("(//a[{}])[1]".format(_has_class("page-link")))
+    TITLE = etree.XPath("(.//h3[{}])[1]".format(_has_class("product-title")))
+    PRICE_SPAN = etree.XPath("(.//span[{}])[1]".format(_has_class("price")))
+    PRICE_P = etree.XPath("(.//p[{}])[1]".format(_has_class("price")))
+    ADDITIONAL_INFOS = etree.XPath(".//p[@style=$style]")
+
+
+def lxml_available():
+    return etree is not None
+
+
+def decode_html(content):
+    """Decode page bytes the way BeautifulSoup would, trying UTF-8 first"""
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return UnicodeDammit(content, is_html=True).unicode_markup
+
+
+def _text(element):
+    return str(element.text_content())
+
+
+def _card_html(card):
+    return etree.tostring(card, encoding="unicode", with_tail=False)
+
+
+def parse_page_lxml(content, as_batch=False, dead_letters=None):
+    """Parse a listing page with lxml, return its products and whether a next page link exists.
+
+    All products of the page share one timestamp; with `as_batch` they come back as a
+    ProductBatch instead of a list of dicts. Cards that fell back to placeholders are
+    appended to the `dead_letters` list as (reasons, card html).
+    """
+    root = lxml_html.document_fromstring(decode_html(content))
+    timestamp = datetime.now().isoformat()
+    failures = None if dead_letters is None else []
+
+    if as_batch:
+        products = ProductBatch(timestamp)
+        for card in CARDS(root):
+            products.append(*product_fields_lxml(card, failures))
+    else:
+        products = [parse_product_details_lxml(card, timestamp, failures) for card in CARDS(root)]
+
+    if failures:
+        dead_letters.extend(failed_cards(failures, _card_html))
+    return products, bool(NEXT_PAGE(root))
+
+
+def parse_product_details_lxml(card, timestamp, failures=None):
+    """lxml counterpart of extract.parse_product_details, returning an identical product dict"""
+    product = dict(zip(COLUMNS, product_fields_lxml(card, failures)))
+    product["Timestamp"] = timestamp
+    return product
+
+
+def product_fields_lxml(card, failures=None):
+    """(title, price, rating, colors, size, gender) of a product card"""
+    titles = TITLE(card)
+    if titles:
+        title = _text(titles[0])
+    else:
+        title = "Title Unavailable"
+        print("Error while parsing product title: 'NoneType' object has no attribute 'text'")
+        if failures is not None:
+            failures.append(("missing_title", card))
+
+    price_elements = PRICE_SPAN(card) or PRICE_P(card)
+    if price_elements:
+        price = _text(price_elements[0]).strip()
+    else:
+        price = "Price Unavailable"
+        print("Error while parsing product price: 'NoneType' object has no attribute 'text'")
+        if failures is not None:
+            failures.append(("missing_price", card))
+
+    additional_infos = ADDITIONAL_INFOS(card, style=INFO_STYLE)
+    if len(additional_infos) >= 4:
+        rating, colors, size, gender = (_text(info).strip() for info in additional_infos[:4])
+    else:
+        rating, colors, size, gender = "Not Rated", "Unknown Colors", "Unknown Size", "Unknown Gender"
+        print("Warning: Some product details (rating, colors, size, gender) are missing. "
+              "Error: list index out of range")
+        if failures is not None:
+            failures.append(("missing_details", card))
+
+    return title, price, rating, colors, size, gender
@@ -0,0 +1,141 @@
+import json
+import numpy as np
+import pandas as pd
+
+EXCHANGE_RATE = 16000
+
+# Rules run in order over the whole frame. A check keeps the rows its predicate holds
+# for; a transform rewrites a column and rejects the rows it cannot parse. Later rules
+# see the output of earlier transforms.
+DEFAULT_RULES = [
+    {"id": "duplicates", "check": "unique"},
+    {"id": "missing_values", "check": "not_null"},
+    {"id": "unknown_product", "check": "not_equal", "column": "Title", "value": "Unknown Product"},
+    {"id": "price_unavailable", "check": "not_equal", "column": "Price", "value": "Price Unavailable"},
+    {"id": "invalid_rating", "check": "not_matches", "column": "Rating", "pattern": "Invalid|Not Rated"},
+    {"id": "parse_price", "transform": "number", "column": "Price", "strip": "$",
+     "multiply": EXCHANGE_RATE, "dtype": "float"},
+    {"id": "parse_rating", "transform": "extract_number", "column": "Rating",
+     "pattern": r"(\d+(?:\.\d+)?)", "dtype": "float"},
+    {"id": "parse_colors", "transform": "extract_number", "column": "Colors", "pattern": r"(\d+)", "dtype": "int"},
+    {"id": "parse_size", "transform": "replace", "column": "Size", "old": "Size: ", "new": ""},
+    {"id": "parse_gender", "transform": "replace", "column": "Gender", "old": "Gender: ", "new": ""},
+]
+
+
+def _map_distinct(series, transform):
+    """Run a string transform on the distinct values only and broadcast the result back.
+
+    Scraped columns repeat a handful of values (sizes, genders, ratings), so this turns
+    one regex call per row into one per distinct value plus an integer take.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = transform(pd.Series(uniques, dtype=object)).to_numpy()
+    return pd.Series(mapped.take(codes), index=series.index, name=series.name)
+
+
+def _matches(series, pattern):
+    return _map_distinct(series, lambda values: values.str.contains(pattern, na=False)).to_numpy(dtype=bool)
+
+
+# check name -> (required parameters, predicate(frame, rule) -> boolean array of rows to keep)
+CHECKS = {
+    "unique": ((), lambda df, rule: ~df.duplicated(subset=rule.get("columns")).to_numpy()),
+    "not_null": ((), lambda df, rule: df[rule.get("columns", list(df.columns))].notna().all(axis=1).to_numpy()),
+    "not_equal": (("column", "value"), lambda df, rule: (df[rule["column"]] != rule["value"]).to_numpy()),
+    "matches": (("column", "pattern"), lambda df, rule: _matches(df[rule["column"]], rule["pattern"])),
+    "not_matches": (("column", "pattern"), lambda df, rule: ~_matches(df[rule["column"]], rule["pattern"])),
+    "between": (("column",), lambda df, rule: df[rule["column"]].between(
+        rule.get("min", -np.inf), rule.get("max", np.inf)).to_numpy()),
+}
+
+
+def _number(values, rule):
+    if rule.get("strip"):
+        values = values.str.replace(rule["strip"], "", regex=False)
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _extract_number(values, rule):
+    return pd.to_numeric(values.str.extract(rule["pattern"], expand=False), errors="coerce")
+
+
+def _replace(values, rule):
+    return values.str.replace(rule["old"], rule["new"], regex=False)
+
+
+# transform name -> (required parameters, column function run on the distinct values)
+TRANSFORMS = {
+    "number": ((), _number),
+    "extract_number": (("pattern",), _extract_number),
+    "replace": (("old", "new"), _replace),
+}
+DTYPES = {"float": "float64", "int": "int64", "str": "object", "category": "category"}
+
+
+def validate_rules(rules):
+    """Raise ValueError for a rule with a missing id, an unknown kind or missing parameters"""
+    ids = set()
+    for rule in rules:
+        rule_id = rule.get("id")
+        if not rule_id or rule_id in ids:
+            raise ValueError("Every rule needs a unique id: {!r}".format(rule))
+        ids.add(rule_id)
+        if ("check" in rule) == ("transform" in rule):
+            raise ValueError("Rule {!r} must have exactly one of 'check' or 'transform'".format(rule_id))
+        if "check" in rule:
+            kinds, kind, required = CHECKS, rule["check"], ()
+        else:
+            kinds, kind, required = TRANSFORMS, rule["transform"], ("column",)
+        if kind not in kinds:
+            raise ValueError("Rule {!r}: unknown kind {!r}, expected one of {}".format(rule_id, kind, sorted(kinds)))
+        missing = [key for key in required + kinds[kind][0] if key not in rule]
+        if rule.get("dtype", "float") not in DTYPES:
+            missing.append("dtype in {}".format(sorted(DTYPES)))
+        if missing:
+            raise ValueError("Rule {!r} is missing {}".format(rule_id, ", ".join(missing)))
+    return rules
+
+
+def load_rules(path=None):
+    """Rules from a JSON file holding a list of rule objects; DEFAULT_RULES without a path"""
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        return validate_rules(json.load(f))
+
+
+def apply_rules(df, rules=None):
+    """Validate and transform `df` with `rules` in one pass over its columns.
+
+    Every rule is evaluated once on the whole frame with vectorized pandas operations and
+    each row remembers the first rule it failed, so the frame is filtered once at the end.
+    Returns the clean frame, the rejected rows as scraped plus a `rule_id` column, and
+    {rule id: rows rejected}.
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    work = df.copy(deep=False)
+    failed = np.zeros(len(df), dtype=np.int32)  # 0 passed, otherwise 1 + index of the first failed rule
+    casts = {}
+
+    for number, rule in enumerate(rules, 1):
+        if "check" in rule:
+            keep = CHECKS[rule["check"]][1](work, rule)
+        else:
+            column = rule["column"]
+            values = _map_distinct(work[column], lambda distinct: TRANSFORMS[rule["transform"]][1](distinct, rule))
+            if rule.get("multiply") is not None:
+                values = values * rule["multiply"]
+            keep = (values.notna() | work[column].isna()).to_numpy()
+            work[column] = values
+            if rule.get("dtype"):
+                casts[column] = DTYPES[rule["dtype"]]
+        failed[(failed == 0) & ~keep] = number
+
+    passed = failed == 0
+    clean = work[passed].astype(casts) if casts else work[passed].copy()
+
+    rule_ids = np.array([rule["id"] for rule in rules], dtype=object)
+    rejected = df[~passed].assign(rule_id=rule_ids[failed[~passed] - 1])
+    counts = np.bincount(failed, minlength=len(rules) + 1)[1:]
+    return clean, rejected, {rule["id"]: int(n) for rule, n in zip(rules, counts)}
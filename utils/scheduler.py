@@ -0,0 +1,153 @@
+import os, random, time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class RunLock:
+    """Non-blocking inter-process lock on a file, held for the duration of one pipeline run.
+
+    The OS releases the lock when the holding process dies, so a crashed run never
+    leaves a stale lock behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock; False when another process holds it"""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write("{}\n".format(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError("Another pipeline run holds {}".format(self.path))
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CronSchedule:
+    """Next start times of a five-field cron expression ("minute hour day month weekday")"""
+
+    def __init__(self, expression):
+        from crontab import CronSlices
+
+        if not CronSlices.is_valid(expression):
+            raise ValueError("Invalid cron expression {!r}".format(expression))
+        slices = CronSlices(expression)
+        self.expression = expression
+        self._any_day = str(slices[2]) == "*"
+        self._any_weekday = str(slices[4]) == "*"
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (set(s) for s in slices)
+
+    def _day_matches(self, dt):
+        day = dt.day in self.days
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays  # cron counts weekdays from Sunday
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday  # cron runs when either restricted field matches
+
+    def next_after(self, dt):
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError("Cron expression {!r} never fires".format(self.expression))
+
+
+class IntervalSchedule:
+    """A start every `seconds` seconds"""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, dt):
+        return dt + timedelta(seconds=self.seconds)
+
+
+def make_schedule(cron=None, interval=None):
+    if cron:
+        return CronSchedule(cron)
+    if interval:
+        return IntervalSchedule(float(interval))
+    return None
+
+
+def run_scheduler(job, schedule, lock=None, jitter=0, run_now=False, max_runs=None,
+                  now=datetime.now, sleep=time.sleep):
+    """Keep calling `job()` on `schedule` in this process, one run at a time.
+
+    Every start is delayed by a random 0..`jitter` seconds. When `lock` (a RunLock) is
+    held by another process the tick is skipped, so a cron-started run and the daemon
+    never load at the same time. A failing run is reported and the schedule goes on.
+    Starts missed while a run was still going are not made up. Returns the number of
+    runs once `max_runs` runs have been attempted.
+    """
+    runs = 0
+    next_start = now() if run_now else schedule.next_after(now())
+    while max_runs is None or runs < max_runs:
+        wait = (next_start - now()).total_seconds() + random.uniform(0, jitter)
+        if wait > 0:
+            print("Next run at {}".format((now() + timedelta(seconds=wait)).isoformat(timespec="seconds")))
+            sleep(wait)
+
+        runs += 1
+        if lock is not None and not lock.acquire():
+            print("Skipping run: another pipeline run holds {}".format(lock.path))
+        else:
+            try:
+                job()
+            except Exception as e:
+                print(f"Pipeline run failed: {e}")
+            finally:
+                if lock is not None:
+                    lock.release()
+        next_start = schedule.next_after(next_start)
+        if next_start < now():
+            next_start = schedule.next_after(now())
+    return runs
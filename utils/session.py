@@ -0,0 +1,135 @@
+import random, threading, time, requests
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 60
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_lock = threading.Lock()
+_session = None
+_settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "timeout": DEFAULT_TIMEOUT,
+    "max_retries": MAX_RETRIES,
+    "backoff_factor": BACKOFF_FACTOR,
+}
+_counters = {"requests": 0, "retries": 0}
+
+
+def configure_session(pool_size=None, timeout=None, max_retries=None, backoff_factor=None):
+    """Change pool size, timeouts or retry policy; the shared session is rebuilt on next use"""
+    global _session
+    with _lock:
+        for key, value in (("pool_size", pool_size), ("timeout", timeout),
+                           ("max_retries", max_retries), ("backoff_factor", backoff_factor)):
+            if value is not None:
+                _settings[key] = value
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = create_session(_settings["pool_size"])
+        return _session
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """A new keep-alive session with its own connection pool of `pool_size` connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def close_session():
+    """Close the shared session and reset its counters"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        for key in _counters:
+            _counters[key] = 0
+
+
+def _increment(counter):
+    with _lock:
+        _counters[counter] += 1
+
+
+def retry_delay(response, attempt, backoff_factor=None):
+    """Seconds to wait before retrying: Retry-After if sent, else exponential backoff with jitter"""
+    retry_after = response.headers.get("Retry-After") if response.headers else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                wait = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                return min(max(wait, 0), MAX_BACKOFF)
+            except (TypeError, ValueError):
+                pass
+
+    if backoff_factor is None:
+        backoff_factor = _settings["backoff_factor"]
+    backoff = backoff_factor * (2 ** attempt)
+    return min(backoff + random.uniform(0, backoff), MAX_BACKOFF)
+
+
+def get_with_retries(url, session=None, throttle=None, **kwargs):
+    """GET `url` with the shared session, retrying 429/5xx responses.
+
+    The status and latency of every attempt, or None for a request that raised, are
+    reported to `throttle.record()` when a throttle is given.
+    """
+    session = session or get_session()
+    kwargs.setdefault("timeout", _settings["timeout"])
+    max_retries = _settings["max_retries"]
+
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        try:
+            response = session.get(url, **kwargs)
+        except requests.exceptions.RequestException:
+            if throttle is not None:
+                throttle.record(url, time.monotonic() - start, None)
+            raise
+        _increment("requests")
+        if throttle is not None:
+            throttle.record(url, time.monotonic() - start, response.status_code)
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+            return response
+
+        time.sleep(retry_delay(response, attempt))
+        _increment("retries")
+        attempt += 1
+
+
+def session_stats():
+    """Return request/retry counters and how many requests reused a pooled connection"""
+    with _lock:
+        stats = dict(_counters)
+        opened = served = 0
+        if _session is not None:
+            for adapter in set(_session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is not None:
+                        opened += pool.num_connections
+                        served += pool.num_requests
+    stats["connections_opened"] = opened
+    stats["connections_reused"] = max(served - opened, 0)
+    return stats
@@ -0,0 +1,191 @@
+import json, os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.load import DEFAULT_KEY_COLUMNS, add_row_hash, new_run_id
+
+pa = pq = None  # imported by the first SnapshotStore
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+DELTA_COLUMNS = ("Price", "Rating")
+
+
+def _import_pyarrow():
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow, pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for the snapshot store") from None
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def add_key_hash(df, key_columns=DEFAULT_KEY_COLUMNS):
+    """Return a copy of df with `key_hash` (product identity) and `row_hash` (product state)"""
+    hashed = add_row_hash(df, key_columns)
+    hashed["key_hash"] = pd.util.hash_pandas_object(df[list(key_columns)], index=False).astype("int64")
+    return hashed
+
+
+class SnapshotStore:
+    """Keeps each run's cleaned output as `run-<id>.parquet` plus an ordered manifest.
+
+    Every snapshot carries a `key_hash` of the product identity and a `row_hash` of its
+    attributes, so diffing two runs is a single hash join on integers.
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, key_columns=DEFAULT_KEY_COLUMNS):
+        _import_pyarrow()
+        self.directory = directory
+        self.key_columns = list(key_columns)
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def path_for(self, run_id):
+        return os.path.join(self.directory, "run-{}.parquet".format(run_id))
+
+    def runs(self):
+        """Run ids in the order they were saved"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return [run["run_id"] for run in json.load(f)["runs"]]
+        except FileNotFoundError:
+            return []
+
+    def commit(self, run_id, rows):
+        """Append a written run to the manifest"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {"runs": []}
+        manifest["runs"].append({
+            "run_id": run_id,
+            "rows": rows,
+            "created_at": datetime.now().isoformat(),
+        })
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def prepare(self, df):
+        """Deduplicate on the product key and add the identity and content hashes"""
+        df = df.drop_duplicates(subset=self.key_columns)
+        return add_key_hash(df, self.key_columns)
+
+    def save(self, df, run_id=None):
+        """Store a whole run and return its id"""
+        run_id = run_id or new_run_id()
+        snapshot = self.prepare(df)
+        pq.write_table(pa.Table.from_pandas(snapshot, preserve_index=False), self.path_for(run_id), compression="zstd")
+        self.commit(run_id, len(snapshot))
+        return run_id
+
+    def load(self, run_id, columns=None):
+        return pq.read_table(self.path_for(run_id), columns=columns, memory_map=True).to_pandas()
+
+    def diff(self, previous_run_id, current_run_id):
+        """Rows inserted, deleted or changed between two runs, with price and rating deltas.
+
+        Runs in time linear in the number of rows: one hash join on `key_hash`. Returns
+        a frame with a `change` column, the key columns, previous and current Price and
+        Rating and their deltas; unchanged products are left out.
+        """
+        columns = self.key_columns + list(DELTA_COLUMNS) + ["key_hash", "row_hash"]
+        current = self.load(current_run_id, columns)
+        if previous_run_id is None:
+            previous = current.iloc[0:0]
+        else:
+            previous = self.load(previous_run_id, columns)
+
+        merged = previous.merge(current, on="key_hash", how="outer", suffixes=("_previous", ""), indicator=True)
+        change = np.select(
+            [
+                merged["_merge"] == "right_only",
+                merged["_merge"] == "left_only",
+                merged["row_hash_previous"] != merged["row_hash"],
+            ],
+            ["inserted", "deleted", "changed"],
+            default="unchanged",
+        )
+        merged.insert(0, "change", change)
+        merged = merged[merged["change"] != "unchanged"]
+
+        diff = merged[["change"]].copy()
+        for column in self.key_columns:
+            diff[column] = merged[column].where(merged["_merge"] != "left_only", merged[column + "_previous"])
+        for column in DELTA_COLUMNS:
+            diff[column + "_previous"] = merged[column + "_previous"]
+            diff[column] = merged[column]
+            diff[column.lower() + "_delta"] = merged[column] - merged[column + "_previous"]
+        return diff.reset_index(drop=True)
+
+    def diff_latest(self):
+        """Diff the most recent run against the one before it"""
+        runs = self.runs()
+        if not runs:
+            raise ValueError("No snapshots stored in {}".format(self.directory))
+        previous = runs[-2] if len(runs) > 1 else None
+        return self.diff(previous, runs[-1])
+
+
+class SnapshotSink:
+    """Chunk writer for load_stream that stores the run as a snapshot, one row group per chunk.
+
+    On close the run is committed to the manifest and the diff against the previous run is
+    kept in `self.changes` so it can be handed to other loaders. With a CrawlStatus `crawl`,
+    a run whose crawl did not reach the end of the catalog is dropped instead, since
+    every product after the failed page would show up as deleted.
+    """
+
+    commits_on_close = True
+
+    def __init__(self, store, run_id=None, crawl=None):
+        self.store = store
+        self.crawl = crawl
+        self.run_id = run_id or new_run_id()
+        self.rows = 0
+        self.changes = None
+        self._writer = None
+        self._seen_keys = set()
+
+    def write(self, df):
+        snapshot = self.store.prepare(df)
+        snapshot = snapshot[~snapshot["key_hash"].isin(self._seen_keys)]
+        self._seen_keys.update(snapshot["key_hash"].tolist())
+
+        table = pa.Table.from_pandas(snapshot, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.store.path_for(self.run_id), table.schema, compression="zstd")
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows += len(snapshot)
+
+    def abort(self):
+        """Discard the snapshot file of an unfinished run without committing it"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self.store.path_for(self.run_id))
+
+    def close(self):
+        if self._writer is None:
+            return {}
+        if self.crawl is not None and not self.crawl.complete:
+            self.abort()
+            print(f"Snapshot {self.run_id} dropped: the crawl did not reach the end of the catalog")
+            return {"run_id": self.run_id, "committed": False}
+        self._writer.close()
+        runs = self.store.runs()
+        self.store.commit(self.run_id, self.rows)
+        self.changes = self.store.diff(runs[-1] if runs else None, self.run_id)
+        counts = self.changes["change"].value_counts()
+        return {
+            "run_id": self.run_id,
+            "inserted": int(counts.get("inserted", 0)),
+            "deleted": int(counts.get("deleted", 0)),
+            "changed": int(counts.get("changed", 0)),
+        }
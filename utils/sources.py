@@ -0,0 +1,232 @@
+import hashlib, json, queue, threading
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from utils.batch import COLUMNS, ProductBatch
+from utils.extract import PARSER_VERSION, CrawlStatus, build_page_url, iter_product_pages_concurrently
+from utils.extract import parse_page, parser_id
+from utils.metrics import count
+from utils.page_index import PageIndex
+from utils.parsers import decode_html, lxml_available
+from utils.session import create_session
+
+PAGINATIONS = ("path", "query")
+
+
+def paginate(url, page, pagination="path", start_page=1):
+    """Url of listing page `page` of the catalog at `url`.
+
+    "path" appends /pageN like Fashion Studio, "query" sets a ?page=N parameter, and any
+    other string is a template such as "https://shop.test/list?p={page}".
+    """
+    if pagination == "path":
+        return build_page_url(url, page, start_page)
+    if pagination == "query":
+        if page == start_page:
+            return url
+        parts = urlsplit(url)
+        params = [(key, value) for key, value in parse_qsl(parts.query) if key != "page"]
+        return urlunsplit(parts._replace(query=urlencode(params + [("page", page)])))
+    if "{page}" not in pagination:
+        raise ValueError("Unknown pagination {!r}, expected one of {} or a url template with {{page}}".format(
+            pagination, PAGINATIONS))
+    return pagination.format(url=url, page=page)
+
+
+class SourceAdapter:
+    """One retailer catalog: how its pages are found and parsed and how hard it may be crawled.
+
+    `pagination` is passed to paginate(). Each source is crawled with its own
+    `rate_limit` (see throttle.make_limiter, adaptive by default like iter_product_pages),
+    `max_workers` pages in flight and a connection pool of that size. Subclasses
+    implement parse().
+    """
+
+    def __init__(self, name, url, pagination="path", start_page=1, rate_limit="adaptive", max_workers=4):
+        self.name = name
+        self.url = url
+        self.pagination = pagination
+        self.start_page = start_page
+        self.rate_limit = rate_limit
+        self.max_workers = max_workers
+
+    def page_url(self, page):
+        return paginate(self.url, page, self.pagination, self.start_page)
+
+    def parse(self, content, as_batch=False):
+        """(products, has_next_page) of a listing page, like extract.parse_page"""
+        raise NotImplementedError
+
+    def iter_pages(self, as_batch=False, checkpoint=None, page_index=None, crawl=None):
+        """Yield the products of each listing page in page order, marking the CrawlStatus `crawl` at the end"""
+        session = create_session(self.max_workers)
+        try:
+            yield from iter_product_pages_concurrently(
+                self.url, self.start_page, self.max_workers, self.rate_limit, self.parse, checkpoint, as_batch,
+                paginate=self.page_url, session=session, page_index=page_index, crawl=crawl,
+            )
+        finally:
+            session.close()
+
+
+class FashionStudioSource(SourceAdapter):
+    """The Fashion Studio catalog, parsed by extract.parse_page with either engine"""
+
+    def __init__(self, url="https://fashion-studio.dicoding.dev", name="fashion_studio", parser=None, **kwargs):
+        super().__init__(name, url, **kwargs)
+        self.parser = parser
+
+    @property
+    def parser_id(self):
+        return parser_id(self.parser)
+
+    def parse(self, content, as_batch=False):
+        return parse_page(content, self.parser, as_batch)
+
+
+class XPathSource(SourceAdapter):
+    """A catalog described by XPath expressions, evaluated with lxml.
+
+    `cards` selects the product cards of a page, `fields` maps product columns (Title,
+    Price, Rating, Colors, Size, Gender) to expressions evaluated on a card, and a page
+    continues when `next_page` matches. Missing fields and empty matches become None, so
+    the data-quality rules reject them.
+    """
+
+    def __init__(self, name, url, cards, fields, next_page=None, **kwargs):
+        if not lxml_available():
+            raise ImportError("XPathSource needs lxml")
+        from lxml import etree
+
+        super().__init__(name, url, **kwargs)
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError("Unknown fields for source {!r}: {}".format(name, ", ".join(sorted(unknown))))
+        self._cards = etree.XPath(cards)
+        self._fields = [etree.XPath(fields[column]) if column in fields else None for column in COLUMNS]
+        self._next_page = etree.XPath(next_page) if next_page else None
+        # Pages stored in a PageIndex are parsed again once the expressions change
+        expressions = json.dumps([cards, fields, next_page], sort_keys=True).encode("utf-8")
+        self.parser_id = "xpath-{}/{}:{}".format(etree.__version__, PARSER_VERSION,
+                                                 hashlib.blake2b(expressions, digest_size=8).hexdigest())
+
+    @staticmethod
+    def _value(result):
+        if isinstance(result, list):
+            result = result[0] if result else None
+        if result is None:
+            return None
+        if not isinstance(result, str):
+            result = result.text_content() if hasattr(result, "text_content") else str(result)
+        return result.strip() or None
+
+    def _product_fields(self, card):
+        return tuple(self._value(field(card)) if field is not None else None for field in self._fields)
+
+    def parse(self, content, as_batch=False):
+        from lxml import html as lxml_html
+
+        root = lxml_html.document_fromstring(decode_html(content))
+        timestamp = datetime.now().isoformat()
+        cards = self._cards(root)
+        if as_batch:
+            products = ProductBatch(timestamp)
+            for card in cards:
+                products.append(*self._product_fields(card))
+        else:
+            products = [dict(zip(COLUMNS, self._product_fields(card)), Timestamp=timestamp) for card in cards]
+        return products, bool(self._next_page is not None and self._next_page(root))
+
+
+ADAPTERS = {"fashion_studio": FashionStudioSource, "xpath": XPathSource}
+
+
+def make_source(spec, rate_limit="adaptive"):
+    """Source adapter from a config dict, e.g. {"adapter": "xpath", "name": ..., "url": ..., ...}.
+
+    A spec without its own "rate_limit" is crawled at `rate_limit`.
+    """
+    spec = dict(spec)
+    spec.setdefault("rate_limit", rate_limit)
+    adapter = spec.pop("adapter", "fashion_studio")
+    if adapter not in ADAPTERS:
+        raise ValueError("Unknown source adapter {!r}, expected one of {}".format(adapter, sorted(ADAPTERS)))
+    return ADAPTERS[adapter](**spec)
+
+
+def crawl_sources(sources, as_batch=False, queue_size=64, page_index_path=None, crawl=None):
+    """Crawl every source at once and yield (source name, page products) as pages arrive.
+
+    Each source runs in its own thread with its own rate limit, workers and connection
+    pool, so a run takes about as long as the slowest source instead of the sum of all
+    of them. Pages of one source stay in page order and every product is tagged with
+    the source name (ProductBatch.source, or a "Source" key). A failing source is
+    reported and the others go on; if any source failed or stopped before its last
+    page, a RuntimeError is raised once the others are done, so a load stage reading
+    the pages aborts instead of committing a catalog missing that source. Crawling
+    stops when the consumer stops iterating. With `page_index_path`, each source keeps
+    a PageIndex there so unchanged pages are not parsed again. A CrawlStatus `crawl`
+    is marked complete when every source was crawled to its last page.
+    """
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError("Source names must be unique: {}".format(names))
+
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    statuses = {name: CrawlStatus() for name in names}
+    errors = {}
+
+    def crawl_source(source):
+        page_index = PageIndex(source.url, page_index_path) if page_index_path else None
+        try:
+            for page_products in source.iter_pages(as_batch, page_index=page_index, crawl=statuses[source.name]):
+                if isinstance(page_products, ProductBatch):
+                    page_products.source = source.name
+                else:
+                    for product in page_products:
+                        product["Source"] = source.name
+                if not put((source.name, page_products)):
+                    return
+            if not statuses[source.name].complete:
+                raise RuntimeError("a listing page could not be fetched or parsed")
+        except Exception as e:
+            print(f"Crawling source {source.name} failed: {e}")
+            errors[source.name] = e
+        finally:
+            if page_index is not None:
+                page_index.close()
+            put((source.name, done))
+
+    threads = [threading.Thread(target=crawl_source, args=(source,), name="source-" + source.name, daemon=True)
+               for source in sources]
+    for thread in threads:
+        thread.start()
+
+    remaining = len(threads)
+    try:
+        while remaining:
+            name, page_products = pages.get()
+            if page_products is done:
+                remaining -= 1
+                continue
+            count("extract.source." + name, "pages")
+            count("extract.source." + name, "cards", len(page_products))
+            yield name, page_products
+        if crawl is not None:
+            crawl.complete = all(status.complete for status in statuses.values())
+        if errors:
+            raise RuntimeError("Crawling failed for sources: {}".format(", ".join(errors))) \
+                from next(iter(errors.values()))
+    finally:
+        stop.set()
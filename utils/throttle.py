@@ -0,0 +1,111 @@
+import re, threading, time
+from urllib.parse import urlparse
+from utils.metrics import count, set_gauge
+
+
+class RateLimiter:
+    """Thread-safe per-host limiter spacing request starts to at most `rate` per second"""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def _interval(self, host):
+        return 1.0 / self.rate
+
+    def wait(self, url):
+        if not self.rate:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval(host)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, url, seconds, status=None):
+        """Feedback on one finished request; a fixed rate ignores it"""
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """Per-host rate limiter that follows what the server can take (AIMD).
+
+    Every host starts at `initial` requests per second. Each healthy response adds
+    `increase / rate`, so the rate grows by about `increase` per second of traffic. A 429,
+    a 5xx, a request that raised, or a response slower than `spike_factor` times the
+    host's smoothed latency (and than `min_spike` seconds, so sub-millisecond jitter is
+    ignored) or than `max_latency` seconds multiplies the rate by
+    `decrease`, at most once per smoothed round trip so one burst of failures in flight
+    counts once. The rate stays within [`floor`, `ceiling`] and is published as the
+    gauge rate_limit_<host>.
+    """
+
+    def __init__(self, initial=5, floor=0.5, ceiling=50, increase=1.0, decrease=0.5, spike_factor=3.0,
+                 min_spike=0.25, max_latency=None, smoothing=0.2):
+        if not 0 < floor <= initial <= ceiling:
+            raise ValueError("Rates must satisfy 0 < floor <= initial <= ceiling")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        super().__init__(initial)
+        self.floor = floor
+        self.ceiling = ceiling
+        self.increase = increase
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.min_spike = min_spike
+        self.max_latency = max_latency
+        self.smoothing = smoothing
+        self._rates = {}
+        self._latency = {}  # host -> (smoothed seconds, samples)
+        self._last_cut = {}
+
+    def current_rate(self, host):
+        with self._lock:
+            return self._rates.get(host, self.rate)
+
+    def _interval(self, host):
+        return 1.0 / self._rates.get(host, self.rate)
+
+    def _is_spike(self, seconds, latency):
+        if self.max_latency is not None and seconds > self.max_latency:
+            return True
+        smoothed, samples = latency
+        return samples >= 3 and seconds > max(self.spike_factor * smoothed, self.min_spike)
+
+    def record(self, url, seconds, status=None):
+        host = urlparse(url).netloc
+        failed = status is None or status == 429 or status >= 500
+        with self._lock:
+            rate = self._rates.get(host, self.rate)
+            latency = self._latency.get(host, (seconds, 0))
+            if failed or self._is_spike(seconds, latency):
+                now = time.monotonic()
+                if now - self._last_cut.get(host, float("-inf")) >= max(latency[0], 1.0 / rate):
+                    rate = max(self.floor, rate * self.decrease)
+                    self._last_cut[host] = now
+                    count("extract.throttle", "rate_cuts")
+            else:
+                rate = min(self.ceiling, rate + self.increase / rate)
+            if not failed:
+                smoothed, samples = latency
+                self._latency[host] = (smoothed + self.smoothing * (seconds - smoothed) if samples else seconds,
+                                       samples + 1)
+            self._rates[host] = rate
+        set_gauge("rate_limit_" + re.sub(r"\W", "_", host), round(rate, 3))
+
+
+def make_limiter(rate_limit=None):
+    """Limiter for a `rate_limit` setting.
+
+    A number is a fixed rate per second, "adaptive" or a dict of AdaptiveRateLimiter
+    arguments an adaptive one, and a limiter is used as is; None or 0 means no limit.
+    """
+    if isinstance(rate_limit, RateLimiter):
+        return rate_limit
+    if rate_limit == "adaptive":
+        return AdaptiveRateLimiter()
+    if isinstance(rate_limit, dict):
+        return AdaptiveRateLimiter(**rate_limit)
+    return RateLimiter(rate_limit)
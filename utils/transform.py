@@ -1,44 +1,114 @@
 import pandas as pd
+from utils.batch import COLUMNS, ProductBatch, batches_to_frame, product_digest
+from utils.metrics import count, timed
+from utils.quality import apply_rules
 
-def transform_and_clean_data(data):
-    """Convert data into dataframe and transform data"""
+
+def _to_frame(data):
+    if isinstance(data, ProductBatch):
+        data = [data]
+    if data and isinstance(data[0], ProductBatch):
+        return batches_to_frame(data)
+    return pd.DataFrame(data)
+
+
+def _tally(stats, key, value):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + int(value)
+
+
+def transform_and_clean_data(data, compact=False, stats=None, rules=None, quarantine=None):
+    """Convert data into dataframe and transform data
+
+    Rows are validated and columns parsed by the data-quality `rules` (see
+    utils/quality.py, DEFAULT_RULES when None) in a single vectorized pass. With
+    `compact=True`, Size and Gender become categoricals and Colors the smallest integer
+    dtype that fits. A `stats` dict is incremented with rows in/out and the rows dropped
+    by each rule as "dropped_<rule id>". Rejected rows, with the id of the first rule
+    they failed in a `rule_id` column, are passed to the `quarantine` callable.
+    `data` is a list of product dicts, a ProductBatch or a list of ProductBatch.
+    """
+    df = _to_frame(data)
+    _tally(stats, "rows_in", len(df))
+    if df.empty:
+        return df
     try:
-        df = pd.DataFrame(data)
-
-        # Delete all duplicates and null/NaN/None
-        df.drop_duplicates(inplace=True)
-        df.dropna(inplace=True)
-        
-        # Delete Product Title == "Unknown Product"
-        df = df.drop(df[df["Title"] == "Unknown Product"].index)
-
-        # Transform Product Price
-        try:
-            df = df.drop(df[df["Price"] == "Price Unavailable"].index)
-            df["Price"] = df["Price"].str.replace("$", "", regex=False).astype(float)
-            df["Price"] = (df["Price"] * 16000).astype(float)
-        except (AttributeError, ValueError, KeyError) as e:
-            print(f"Error while transforming Price: {e}")
-
-        # Transform Product Rating
-        try:
-            df = df[~df["Rating"].str.contains("Invalid|Not Rated", na=False)]
-            df["Rating"] = df["Rating"].str.extract(r'(\d+(?:\.\d+)?)').astype(float)
-        except (AttributeError, ValueError, KeyError) as e:
-            print(f"Error while transforming Rating: {e}")
-
-        # Transform colors
-        try:
-            df["Colors"] = df["Colors"].str.extract(r'(\d+)').astype(int)
-        except (AttributeError, ValueError, KeyError) as e:
-            print(f"Error transforming Colors: {e}")
-
-        # Transform Size
-        df["Size"] = df["Size"].str.replace("Size: ", "")
-
-        # Transform Gender
-        df["Gender"] =df["Gender"].str.replace("Gender: ", "")
+        df, rejected, counts = apply_rules(df, rules)
+        for rule_id, dropped in counts.items():
+            _tally(stats, "dropped_" + rule_id, dropped)
+
+        if compact:
+            df["Size"] = df["Size"].astype("category")
+            df["Gender"] = df["Gender"].astype("category")
+            if pd.api.types.is_integer_dtype(df["Colors"]):
+                df["Colors"] = pd.to_numeric(df["Colors"], downcast="integer")
     except Exception as e:
+        # A broken rule set rejects the whole input instead of passing it on half-cleaned
         print(f"General error in transform_and_clean_data: {e}")
+        _tally(stats, "dropped_error", len(df))
+        df, rejected = df.iloc[:0], df.assign(rule_id="error")
+
+    if quarantine is not None and len(rejected):
+        quarantine(rejected)
+    _tally(stats, "rows_out", len(df))
+    return df
+
+
+def iter_transformed_chunks(pages, chunk_size=500, rules=None, quarantine=None):
+    """Group scraped pages into chunks of about `chunk_size` rows and transform each chunk.
+
+    A product already seen on an earlier page, with the same fields whatever its
+    timestamp, is dropped, so one that moved between pages mid-crawl is loaded once.
+    Products are remembered by product_digest, a fixed 16 bytes each. Pages may be lists
+    of product dicts or ProductBatch. `rules` and `quarantine` are passed on to
+    transform_and_clean_data.
+    """
+    seen = set()
+    buffer = []
+    buffered = 0
+
+    def flush():
+        stats = {}
+        with timed("transform"):
+            df = transform_and_clean_data(buffer, stats=stats, rules=rules, quarantine=quarantine)
+        for key, value in stats.items():
+            count("transform", key, value)
+        buffer.clear()
+        return df
+
+    for page_products in pages:
+        if isinstance(page_products, ProductBatch):
+            keep = []
+            for i, row in enumerate(page_products.rows()):
+                key = product_digest(row + (page_products.source,))
+                if key not in seen:
+                    seen.add(key)
+                    keep.append(i)
+            dropped = len(page_products) - len(keep)
+            buffer.append(page_products.take(keep) if dropped else page_products)
+            buffered += len(keep)
+        else:
+            dropped = 0
+            for product in page_products:
+                fields = tuple(product.get(column) for column in COLUMNS) + (product.get("Source"),)
+                key = product_digest(fields)
+                if key in seen:
+                    dropped += 1
+                    continue
+                seen.add(key)
+                buffer.append(product)
+            buffered = len(buffer)
+        if dropped:
+            count("transform", "dropped_duplicates", dropped)
+            count("transform", "rows_in", dropped)
+
+        if buffered >= chunk_size:
+            buffered = 0
+            df = flush()
+            if not df.empty:
+                yield df
 
-    return df
\ No newline at end of file
+    if buffer:
+        df = flush()
+        if not df.empty:
+            yield df